@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 
 from backend import create_app
 from backend.config import DevelopmentConfig, ProductionConfig, TestingConfig
+from backend.src.jobs import fail_interrupted_jobs
 
 load_dotenv(override=True)
 
@@ -17,6 +18,10 @@ def deploy_app():
 
     env = os.environ.get("ENV", "dev")
     app = create_app(config_map[env]())
+
+    # Jobs still queued or running belonged to a process that is gone
+    with app.app_context():
+        fail_interrupted_jobs()
     return app
 
 
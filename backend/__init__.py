@@ -7,6 +7,8 @@ from flask_cors import CORS
 
 from backend.config import Config
 from backend.extensions import db, jwt, migrate
+from backend.src.llm_cache import configure_response_cache
+from backend.src.llm_metrics import configure_recorder
 from flask_session import Session
 
 
@@ -29,9 +31,18 @@ def create_app(config_class: Config):
     Session(app)
     db.init_app(app)
     migrate.init_app(app, db)
+    configure_recorder(app.config)
+    configure_response_cache(app.config)
 
     # Import blueprints
-    from backend.routes import auth_bp, base_bp, calendar_bp, schedule_bp, task_bp
+    from backend.routes import (
+        auth_bp,
+        base_bp,
+        calendar_bp,
+        llm_bp,
+        schedule_bp,
+        task_bp,
+    )
 
     # Register blueprints
     app.register_blueprint(base_bp)
@@ -39,6 +50,7 @@ def create_app(config_class: Config):
     app.register_blueprint(task_bp)
     app.register_blueprint(calendar_bp)
     app.register_blueprint(schedule_bp)
+    app.register_blueprint(llm_bp)
 
     if not app.debug:
         mail_handler = SMTPHandler(
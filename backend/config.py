@@ -36,6 +36,32 @@ class Config:
     if not os.path.exists(CALENDAR_JSON_DIR):
         os.makedirs(CALENDAR_JSON_DIR)
 
+    # Background schedule generation
+    SCHEDULE_JOB_WORKERS = int(os.environ.get("SCHEDULE_JOB_WORKERS", 2))
+    SCHEDULE_JOB_PROGRESS_INTERVAL = 1.0  # seconds between progress writes
+    SCHEDULE_SNAPSHOT_TTL = 300  # seconds before preview data is reloaded
+    # Process pool size for parallel (windowed) scheduling; None uses all cores
+    SCHEDULE_PARALLEL_WORKERS = (
+        int(os.environ["SCHEDULE_PARALLEL_WORKERS"])
+        if os.environ.get("SCHEDULE_PARALLEL_WORKERS")
+        else None
+    )
+    # Periods shorter than this are planned sequentially even in parallel mode
+    SCHEDULE_PARALLEL_MIN_DAYS = int(os.environ.get("SCHEDULE_PARALLEL_MIN_DAYS", 300))
+
+    # LLM call instrumentation: any of log, sqlite, prometheus
+    LLM_METRICS_SINKS = os.environ.get("LLM_METRICS_SINKS", "log,prometheus")
+    LLM_METRICS_DB = os.environ.get(
+        "LLM_METRICS_DB", os.path.join(ROOT_DIR, "llm_metrics.db")
+    )
+
+    # LLM response cache: in-memory LRU, plus a SQLite tier if LLM_CACHE_DB is set
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1024))
+    LLM_CACHE_TTL = (
+        float(os.environ["LLM_CACHE_TTL"]) if os.environ.get("LLM_CACHE_TTL") else None
+    )
+    LLM_CACHE_DB = os.environ.get("LLM_CACHE_DB")
+
     AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
 
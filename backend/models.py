@@ -96,6 +96,27 @@ class ScheduledTask(db.Model):
         return f"<ScheduledTask {self.id}: for task {self.task_id}>"
 
 
+class ScheduleJob(db.Model):
+    __tablename__ = "schedule_jobs"
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    status = db.Column(
+        db.String(20), nullable=False, default="queued"
+    )  # "queued", "running", "done", "failed", "cancelled"
+    start_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime, nullable=False)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    progress = db.Column(db.JSON, nullable=True)  # placements per stage
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ScheduleJob {self.id}: {self.status}>"
+
+
 # class User(db.Model):
 #     id = db.Column(db.Integer, primary_key=True)
 #     google_id = db.Column(db.String(255), nullable=True)
@@ -15,9 +15,32 @@ from flask_jwt_extended import (
 )
 
 from backend.extensions import create_logger, db
-from backend.models import CalendarEvent, ScheduledTask, Task, TaskDependency
+from backend.models import (
+    CalendarEvent,
+    ScheduledTask,
+    ScheduleJob,
+    Task,
+    TaskDependency,
+    generate_uuid,
+)
+from backend.src.jobs import cancel_schedule_job, submit_schedule_job
+from backend.src.llm_cache import get_response_cache
+from backend.src.llm_metrics import (
+    PrometheusSink,
+    get_recorder,
+    render_cache_metrics,
+)
 from backend.src.OAuthSignIn import OAuthSignIn
-from backend.src.scheduler import generate_schedule
+from backend.src.OpenRouter import get_default_client
+from backend.src.schedule_metrics import ScheduleMetrics, rolling_summary
+from backend.src.schedule_snapshot import (
+    EventSnapshot,
+    TaskSnapshot,
+    get_snapshot,
+    invalidate_snapshot,
+)
+from backend.src.scheduler import plan_schedule
+from backend.src.streaming import chunked_response, sse_response
 
 logger = create_logger(__name__, level="DEBUG")
 
@@ -26,6 +49,7 @@ auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 task_bp = Blueprint("task", __name__, url_prefix="/api/tasks")
 calendar_bp = Blueprint("calendar", __name__, url_prefix="/api/calendar")
 schedule_bp = Blueprint("schedule", __name__, url_prefix="/api/schedule")
+llm_bp = Blueprint("llm", __name__, url_prefix="/api/llm")
 
 # Default timezone for the application
 LOCAL_TIMEZONE = pytz.timezone("America/Los_Angeles")
@@ -57,6 +81,111 @@ def parse_iso_datetime(datetime_str, convert_to_local=False):
     return dt
 
 
+def serialize_schedule_job(job):
+    return {
+        "id": job.id,
+        "status": job.status,
+        "start_date": job.start_date.isoformat(),
+        "end_date": job.end_date.isoformat(),
+        "cancel_requested": job.cancel_requested,
+        "progress": job.progress or {},
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def parse_preview_task_fields(data):
+    """Convert task JSON (as accepted by create_task) into TaskSnapshot fields"""
+    fields = {}
+    if "content" in data:
+        fields["content"] = data["content"]
+    if "duration" in data:
+        fields["duration"] = int(data["duration"])
+    if "due_by" in data:
+        fields["due_by"] = parse_iso_datetime(data["due_by"])
+    if "recurrence" in data:
+        fields["recurrence"] = data["recurrence"]
+    if "time_window" in data:
+        time_window = data["time_window"] or {}
+        fields["time_window_start"] = (
+            datetime.strptime(time_window["start"], "%H:%M").time()
+            if time_window.get("start")
+            else None
+        )
+        fields["time_window_end"] = (
+            datetime.strptime(time_window["end"], "%H:%M").time()
+            if time_window.get("end")
+            else None
+        )
+    return fields
+
+
+def apply_preview_overrides(snapshot, overrides):
+    """
+    Apply what-if changes to a copy of the schedule snapshot
+
+    Supported keys: add_tasks, update_tasks, remove_tasks, add_events,
+    move_events and remove_events. Raises KeyError for unknown task or event
+    IDs and ValueError for malformed input.
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError("overrides must be an object")
+    for key, value in overrides.items():
+        if not isinstance(value, list):
+            raise ValueError(f"{key} must be a list")
+        if key.startswith(("add_", "update_", "move_")) and not all(
+            isinstance(item, dict) for item in value
+        ):
+            raise ValueError(f"{key} must be a list of objects")
+
+    for task_id in overrides.get("remove_tasks", []):
+        snapshot.remove_task(task_id)
+
+    for data in overrides.get("add_tasks", []):
+        if not all(data.get(key) for key in ("content", "duration", "task_type")):
+            raise ValueError("Missing required fields in add_tasks")
+        task = TaskSnapshot(
+            id=data.get("id") or f"preview-{generate_uuid()}",
+            task_type=data["task_type"],
+            **parse_preview_task_fields(data),
+        )
+        snapshot.add_task(task, data.get("dependencies"))
+
+    for data in overrides.get("update_tasks", []):
+        if not data.get("id"):
+            raise ValueError("Missing task id in update_tasks")
+        snapshot.update_task(data["id"], **parse_preview_task_fields(data))
+        if "dependencies" in data:
+            snapshot.set_dependencies(data["id"], data["dependencies"])
+
+    for event_id in overrides.get("remove_events", []):
+        snapshot.remove_event(event_id)
+
+    for data in overrides.get("add_events", []):
+        if not data.get("start") or not data.get("end"):
+            raise ValueError("Missing start or end in add_events")
+        snapshot.add_event(
+            EventSnapshot(
+                id=data.get("id") or f"preview-{generate_uuid()}",
+                subject=data.get("subject", ""),
+                start=parse_iso_datetime(data["start"]),
+                end=parse_iso_datetime(data["end"]),
+            )
+        )
+
+    for data in overrides.get("move_events", []):
+        if not data.get("id") or not data.get("start") or not data.get("end"):
+            raise ValueError("Missing id, start or end in move_events")
+        snapshot.move_event(
+            data["id"],
+            parse_iso_datetime(data["start"]),
+            parse_iso_datetime(data["end"]),
+        )
+
+
 @base_bp.route("/")
 def index():
     """API root endpoint - returns API status and basic information"""
@@ -169,6 +298,8 @@ def create_task():
             db.session.add(dependency)
         db.session.commit()
 
+    invalidate_snapshot()
+
     return (
         jsonify(
             {
@@ -268,6 +399,7 @@ def update_task(task_id):
             task.is_active = data["is_active"]
 
     db.session.commit()
+    invalidate_snapshot()
 
     return jsonify({"message": "Task updated successfully"})
 
@@ -283,6 +415,7 @@ def delete_task(task_id):
 
     db.session.delete(task)
     db.session.commit()
+    invalidate_snapshot()
 
     return jsonify({"message": "Task deleted successfully"})
 
@@ -294,6 +427,7 @@ def complete_task(task_id):
 
     task.is_completed = True
     db.session.commit()
+    invalidate_snapshot()
 
     # Also mark scheduled instances as completed
     if task.scheduled_instances:
@@ -451,6 +585,7 @@ def sync_calendar():
         )
 
     db.session.commit()
+    invalidate_snapshot()
 
     return jsonify(
         {
@@ -502,6 +637,7 @@ def update_event(event_id):
         event.end = parse_iso_datetime(data["end"])
 
     db.session.commit()
+    invalidate_snapshot()
 
     return jsonify({"message": "Event updated successfully"})
 
@@ -512,6 +648,7 @@ def clear_all_events():
     try:
         CalendarEvent.query.delete()
         db.session.commit()
+        invalidate_snapshot()
         return jsonify({"message": "All calendar events cleared successfully"})
     except Exception as e:
         logger.error(f"Error clearing calendar events: {str(e)}")
@@ -521,7 +658,7 @@ def clear_all_events():
 # Schedule routes
 @schedule_bp.route("/generate", methods=["POST"])
 def generate_new_schedule():
-    """Generate a new schedule"""
+    """Queue generation of a new schedule and return the job tracking it"""
     data = request.json or {}
 
     # Get date range for scheduling
@@ -535,36 +672,115 @@ def generate_new_schedule():
     if not start_date or not end_date:
         return jsonify({"error": "Invalid date range"}), 400
 
-    # Clear existing scheduled tasks in the date range
-    ScheduledTask.query.filter(
-        ScheduledTask.start >= start_date, ScheduledTask.start <= end_date
-    ).delete()
-
-    # Generate new schedule
     try:
-        scheduled_tasks = generate_schedule(start_date, end_date)
-
-        # Save scheduled tasks to database
-        for task_data in scheduled_tasks:
-            scheduled_task = ScheduledTask(
-                task_id=task_data["task_id"],
-                start=task_data["start"],
-                end=task_data["end"],
-                status="scheduled",
-            )
-            db.session.add(scheduled_task)
+        job, created = submit_schedule_job(
+            start_date, end_date, parallel=bool(data.get("parallel", False))
+        )
+    except Exception as e:
+        logger.error(f"Error queueing schedule generation: {str(e)}")
+        return jsonify({"error": f"Failed to generate schedule: {str(e)}"}), 500
+
+    return (
+        jsonify(
+            {
+                "message": (
+                    "Schedule generation queued"
+                    if created
+                    else "Schedule generation already in progress"
+                ),
+                "job_id": job.id,
+                "status": job.status,
+            }
+        ),
+        202,
+    )
+
+
+@schedule_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_schedule_job(job_id):
+    """Get the status and progress of a schedule generation job"""
+    job = ScheduleJob.query.get_or_404(job_id)
+    return jsonify(serialize_schedule_job(job))
+
+
+@schedule_bp.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_schedule_generation(job_id):
+    """Cancel a queued or running schedule generation job"""
+    job = ScheduleJob.query.get_or_404(job_id)
+
+    if not cancel_schedule_job(job):
+        return jsonify({"error": f"Job is already {job.status}"}), 409
+
+    return jsonify({"message": "Cancellation requested", "job_id": job.id})
 
-        db.session.commit()
 
-        return jsonify(
+@schedule_bp.route("/preview", methods=["POST"])
+def preview_schedule():
+    """Preview a schedule with optional what-if overrides, without saving it"""
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be an object"}), 400
+
+    start_date = parse_iso_datetime(
+        data.get("start_date", datetime.utcnow().isoformat())
+    )
+    end_date = parse_iso_datetime(
+        data.get("end_date", (datetime.utcnow() + timedelta(days=7)).isoformat())
+    )
+
+    if not start_date or not end_date:
+        return jsonify({"error": "Invalid date range"}), 400
+
+    snapshot = get_snapshot(current_app.config.get("SCHEDULE_SNAPSHOT_TTL", 300))
+    snapshot = snapshot.copy()
+
+    try:
+        apply_preview_overrides(snapshot, data.get("overrides", {}))
+    except KeyError as e:
+        return jsonify({"error": f"Unknown task or event: {e.args[0]}"}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid overrides: {str(e)}"}), 400
+
+    metrics = ScheduleMetrics()
+    one_off_tasks, recurring_tasks, task_dependencies, busy_slots = (
+        snapshot.schedule_inputs(start_date, end_date)
+    )
+    scheduled_tasks = plan_schedule(
+        one_off_tasks,
+        recurring_tasks,
+        task_dependencies,
+        busy_slots,
+        start_date,
+        end_date,
+        metrics=metrics,
+    )
+
+    result = []
+    for task_data in scheduled_tasks:
+        task = snapshot.get_task(task_data["task_id"])
+        result.append(
             {
-                "message": "Schedule generated successfully",
-                "tasks_scheduled": len(scheduled_tasks),
+                "task_id": task.id,
+                "task_content": task.content,
+                "start": task_data["start"].isoformat(),
+                "end": task_data["end"].isoformat(),
+                "duration": task.duration,
             }
         )
-    except Exception as e:
-        logger.error(f"Error generating schedule: {str(e)}")
-        return jsonify({"error": f"Failed to generate schedule: {str(e)}"}), 500
+
+    return jsonify(
+        {
+            "scheduled": result,
+            "metrics": metrics.to_dict(),
+            "snapshot_loaded_at": snapshot.loaded_at.isoformat(),
+        }
+    )
+
+
+@schedule_bp.route("/metrics", methods=["GET"])
+def get_schedule_metrics():
+    """Get timing and quality metrics for recent schedule generations"""
+    return jsonify(rolling_summary())
 
 
 @schedule_bp.route("", methods=["GET"])
@@ -623,3 +839,50 @@ def update_scheduled_task(scheduled_task_id):
     db.session.commit()
 
     return jsonify({"message": "Scheduled task updated successfully"})
+
+
+# LLM routes
+@llm_bp.route("/chat/stream", methods=["POST"])
+def stream_chat():
+    """Stream a chat completion to the client as it is generated"""
+    data = request.json or {}
+    messages = data.get("messages")
+
+    if not messages and data.get("prompt"):
+        messages = [{"role": "user", "content": data["prompt"]}]
+
+    if not messages:
+        return jsonify({"error": "Missing messages or prompt"}), 400
+
+    response_format = data.get("format", "sse")
+    if response_format not in ("sse", "text"):
+        return jsonify({"error": "format must be 'sse' or 'text'"}), 400
+
+    try:
+        completion = get_default_client().chat(
+            messages, model=data.get("model"), stream=True
+        )
+    except Exception as e:
+        logger.error(f"Error starting LLM stream: {str(e)}")
+        return jsonify({"error": f"Failed to start stream: {str(e)}"}), 502
+
+    if response_format == "text":
+        return chunked_response(completion)
+    return sse_response(completion)
+
+
+@llm_bp.route("/metrics", methods=["GET"])
+def get_llm_metrics():
+    """
+    Expose LLM call counts, tokens, latencies and response cache hits in
+    Prometheus text format
+    """
+    sink = get_recorder().get_sink(PrometheusSink)
+    if sink is None:
+        return jsonify({"error": "Prometheus metrics are not enabled"}), 404
+
+    body = sink.render() + render_cache_metrics(get_response_cache().stats())
+    response = make_response(body)
+    response.mimetype = "text/plain"
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return response
@@ -1,9 +1,27 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
+import asyncio
 import os
+import threading
+
+from backend.src.llm_cache import (
+    ResponseCache,
+    get_response_cache,
+    request_cache_key,
+)
+from backend.src.llm_metrics import CallRecorder, InstrumentedStream, get_recorder
+from backend.src.llm_resilience import (
+    RetryPolicy,
+    TokenBucket,
+    async_call_with_retries,
+    call_with_retries,
+)
 
 load_dotenv()
 
+_default_client = None
+_default_client_lock = threading.Lock()
+
 
 class OpenRouterClient:
     """
@@ -17,23 +35,42 @@ class OpenRouterClient:
         base_url: str = "https://openrouter.ai/api/v1",
         default_model: str = "meta-llama/llama-3.3-70b-instruct",
         api_key: str = os.getenv("OPENROUTER_API_KEY"),
+        cache: ResponseCache = None,
+        retry_policy: RetryPolicy = None,
+        fallback_models: list = None,
+        rate_limiter: TokenBucket = None,
+        recorder: CallRecorder = None,
     ):
 
         self.model = default_model
         self.api_key = api_key
         self.base_url = base_url
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.fallback_models = list(fallback_models or [])
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder or get_recorder()
 
         if not self.api_key:
             raise ValueError(
                 "No API key provided, and OPENROUTER_API_KEY is not set in the environment"
             )
 
+        # Retries are handled by retry_policy, not the SDK
         self._client = OpenAI(
             base_url=self.base_url,
             api_key=self.api_key,
+            max_retries=0,
         )
 
-    def chat(self, messages, model: str = None, stream: bool = False, **kwargs) -> str:
+    def chat(
+        self,
+        messages,
+        model: str = None,
+        stream: bool = False,
+        use_cache: bool = None,
+        **kwargs,
+    ) -> str:
         """
         Send a list of messages in the standard chat format:
         messages = [
@@ -42,17 +79,54 @@ class OpenRouterClient:
             ...
         ]
         Optionally override the default model or pass additional kwargs.
+
+        If the client has a cache, deterministic requests (temperature=0) are
+        answered from it; pass use_cache=True to cache any request or False
+        to always hit the network.
+
+        Transient errors (429, 5xx, timeouts) are retried with backoff and then
+        retried against each of the client's fallback_models in turn. For
+        streams only opening the stream is retried.
         """
         model_to_use = model or self.model
+        if stream:
+            # Have the final chunk carry token usage so streams are metered
+            kwargs.setdefault("stream_options", {"include_usage": True})
 
-        completion = self._client.chat.completions.create(
-            model=model_to_use, messages=messages, stream=stream, **kwargs
+        cache_key = request_cache_key(
+            self.cache, model_to_use, messages, stream, use_cache, kwargs
+        )
+        timer = self.recorder.start(
+            model_to_use, stream, "bypass" if cache_key is None else "miss"
         )
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                timer.cache = "hit"
+                timer.finish()
+                return cached
+
+        try:
+            completion = call_with_retries(
+                lambda model: self._client.chat.completions.create(
+                    model=model, messages=messages, stream=stream, **kwargs
+                ),
+                _model_chain(model_to_use, self.fallback_models),
+                self.retry_policy,
+                self.rate_limiter,
+            )
+        except Exception as e:
+            timer.finish(error=e)
+            raise
 
         if stream:
-            return completion
-        else:
-            return completion.choices[0].message.content
+            return InstrumentedStream(completion, timer)
+
+        timer.finish(completion.model, completion.usage)
+        content = completion.choices[0].message.content
+        if cache_key is not None and content is not None:
+            self.cache.set(cache_key, content)
+        return content
 
     def complete(self, prompt: str, model: str = None, **kwargs) -> str:
         """
@@ -61,3 +135,232 @@ class OpenRouterClient:
         """
         messages = [{"role": "user", "content": prompt}]
         return self.chat(messages, model=model, **kwargs)
+
+
+def _model_chain(model, fallback_models):
+    return [model] + [m for m in fallback_models if m != model]
+
+
+def get_default_client() -> OpenRouterClient:
+    """
+    Return a process-wide OpenRouterClient so request handlers share one
+    connection pool (and one rate limiter) instead of building a client per
+    request. OPENROUTER_FALLBACK_MODELS (comma-separated) and
+    OPENROUTER_RATE_LIMIT (requests per second) configure it. Deterministic
+    requests are answered from the shared response cache; see
+    configure_response_cache.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            fallback_models = [
+                model.strip()
+                for model in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",")
+                if model.strip()
+            ]
+            rate_limit = os.getenv("OPENROUTER_RATE_LIMIT")
+            _default_client = OpenRouterClient(
+                cache=get_response_cache(),
+                fallback_models=fallback_models,
+                rate_limiter=TokenBucket(float(rate_limit)) if rate_limit else None,
+            )
+        return _default_client
+
+
+class AsyncOpenRouterClient:
+    """
+    Asynchronous counterpart to OpenRouterClient for fan-out workloads such as
+    classifying a batch of emails.
+
+    Every request made through a client shares one semaphore, so at most
+    `max_concurrency` calls are in flight at once however many are gathered.
+    Each call is bounded by `timeout` seconds (overridable per request).
+    Create one client per event loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "https://openrouter.ai/api/v1",
+        default_model: str = "meta-llama/llama-3.3-70b-instruct",
+        api_key: str = os.getenv("OPENROUTER_API_KEY"),
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+        cache: ResponseCache = None,
+        retry_policy: RetryPolicy = None,
+        fallback_models: list = None,
+        rate_limiter: TokenBucket = None,
+        recorder: CallRecorder = None,
+    ):
+
+        self.model = default_model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.fallback_models = list(fallback_models or [])
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder or get_recorder()
+
+        if not self.api_key:
+            raise ValueError(
+                "No API key provided, and OPENROUTER_API_KEY is not set in the environment"
+            )
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = AsyncOpenAI(
+            base_url=self.base_url,
+            api_key=self.api_key,
+            timeout=self.timeout,
+            max_retries=0,
+        )
+
+    async def chat(
+        self,
+        messages,
+        model: str = None,
+        stream: bool = False,
+        timeout: float = None,
+        use_cache: bool = None,
+        **kwargs,
+    ):
+        """
+        Async version of OpenRouterClient.chat. With stream=True this returns
+        an async iterator of chunks, which holds its concurrency slot until it
+        is exhausted or closed.
+
+        The timeout applies to each attempt; retries and model fallbacks
+        follow the client's retry_policy. Backoff sleeps do not hold a
+        concurrency slot.
+        """
+        model_to_use = model or self.model
+        timeout = timeout or self.timeout
+
+        if stream:
+            return self._stream(model_to_use, messages, timeout, **kwargs)
+
+        cache_key = request_cache_key(
+            self.cache, model_to_use, messages, stream, use_cache, kwargs
+        )
+        timer = self.recorder.start(
+            model_to_use, cache="bypass" if cache_key is None else "miss"
+        )
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                timer.cache = "hit"
+                timer.finish()
+                return cached
+
+        async def request(model):
+            async with self._semaphore:
+                return await asyncio.wait_for(
+                    self._client.chat.completions.create(
+                        model=model, messages=messages, **kwargs
+                    ),
+                    timeout,
+                )
+
+        try:
+            completion = await async_call_with_retries(
+                request,
+                _model_chain(model_to_use, self.fallback_models),
+                self.retry_policy,
+                self.rate_limiter,
+            )
+        except Exception as e:
+            timer.finish(error=e)
+            raise
+
+        timer.finish(completion.model, completion.usage)
+        content = completion.choices[0].message.content
+        if cache_key is not None and content is not None:
+            self.cache.set(cache_key, content)
+        return content
+
+    async def _stream(self, model, messages, timeout, **kwargs):
+        timer = self.recorder.start(model, stream=True)
+        served_by, usage = None, None
+        # Have the final chunk carry token usage so streams are metered
+        kwargs.setdefault("stream_options", {"include_usage": True})
+
+        async def open_stream(model):
+            # Each attempt takes its own slot, so backoff sleeps between
+            # attempts don't hold one. A successful attempt keeps its slot
+            # until the stream is finished.
+            await self._semaphore.acquire()
+            try:
+                # The timeout bounds the wait for the response to start
+                return await asyncio.wait_for(
+                    self._client.chat.completions.create(
+                        model=model, messages=messages, stream=True, **kwargs
+                    ),
+                    timeout,
+                )
+            except BaseException:
+                self._semaphore.release()
+                raise
+
+        completion = None
+        try:
+            completion = await async_call_with_retries(
+                open_stream,
+                _model_chain(model, self.fallback_models),
+                self.retry_policy,
+                self.rate_limiter,
+            )
+            async with completion:
+                async for chunk in completion:
+                    served_by = chunk.model or served_by
+                    usage = getattr(chunk, "usage", None) or usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        timer.first_token()
+                    yield chunk
+        except Exception as e:
+            timer.finish(served_by, usage, error=e)
+            raise
+        finally:
+            if completion is not None:
+                self._semaphore.release()
+            timer.finish(served_by, usage)
+
+    async def complete(self, prompt: str, model: str = None, **kwargs) -> str:
+        """
+        Async version of OpenRouterClient.complete
+        """
+        messages = [{"role": "user", "content": prompt}]
+        return await self.chat(messages, model=model, **kwargs)
+
+    async def chat_many(
+        self,
+        messages_list,
+        model: str = None,
+        return_exceptions: bool = False,
+        **kwargs,
+    ):
+        """
+        Run a chat request for each message list concurrently, bounded by the
+        client's concurrency limit. Results are returned in input order; with
+        return_exceptions=True failed requests yield their exception instead of
+        cancelling the batch.
+        """
+        return await asyncio.gather(
+            *(self.chat(messages, model=model, **kwargs) for messages in messages_list),
+            return_exceptions=return_exceptions,
+        )
+
+    async def complete_many(self, prompts, model: str = None, **kwargs):
+        """
+        Batch version of complete; see chat_many
+        """
+        messages_list = [[{"role": "user", "content": prompt}] for prompt in prompts]
+        return await self.chat_many(messages_list, model=model, **kwargs)
+
+    async def close(self):
+        await self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,275 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+from backend.extensions import create_logger, db
+from backend.models import ScheduleJob
+from backend.src.schedule_metrics import ScheduleMetrics, record_run
+from backend.src.scheduler import ScheduleCancelled, generate_schedule, save_schedule
+
+logger = create_logger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_executor = None
+_lock = threading.Lock()
+
+# (start_date, end_date) -> id of the job queued or running for that window
+_active_jobs = {}
+# job id -> threading.Event that is set once cancellation is requested
+_cancel_events = {}
+# job id -> window of each job that is generating or saving a schedule. A job
+# only starts once no running job's window overlaps its own, since each one
+# rewrites the scheduled tasks in its range and places tasks the other may
+# also place. Notified whenever a job finishes or is cancelled.
+_running_windows = {}
+_window_free = threading.Condition(_lock)
+
+
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get("SCHEDULE_JOB_WORKERS", 2),
+            thread_name_prefix="schedule-job",
+        )
+    return _executor
+
+
+def _update_job(job_id, **values):
+    """
+    Write job state on its own connection so the worker's ORM session (and the
+    tasks it has loaded) is not expired by progress updates
+    """
+    table = ScheduleJob.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(table.c.id == job_id).values(**values))
+
+
+def _normalize_window(start_date, end_date):
+    """
+    Widen a window to whole days. The scheduler plans whole days anyway, and
+    requests that default to the current time then share a window.
+    """
+    return (
+        datetime.combine(start_date.date(), datetime.min.time()),
+        datetime.combine(end_date.date(), datetime.max.time()),
+    )
+
+
+def _overlaps(window, other):
+    return window[0] <= other[1] and other[0] <= window[1]
+
+
+def _claim_window(job_id, window, cancel_event):
+    """Wait until no running job overlaps the window, then hold it"""
+    with _window_free:
+        _window_free.wait_for(
+            lambda: cancel_event.is_set()
+            or not any(_overlaps(window, other) for other in _running_windows.values())
+        )
+        if cancel_event.is_set():
+            raise ScheduleCancelled()
+        _running_windows[job_id] = window
+
+
+def _cancel_requested(job_id):
+    table = ScheduleJob.__table__
+    with db.engine.connect() as conn:
+        return bool(
+            conn.execute(
+                db.select(table.c.cancel_requested).where(table.c.id == job_id)
+            ).scalar()
+        )
+
+
+def submit_schedule_job(start_date, end_date, parallel=False):
+    """
+    Queue schedule generation for a date range on the background worker pool
+
+    The window is widened to whole days. Requests for a window that already
+    has a queued or running job in this process are merged into that job
+    rather than starting a second one; a job whose window overlaps a running
+    one waits for it to finish.
+
+    Args:
+        start_date (datetime): Start date for the scheduling period
+        end_date (datetime): End date for the scheduling period
+        parallel (bool): Solve week-sized windows in a process pool, for
+            periods of at least SCHEDULE_PARALLEL_MIN_DAYS days
+
+    Returns:
+        tuple: (ScheduleJob, created) where created is False if the request was
+        merged into an existing job
+    """
+    app = current_app._get_current_object()
+    window = _normalize_window(start_date, end_date)
+    start_date, end_date = window
+
+    with _lock:
+        job_id = _active_jobs.get(window)
+        if job_id is not None:
+            job = db.session.get(ScheduleJob, job_id)
+            if (
+                job is not None
+                and job.status in ACTIVE_STATUSES
+                and not job.cancel_requested
+            ):
+                return job, False
+
+        job = ScheduleJob(
+            start_date=start_date, end_date=end_date, status="queued", progress={}
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        _active_jobs[window] = job.id
+        _cancel_events[job.id] = threading.Event()
+        _get_executor(app).submit(_run_job, app, job.id, window, parallel)
+
+    logger.info(f"Queued schedule job {job.id} for {start_date} to {end_date}")
+    return job, True
+
+
+def cancel_schedule_job(job):
+    """
+    Request cancellation of a queued or running job
+
+    The worker stops at its next placement; a job that has not started yet is
+    marked cancelled as soon as a worker picks it up, or as soon as it is
+    cancelled if it is waiting for an overlapping job. The job holds on to its
+    window until it has actually stopped, so a new job for the same window
+    only starts once the cancelled one is done.
+
+    Returns:
+        bool: False if the job had already finished
+    """
+    if job.status not in ACTIVE_STATUSES:
+        return False
+
+    job.cancel_requested = True
+    db.session.commit()
+
+    with _lock:
+        event = _cancel_events.get(job.id)
+
+    if event is not None:
+        event.set()
+        # Wake the job if it is waiting for an overlapping one
+        with _window_free:
+            _window_free.notify_all()
+
+    return True
+
+
+def _run_job(app, job_id, window, parallel=False):
+    with app.app_context():
+        with _lock:
+            cancel_event = _cancel_events.get(job_id) or threading.Event()
+
+        interval = app.config.get("SCHEDULE_JOB_PROGRESS_INTERVAL", 1.0)
+        progress = {}
+        last_flush = [time.monotonic()]
+
+        def on_progress(stage, placed, total):
+            progress[stage] = {"placed": placed, "total": total}
+            now = time.monotonic()
+            if now - last_flush[0] >= interval:
+                last_flush[0] = now
+                _update_job(job_id, progress=dict(progress))
+                # Picks up cancellations requested from another process
+                if _cancel_requested(job_id):
+                    cancel_event.set()
+
+        try:
+            _claim_window(job_id, window, cancel_event)
+            if cancel_event.is_set() or _cancel_requested(job_id):
+                raise ScheduleCancelled()
+
+            _update_job(job_id, status="running", started_at=datetime.utcnow())
+
+            start_date, end_date = window
+            metrics = ScheduleMetrics()
+            scheduled_tasks = generate_schedule(
+                start_date,
+                end_date,
+                progress_callback=on_progress,
+                should_cancel=cancel_event.is_set,
+                metrics=metrics,
+                parallel=parallel,
+                max_workers=app.config.get("SCHEDULE_PARALLEL_WORKERS"),
+                parallel_min_days=app.config.get("SCHEDULE_PARALLEL_MIN_DAYS"),
+            )
+            with metrics.phase("persistence"):
+                tasks_scheduled = save_schedule(start_date, end_date, scheduled_tasks)
+            record_run(metrics)
+
+            _update_job(
+                job_id,
+                status="done",
+                progress=dict(progress),
+                result={
+                    "tasks_scheduled": tasks_scheduled,
+                    "metrics": metrics.to_dict(),
+                },
+                finished_at=datetime.utcnow(),
+            )
+            logger.info(f"Schedule job {job_id} scheduled {tasks_scheduled} tasks")
+        except ScheduleCancelled:
+            db.session.rollback()
+            _update_job(
+                job_id,
+                status="cancelled",
+                progress=dict(progress),
+                finished_at=datetime.utcnow(),
+            )
+            logger.info(f"Schedule job {job_id} cancelled")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Schedule job {job_id} failed: {str(e)}")
+            _update_job(
+                job_id,
+                status="failed",
+                progress=dict(progress),
+                error=str(e),
+                finished_at=datetime.utcnow(),
+            )
+        finally:
+            with _window_free:
+                if _active_jobs.get(window) == job_id:
+                    _active_jobs.pop(window)
+                _cancel_events.pop(job_id, None)
+                _running_windows.pop(job_id, None)
+                _window_free.notify_all()
+            db.session.remove()
+
+
+def fail_interrupted_jobs():
+    """
+    Mark jobs left queued or running by a previous process as failed. Their
+    workers died with that process, so nothing would ever finish them. Call
+    at startup, before any jobs are submitted.
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    table = ScheduleJob.__table__
+    if not db.inspect(db.engine).has_table(table.name):
+        return 0
+
+    with db.engine.begin() as conn:
+        count = conn.execute(
+            table.update()
+            .where(table.c.status.in_(ACTIVE_STATUSES))
+            .values(
+                status="failed",
+                error="Interrupted by a server restart",
+                finished_at=datetime.utcnow(),
+            )
+        ).rowcount
+    if count:
+        logger.warning(f"Marked {count} interrupted schedule jobs as failed")
+    return count
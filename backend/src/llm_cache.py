@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Request options that don't change the response and so are left out of keys
+IGNORED_KWARGS = {"stream", "timeout", "extra_headers", "user"}
+
+
+def make_cache_key(model, messages, kwargs):
+    """Hash the model, messages and response-affecting kwargs of a request"""
+    relevant = {k: v for k, v in kwargs.items() if k not in IGNORED_KWARGS}
+    payload = json.dumps(
+        {"model": model, "messages": messages, "kwargs": relevant},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_cache_key(cache, model, messages, stream, use_cache, kwargs):
+    """
+    Return the cache key for a chat request, or None if it shouldn't be cached
+
+    Streams are never cached. use_cache=None caches only deterministic
+    requests (temperature=0), True always caches and False opts out.
+    """
+    if cache is None or stream or use_cache is False:
+        return None
+    if use_cache is None and kwargs.get("temperature") != 0:
+        return None
+    return make_cache_key(model, messages, kwargs)
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache with an optional TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    On-disk cache that survives restarts and is shared between processes.
+    Entries expire after `ttl` seconds; once the stored responses exceed
+    `max_bytes` the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl: float = None, max_bytes: int = 50 * 2**20):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed_at "
+                "ON llm_responses (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return json.loads(value)
+
+    def set(self, key, value):
+        now = time.time()
+        data = json.dumps(value)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.ttl is not None:
+            conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,)
+            )
+
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until back under the limit
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM llm_responses ORDER BY accessed_at"
+        ):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM llm_responses WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM llm_responses")
+
+
+class ResponseCache:
+    """
+    Two-tier response cache for LLM calls: an in-memory LRU in front of an
+    optional SQLite tier. Disk hits are promoted to memory.
+
+    By default OpenRouterClient only consults the cache for deterministic
+    requests (temperature=0); see OpenRouterClient.chat.
+    """
+
+    def __init__(self, memory: MemoryCache = None, disk: SQLiteCache = None):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(memory_hits=1)
+            return value
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count(disk_hits=1)
+                return value
+
+        self._count()
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def _count(self, memory_hits=0, disk_hits=0):
+        with self._lock:
+            if memory_hits or disk_hits:
+                self.hits += 1
+                self.memory_hits += memory_hits
+                self.disk_hits += disk_hits
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_response_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache used by the default client"""
+    return _response_cache
+
+
+def configure_response_cache(config):
+    """
+    Set up the default response cache's tiers from app config: an in-memory
+    LRU of LLM_CACHE_MAX_ENTRIES entries, plus a SQLite tier at LLM_CACHE_DB
+    if it is set. Entries expire after LLM_CACHE_TTL seconds if that is set.
+    Hit and miss counts carry over when the app is created again.
+    """
+    ttl = config.get("LLM_CACHE_TTL")
+    _response_cache.memory = MemoryCache(
+        max_entries=config.get("LLM_CACHE_MAX_ENTRIES", 1024), ttl=ttl
+    )
+    path = config.get("LLM_CACHE_DB")
+    _response_cache.disk = SQLiteCache(path, ttl=ttl) if path else None
@@ -0,0 +1,357 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from backend.extensions import create_logger
+
+logger = create_logger(__name__)
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class LLMCall:
+    """Timing, token usage and cache status of one LLM request"""
+
+    model: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    ttft_ms: Optional[float] = None
+    latency_ms: float = 0.0
+    cache: str = "bypass"  # hit, miss or bypass (not cacheable)
+    stream: bool = False
+    error: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+
+    def to_dict(self):
+        data = asdict(self)
+        data["timestamp"] = self.timestamp.isoformat()
+        return data
+
+
+class LogSink:
+    """Write each call to the application log"""
+
+    def emit(self, call):
+        tokens = f"{call.prompt_tokens}+{call.completion_tokens} tokens"
+        ttft = f", ttft {call.ttft_ms:.0f} ms" if call.ttft_ms is not None else ""
+        status = f", error {call.error}" if call.error else ""
+        logger.info(
+            f"LLM call {call.model}: {call.latency_ms:.0f} ms{ttft}, {tokens}, "
+            f"cache {call.cache}{status}"
+        )
+
+
+class SQLiteSink:
+    """Append each call to an llm_calls table for offline analysis"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    ttft_ms REAL,
+                    latency_ms REAL NOT NULL,
+                    cache TEXT NOT NULL,
+                    stream INTEGER NOT NULL,
+                    error TEXT
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def emit(self, call):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO llm_calls (timestamp, model, prompt_tokens, "
+                "completion_tokens, ttft_ms, latency_ms, cache, stream, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    call.timestamp.isoformat(),
+                    call.model,
+                    call.prompt_tokens,
+                    call.completion_tokens,
+                    call.ttft_ms,
+                    call.latency_ms,
+                    call.cache,
+                    int(call.stream),
+                    call.error,
+                ),
+            )
+
+
+class PrometheusSink:
+    """
+    Aggregate calls into counters and latency histograms that render in the
+    Prometheus text exposition format (see GET /api/llm/metrics)
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)  # (model, cache, status) -> count
+        self._tokens = defaultdict(int)  # (model, kind) -> count
+        self._latency = {}  # model -> histogram
+        self._ttft = {}  # model -> histogram
+
+    def _observe(self, histograms, model, seconds):
+        histogram = histograms.setdefault(
+            model, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+    def emit(self, call):
+        status = "error" if call.error else "ok"
+        with self._lock:
+            self._requests[(call.model, call.cache, status)] += 1
+            if call.prompt_tokens:
+                self._tokens[(call.model, "prompt")] += call.prompt_tokens
+            if call.completion_tokens:
+                self._tokens[(call.model, "completion")] += call.completion_tokens
+            self._observe(self._latency, call.model, call.latency_ms / 1000)
+            if call.ttft_ms is not None:
+                self._observe(self._ttft, call.model, call.ttft_ms / 1000)
+
+    def _render_histogram(self, lines, name, histograms):
+        for model, histogram in sorted(histograms.items()):
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                lines.append(
+                    f'{name}_bucket{{model="{_escape(model)}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{name}_bucket{{model="{_escape(model)}",le="+Inf"}} '
+                f'{histogram["count"]}'
+            )
+            lines.append(f'{name}_sum{{model="{_escape(model)}"}} {histogram["sum"]}')
+            lines.append(
+                f'{name}_count{{model="{_escape(model)}"}} {histogram["count"]}'
+            )
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP llm_requests_total LLM requests by model, cache status and outcome",
+                "# TYPE llm_requests_total counter",
+            ]
+            for (model, cache, status), count in sorted(self._requests.items()):
+                lines.append(
+                    f'llm_requests_total{{model="{_escape(model)}",cache="{cache}",'
+                    f'status="{status}"}} {count}'
+                )
+
+            lines += [
+                "# HELP llm_tokens_total Tokens consumed by model and kind",
+                "# TYPE llm_tokens_total counter",
+            ]
+            for (model, kind), count in sorted(self._tokens.items()):
+                lines.append(
+                    f'llm_tokens_total{{model="{_escape(model)}",kind="{kind}"}} {count}'
+                )
+
+            lines += [
+                "# HELP llm_request_latency_seconds Total LLM request latency",
+                "# TYPE llm_request_latency_seconds histogram",
+            ]
+            self._render_histogram(lines, "llm_request_latency_seconds", self._latency)
+
+            lines += [
+                "# HELP llm_time_to_first_token_seconds Time to the first streamed token",
+                "# TYPE llm_time_to_first_token_seconds histogram",
+            ]
+            self._render_histogram(
+                lines, "llm_time_to_first_token_seconds", self._ttft
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def render_cache_metrics(stats) -> str:
+    """Render ResponseCache.stats() in Prometheus text format"""
+    lines = [
+        "# HELP llm_cache_hits_total Response cache hits by tier",
+        "# TYPE llm_cache_hits_total counter",
+        f'llm_cache_hits_total{{tier="memory"}} {stats["memory_hits"]}',
+        f'llm_cache_hits_total{{tier="disk"}} {stats["disk_hits"]}',
+        "# HELP llm_cache_misses_total Response cache misses",
+        "# TYPE llm_cache_misses_total counter",
+        f'llm_cache_misses_total {stats["misses"]}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CallRecorder:
+    """
+    Fans completed LLM calls out to a set of sinks. A sink is any object with
+    an emit(call) method; a failing sink is logged and never breaks the call.
+    """
+
+    def __init__(self, sinks=None):
+        self._sinks = list(sinks or [])
+        self._lock = threading.Lock()
+
+    @property
+    def sinks(self):
+        with self._lock:
+            return list(self._sinks)
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    def set_sinks(self, sinks):
+        with self._lock:
+            self._sinks = list(sinks)
+
+    def get_sink(self, sink_type):
+        for sink in self.sinks:
+            if isinstance(sink, sink_type):
+                return sink
+        return None
+
+    def emit(self, call):
+        for sink in self.sinks:
+            try:
+                sink.emit(call)
+            except Exception as e:
+                logger.error(f"LLM metrics sink {sink.__class__.__name__} failed: {e}")
+
+    def start(self, model, stream=False, cache="bypass"):
+        return CallTimer(self, model, stream, cache)
+
+
+class CallTimer:
+    """Times one request and emits an LLMCall when finished"""
+
+    def __init__(self, recorder, model, stream=False, cache="bypass"):
+        self.recorder = recorder
+        self.model = model
+        self.stream = stream
+        self.cache = cache
+        self.ttft_ms = None
+        self._start = time.perf_counter()
+        self._finished = False
+
+    def first_token(self):
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self._start) * 1000
+
+    def finish(self, model=None, usage=None, error=None):
+        if self._finished:
+            return
+        self._finished = True
+        self.recorder.emit(
+            LLMCall(
+                model=model or self.model,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                ttft_ms=self.ttft_ms,
+                latency_ms=(time.perf_counter() - self._start) * 1000,
+                cache=self.cache,
+                stream=self.stream,
+                error=error.__class__.__name__ if error is not None else None,
+            )
+        )
+
+
+class InstrumentedStream:
+    """
+    Wraps a streamed completion, timing the first content chunk and reading
+    token usage from the final chunk. The call is recorded when the stream is
+    exhausted, fails or is closed early.
+    """
+
+    def __init__(self, completion, timer):
+        self._completion = completion
+        self._timer = timer
+        self._model = None
+        self._usage = None
+
+    def __iter__(self):
+        try:
+            for chunk in self._completion:
+                self._observe(chunk)
+                yield chunk
+        except Exception as e:
+            self._timer.finish(self._model, self._usage, error=e)
+            raise
+        self._timer.finish(self._model, self._usage)
+
+    def _observe(self, chunk):
+        self._model = getattr(chunk, "model", None) or self._model
+        if getattr(chunk, "usage", None) is not None:
+            self._usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            self._timer.first_token()
+
+    def close(self):
+        self._timer.finish(self._model, self._usage)
+        close = getattr(self._completion, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_recorder = CallRecorder([PrometheusSink()])
+
+
+def get_recorder() -> CallRecorder:
+    """Return the process-wide recorder LLM clients report to by default"""
+    return _recorder
+
+
+def configure_recorder(config):
+    """
+    Set the default recorder's sinks from app config. LLM_METRICS_SINKS is a
+    comma-separated list of log, sqlite and prometheus; the SQLite sink
+    writes to LLM_METRICS_DB.
+    """
+    sinks = []
+    names = [name.strip() for name in config.get("LLM_METRICS_SINKS", "").split(",")]
+    if "log" in names:
+        sinks.append(LogSink())
+    if "sqlite" in names:
+        sinks.append(SQLiteSink(config["LLM_METRICS_DB"]))
+    if "prometheus" in names:
+        # Keep accumulated counters when the app is created again
+        sinks.append(_recorder.get_sink(PrometheusSink) or PrometheusSink())
+    _recorder.set_sinks(sinks)
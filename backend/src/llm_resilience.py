@@ -0,0 +1,189 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import openai
+
+from backend.extensions import create_logger
+
+logger = create_logger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for client-side rate limiting. Share one bucket
+    between clients (or threads) that draw on the same upstream quota.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum burst size (defaults to rate, at least 1)
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        """Take tokens if available; otherwise return seconds until they will be"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: float = None) -> bool:
+        """Block until tokens are available; False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1) -> bool:
+        """Like acquire, but yields to the event loop while waiting"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0:
+                return True
+            await asyncio.sleep(wait)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient OpenRouter errors
+    (rate limits, timeouts, connection errors and 5xx responses). A
+    Retry-After header on the error takes precedence over the backoff.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: bool = True,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def is_retryable(self, error) -> bool:
+        if isinstance(
+            error,
+            (openai.APIConnectionError, openai.APITimeoutError, asyncio.TimeoutError),
+        ):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES
+        return False
+
+    def delay(self, attempt: int, error=None) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+def _retry_after(error):
+    """Seconds to wait according to the error's Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retries(request, models, policy, rate_limiter=None):
+    """
+    Call request(model) with retries, falling back through models
+
+    Each model is retried with backoff on transient errors; once its retries
+    are exhausted the next model in the list is tried. Non-transient errors
+    are raised immediately.
+    """
+    last_error = None
+    for model in models:
+        for attempt in range(policy.max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            try:
+                return request(model)
+            except Exception as e:
+                if not policy.is_retryable(e):
+                    raise
+                last_error = e
+                if attempt == policy.max_retries:
+                    break
+                delay = policy.delay(attempt, e)
+                logger.warning(
+                    f"LLM request to {model} failed ({e.__class__.__name__}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                time.sleep(delay)
+        logger.warning(f"Giving up on {model} after {policy.max_retries} retries")
+    raise last_error
+
+
+async def async_call_with_retries(request, models, policy, rate_limiter=None):
+    """Async version of call_with_retries; request(model) returns an awaitable"""
+    last_error = None
+    for model in models:
+        for attempt in range(policy.max_retries + 1):
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async()
+            try:
+                return await request(model)
+            except Exception as e:
+                if not policy.is_retryable(e):
+                    raise
+                last_error = e
+                if attempt == policy.max_retries:
+                    break
+                delay = policy.delay(attempt, e)
+                logger.warning(
+                    f"LLM request to {model} failed ({e.__class__.__name__}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+        logger.warning(f"Giving up on {model} after {policy.max_retries} retries")
+    raise last_error
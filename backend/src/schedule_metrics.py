@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Number of recent runs kept for the rolling metrics endpoint
+ROLLING_WINDOW = 100
+
+_recent_runs = deque(maxlen=ROLLING_WINDOW)
+_recent_runs_lock = threading.Lock()
+
+
+class ScheduleMetrics:
+    """
+    Phase timings and placement counters collected during one schedule
+    generation, so slow runs can be attributed to the database or the algorithm
+    """
+
+    def __init__(self):
+        self.phases = {}  # phase name -> seconds
+        self.slot_scans = 0
+        self.tasks_scheduled = 0
+        self.unscheduled = {}  # (task_id, reason) -> occurrences
+        self.deadline_misses = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def add_unscheduled(self, task_id, reason):
+        key = (task_id, reason)
+        self.unscheduled[key] = self.unscheduled.get(key, 0) + 1
+
+    def add_deadline_miss(self, task_id, due_by, end):
+        self.deadline_misses.append(
+            {"task_id": task_id, "due_by": due_by.isoformat(), "end": end.isoformat()}
+        )
+
+    def merge_counters(self, other):
+        """Add the placement counters of a run over part of the period"""
+        self.slot_scans += other.slot_scans
+        for key, count in other.unscheduled.items():
+            self.unscheduled[key] = self.unscheduled.get(key, 0) + count
+        self.deadline_misses += other.deadline_misses
+
+    def to_dict(self):
+        return {
+            "phases_ms": {
+                name: round(seconds * 1000, 3) for name, seconds in self.phases.items()
+            },
+            "total_ms": round(sum(self.phases.values()) * 1000, 3),
+            "slot_scans": self.slot_scans,
+            "tasks_scheduled": self.tasks_scheduled,
+            "unscheduled": [
+                {"task_id": task_id, "reason": reason, "count": count}
+                for (task_id, reason), count in self.unscheduled.items()
+            ],
+            "deadline_misses": self.deadline_misses,
+        }
+
+
+def record_run(metrics):
+    """Add a finished run to the rolling window served by the metrics endpoint"""
+    run = metrics.to_dict()
+    run["recorded_at"] = datetime.utcnow().isoformat()
+    with _recent_runs_lock:
+        _recent_runs.append(run)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def rolling_summary():
+    """
+    Summarize the most recent runs recorded in this process
+
+    Returns:
+        dict: Run count, per-phase mean/p95/max in milliseconds, mean counters
+        and the latest run
+    """
+    with _recent_runs_lock:
+        runs = list(_recent_runs)
+
+    if not runs:
+        return {"runs": 0, "phases_ms": {}, "last_run": None}
+
+    phase_values = {}
+    for run in runs:
+        for name, ms in run["phases_ms"].items():
+            phase_values.setdefault(name, []).append(ms)
+        phase_values.setdefault("total", []).append(run["total_ms"])
+
+    def mean(values):
+        return round(sum(values) / len(values), 3)
+
+    return {
+        "runs": len(runs),
+        "phases_ms": {
+            name: {
+                "mean": mean(values),
+                "p95": _percentile(values, 95),
+                "max": max(values),
+            }
+            for name, values in phase_values.items()
+        },
+        "slot_scans": mean([run["slot_scans"] for run in runs]),
+        "tasks_scheduled": mean([run["tasks_scheduled"] for run in runs]),
+        "unscheduled": mean(
+            [sum(item["count"] for item in run["unscheduled"]) for run in runs]
+        ),
+        "deadline_misses": mean([len(run["deadline_misses"]) for run in runs]),
+        "last_run": runs[-1],
+    }
@@ -0,0 +1,216 @@
+import copy
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime, time
+from time import monotonic
+from typing import Optional
+
+from backend.extensions import create_logger, db
+from backend.models import CalendarEvent, Task, TaskDependency
+
+logger = create_logger(__name__)
+
+# Seconds before a snapshot is reloaded even without an explicit invalidation,
+# which bounds staleness from writes made by other processes
+DEFAULT_SNAPSHOT_TTL = 300
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class TaskSnapshot:
+    """Detached copy of the Task fields the scheduler reads"""
+
+    id: str
+    content: str
+    duration: int
+    task_type: str
+    due_by: Optional[datetime] = None
+    recurrence: Optional[dict] = None
+    time_window_start: Optional[time] = None
+    time_window_end: Optional[time] = None
+
+    @classmethod
+    def from_task(cls, task):
+        return cls(
+            id=task.id,
+            content=task.content,
+            duration=task.duration,
+            task_type=task.task_type,
+            due_by=task.due_by,
+            recurrence=task.recurrence,
+            time_window_start=task.time_window_start,
+            time_window_end=task.time_window_end,
+        )
+
+
+@dataclass(frozen=True)
+class EventSnapshot:
+    """Detached copy of a calendar event's busy interval"""
+
+    id: str
+    subject: str
+    start: datetime
+    end: datetime
+
+
+class ScheduleSnapshot:
+    """
+    In-memory copy of the schedulable tasks and calendar
+
+    Previews apply overrides to a copy of the snapshot and run the pure
+    scheduler against it, so no database reads or writes are needed.
+    """
+
+    def __init__(self, one_off_tasks, recurring_tasks, task_dependencies, events):
+        # Dicts keep insertion order, which preserves the load order below
+        self.one_off_tasks = {task.id: task for task in one_off_tasks}
+        self.recurring_tasks = {task.id: task for task in recurring_tasks}
+        self.task_dependencies = task_dependencies
+        self.events = {event.id: event for event in events}
+        self.loaded_at = datetime.utcnow()
+        self._loaded_monotonic = monotonic()
+
+    @classmethod
+    def load(cls):
+        one_off_tasks = (
+            Task.query.filter(Task.task_type == "one-off", Task.is_completed == False)
+            .order_by(Task.due_by.asc().nullslast())
+            .all()
+        )
+        recurring_tasks = Task.query.filter(
+            Task.task_type == "recurring", Task.is_active == True
+        ).all()
+
+        task_dependencies = {}
+        for task_id, dependency_id in db.session.query(
+            TaskDependency.task_id, TaskDependency.dependency_id
+        ):
+            task_dependencies.setdefault(task_id, []).append(dependency_id)
+
+        events = CalendarEvent.query.order_by(CalendarEvent.start).all()
+
+        return cls(
+            [TaskSnapshot.from_task(task) for task in one_off_tasks],
+            [TaskSnapshot.from_task(task) for task in recurring_tasks],
+            task_dependencies,
+            [
+                EventSnapshot(event.id, event.subject, event.start, event.end)
+                for event in events
+            ],
+        )
+
+    def age(self):
+        return monotonic() - self._loaded_monotonic
+
+    def copy(self):
+        clone = copy.copy(self)
+        clone.one_off_tasks = dict(self.one_off_tasks)
+        clone.recurring_tasks = dict(self.recurring_tasks)
+        clone.task_dependencies = {
+            task_id: list(deps) for task_id, deps in self.task_dependencies.items()
+        }
+        clone.events = dict(self.events)
+        return clone
+
+    def add_task(self, task, dependencies=None):
+        if task.task_type == "one-off":
+            self.one_off_tasks[task.id] = task
+            self.task_dependencies[task.id] = list(dependencies or [])
+        else:
+            self.recurring_tasks[task.id] = task
+
+    def update_task(self, task_id, **fields):
+        for tasks in (self.one_off_tasks, self.recurring_tasks):
+            if task_id in tasks:
+                tasks[task_id] = replace(tasks[task_id], **fields)
+                return
+        raise KeyError(task_id)
+
+    def set_dependencies(self, task_id, dependencies):
+        if task_id not in self.one_off_tasks:
+            raise KeyError(task_id)
+        self.task_dependencies[task_id] = list(dependencies)
+
+    def remove_task(self, task_id):
+        if task_id in self.one_off_tasks:
+            del self.one_off_tasks[task_id]
+        elif task_id in self.recurring_tasks:
+            del self.recurring_tasks[task_id]
+        else:
+            raise KeyError(task_id)
+        self.task_dependencies.pop(task_id, None)
+        # Mirror the ON DELETE CASCADE on task_dependencies.dependency_id
+        for dependent_id, deps in self.task_dependencies.items():
+            if task_id in deps:
+                self.task_dependencies[dependent_id] = [
+                    dep for dep in deps if dep != task_id
+                ]
+
+    def add_event(self, event):
+        self.events[event.id] = event
+
+    def move_event(self, event_id, start, end):
+        self.events[event_id] = replace(self.events[event_id], start=start, end=end)
+
+    def remove_event(self, event_id):
+        del self.events[event_id]
+
+    def schedule_inputs(self, start_date, end_date):
+        """
+        Select the same inputs generate_schedule would load from the database
+
+        Returns:
+            tuple: (one_off_tasks, recurring_tasks, task_dependencies, busy_slots)
+        """
+        one_off_tasks = sorted(
+            (
+                task
+                for task in self.one_off_tasks.values()
+                if task.due_by is None or task.due_by <= end_date
+            ),
+            key=lambda task: (task.due_by is None, task.due_by or datetime.min),
+        )
+        busy_slots = [
+            (event.start, event.end)
+            for event in self.events.values()
+            if event.end >= start_date and event.start <= end_date
+        ]
+        task_dependencies = {
+            task.id: self.task_dependencies.get(task.id, []) for task in one_off_tasks
+        }
+        return (
+            one_off_tasks,
+            list(self.recurring_tasks.values()),
+            task_dependencies,
+            busy_slots,
+        )
+
+    def get_task(self, task_id):
+        return self.one_off_tasks.get(task_id) or self.recurring_tasks.get(task_id)
+
+
+def get_snapshot(ttl=DEFAULT_SNAPSHOT_TTL):
+    """
+    Return the warm snapshot, loading it from the database if it is missing,
+    invalidated or older than ttl seconds. Callers must not mutate it; use
+    ScheduleSnapshot.copy() before applying overrides.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.age() > ttl:
+            _snapshot = ScheduleSnapshot.load()
+            logger.info(
+                f"Loaded schedule snapshot with "
+                f"{len(_snapshot.one_off_tasks) + len(_snapshot.recurring_tasks)} "
+                f"tasks and {len(_snapshot.events)} events"
+            )
+        return _snapshot
+
+
+def invalidate_snapshot():
+    """Drop the warm snapshot after tasks or calendar events change"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
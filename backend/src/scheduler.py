@@ -1,12 +1,40 @@
+import heapq
+import multiprocessing
+import threading
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
 from backend.extensions import create_logger, db
 from backend.models import CalendarEvent, ScheduledTask, Task, TaskDependency
+from backend.src.schedule_metrics import ScheduleMetrics
+from backend.src.schedule_snapshot import TaskSnapshot
 
 logger = create_logger(__name__)
 
+# Shortest period (in days) that parallel mode splits into windows. Below it
+# the cost of shipping windows to worker processes outweighs the work saved:
+# on the benchmark workloads windowed planning broke even at about 300 days
+PARALLEL_MIN_DAYS = 300
 
-def generate_schedule(start_date, end_date):
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+class ScheduleCancelled(Exception):
+    """Raised when schedule generation is cancelled before it finishes"""
+
+
+def generate_schedule(
+    start_date,
+    end_date,
+    progress_callback=None,
+    should_cancel=None,
+    metrics=None,
+    parallel=False,
+    max_workers=None,
+    parallel_min_days=None,
+):
     """
     Generate a schedule by placing tasks in available time slots
 
@@ -19,12 +47,376 @@ def generate_schedule(start_date, end_date):
     Args:
         start_date (datetime): Start date for the scheduling period
         end_date (datetime): End date for the scheduling period
+        progress_callback (callable, optional): Called as
+            ``progress_callback(stage, placed, total)`` after each placement,
+            where stage is "one-off" or "recurring" and total is None when
+            the number of placements isn't known up front
+        should_cancel (callable, optional): Polled between placements; when it
+            returns True generation stops with ScheduleCancelled
+        metrics (ScheduleMetrics, optional): Collects phase timings and
+            placement counters for this run
+        parallel (bool): Solve week-sized windows of the period in a process
+            pool (see plan_schedule_windowed); the result is the same. Only
+            used for periods of at least parallel_min_days days
+        max_workers (int, optional): Size of the process pool for parallel mode
+        parallel_min_days (int, optional): Shortest period planned in parallel
+            mode, PARALLEL_MIN_DAYS by default
 
     Returns:
         list: List of scheduled task dictionaries with task_id, start, and end
     """
     logger.info(f"Generating schedule from {start_date} to {end_date}")
 
+    if metrics is None:
+        metrics = ScheduleMetrics()
+
+    with metrics.phase("db_load"):
+        calendar_events, one_off_tasks, recurring_tasks, task_dependencies = (
+            _load_schedule_inputs(start_date, end_date)
+        )
+
+    busy_slots = [(event.start, event.end) for event in calendar_events]
+
+    if parallel_min_days is None:
+        parallel_min_days = PARALLEL_MIN_DAYS
+    days = (end_date.date() - start_date.date()).days + 1
+    if parallel and days >= parallel_min_days:
+        return plan_schedule_windowed(
+            one_off_tasks,
+            recurring_tasks,
+            task_dependencies,
+            busy_slots,
+            start_date,
+            end_date,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+            should_cancel=should_cancel,
+            metrics=metrics,
+        )
+
+    return plan_schedule(
+        one_off_tasks,
+        recurring_tasks,
+        task_dependencies,
+        busy_slots,
+        start_date,
+        end_date,
+        progress_callback=progress_callback,
+        should_cancel=should_cancel,
+        metrics=metrics,
+    )
+
+
+def save_schedule(start_date, end_date, scheduled_tasks):
+    """
+    Replace the scheduled tasks in a date range with a newly generated schedule
+
+    Args:
+        start_date (datetime): Start date for the scheduling period
+        end_date (datetime): End date for the scheduling period
+        scheduled_tasks (list): Output of generate_schedule
+
+    Returns:
+        int: Number of scheduled tasks written
+    """
+    ScheduledTask.query.filter(
+        ScheduledTask.start >= start_date, ScheduledTask.start <= end_date
+    ).delete()
+
+    for task_data in scheduled_tasks:
+        scheduled_task = ScheduledTask(
+            task_id=task_data["task_id"],
+            start=task_data["start"],
+            end=task_data["end"],
+            status="scheduled",
+        )
+        db.session.add(scheduled_task)
+
+    db.session.commit()
+    return len(scheduled_tasks)
+
+
+def plan_schedule(
+    one_off_tasks,
+    recurring_tasks,
+    task_dependencies,
+    busy_slots,
+    start_date,
+    end_date,
+    progress_callback=None,
+    should_cancel=None,
+    metrics=None,
+):
+    """
+    Place tasks into the free time around busy intervals
+
+    This is the side-effect-free core of generate_schedule: it never reads or
+    writes the database, so it can be run against in-memory data to preview
+    changes. Tasks may be Task rows or any object with the same attributes
+    (id, duration, due_by, recurrence, time_window_start, time_window_end).
+
+    Args:
+        one_off_tasks (list): Incomplete one-off tasks, in priority order
+        recurring_tasks (list): Active recurring tasks
+        task_dependencies (dict): Task ID -> list of dependency task IDs
+        busy_slots (list): Tuples (start, end) of time that can't be used
+        start_date (datetime): Start date for the scheduling period
+        end_date (datetime): End date for the scheduling period
+        progress_callback, should_cancel, metrics: As for generate_schedule
+
+    Returns:
+        list: List of scheduled task dictionaries with task_id, start, and end
+    """
+    if metrics is None:
+        metrics = ScheduleMetrics()
+
+    report, check_cancelled = _make_hooks(progress_callback, should_cancel)
+
+    # Find available time slots (for a real implementation, this would be more sophisticated)
+    with metrics.phase("slot_computation"):
+        available_slots = find_free_slots(busy_slots, start_date, end_date)
+
+    with metrics.phase("topological_sort"):
+        to_schedule = _order_by_dependencies(one_off_tasks, task_dependencies)
+
+    # Schedule one-off tasks based on priority
+    scheduled_tasks = []
+
+    with metrics.phase("one_off_placement"):
+        scheduled_tasks += _place_one_off_tasks(
+            to_schedule, available_slots, metrics, report, check_cancelled
+        )
+
+    with metrics.phase("recurring_placement"):
+        scheduled_tasks += _place_recurring_tasks(
+            recurring_tasks,
+            available_slots,
+            start_date,
+            end_date,
+            metrics,
+            report,
+            check_cancelled,
+        )
+
+    metrics.tasks_scheduled = len(scheduled_tasks)
+    logger.info(f"Scheduled {len(scheduled_tasks)} tasks")
+    return scheduled_tasks
+
+
+def plan_schedule_windowed(
+    one_off_tasks,
+    recurring_tasks,
+    task_dependencies,
+    busy_slots,
+    start_date,
+    end_date,
+    max_workers=None,
+    progress_callback=None,
+    should_cancel=None,
+    metrics=None,
+):
+    """
+    Plan a long period by solving week-sized windows in a process pool
+
+    Slot computation and recurring placement only ever touch a single day, so
+    the period is split at week boundaries and each window is solved in its own
+    process. One-off placement is a first-fit over the whole period (a task
+    takes the earliest free slot in any week), so it runs once over the
+    stitched slot list between the two parallel stages. The result is
+    identical to plan_schedule; only the slot_scans counter differs.
+
+    Only those two stages are split up; loading, dependency ordering and
+    one-off placement stay sequential. They cost little more per day than
+    the overhead of sending a window to a worker, so windowing only pays off
+    on long periods (see PARALLEL_MIN_DAYS), and the first call also pays
+    for starting the pool.
+
+    Arguments are as for plan_schedule. Periods that fit in one window are
+    planned sequentially.
+    """
+    windows = split_horizon(start_date, end_date)
+    if len(windows) < 2:
+        return plan_schedule(
+            one_off_tasks,
+            recurring_tasks,
+            task_dependencies,
+            busy_slots,
+            start_date,
+            end_date,
+            progress_callback=progress_callback,
+            should_cancel=should_cancel,
+            metrics=metrics,
+        )
+
+    if metrics is None:
+        metrics = ScheduleMetrics()
+
+    report, check_cancelled = _make_hooks(progress_callback, should_cancel)
+    pool = _get_process_pool(max_workers)
+
+    # Detach ORM rows so they can be sent to worker processes
+    recurring_tasks = [TaskSnapshot.from_task(task) for task in recurring_tasks]
+
+    with metrics.phase("slot_computation"):
+        futures = [
+            pool.submit(
+                _window_free_slots,
+                _busy_slots_in_window(busy_slots, start_date, day_offset, day_count),
+                start_date,
+                day_offset,
+                day_count,
+            )
+            for day_offset, day_count in windows
+        ]
+        available_slots = []
+        for future in futures:
+            available_slots += future.result()
+
+    with metrics.phase("topological_sort"):
+        to_schedule = _order_by_dependencies(one_off_tasks, task_dependencies)
+
+    scheduled_tasks = []
+
+    with metrics.phase("one_off_placement"):
+        scheduled_tasks += _place_one_off_tasks(
+            to_schedule, available_slots, metrics, report, check_cancelled
+        )
+
+    with metrics.phase("recurring_placement"):
+        # Hand each window the slots left on its days
+        window_offsets = [day_offset for day_offset, _ in windows]
+        window_slots = [[] for _ in windows]
+        for slot_start, slot_end in available_slots:
+            day = (slot_start.date() - start_date.date()).days
+            window_slots[bisect_right(window_offsets, day) - 1].append(
+                (slot_start, slot_end)
+            )
+
+        futures = [
+            pool.submit(
+                _window_recurring_tasks,
+                recurring_tasks,
+                slots,
+                start_date,
+                end_date,
+                day_offset,
+                day_count,
+            )
+            for slots, (day_offset, day_count) in zip(window_slots, windows)
+        ]
+
+        # Recurring placements are ordered by task, then day
+        placements_by_task = {}
+        placed = 0
+        try:
+            for future in futures:
+                placements, window_metrics = future.result()
+                check_cancelled()
+                metrics.merge_counters(window_metrics)
+                for task_data in placements:
+                    placements_by_task.setdefault(task_data["task_id"], []).append(
+                        task_data
+                    )
+                placed += len(placements)
+                report("recurring", placed, None)
+        except ScheduleCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+
+        for task in recurring_tasks:
+            scheduled_tasks += placements_by_task.get(task.id, [])
+
+    metrics.tasks_scheduled = len(scheduled_tasks)
+    logger.info(
+        f"Scheduled {len(scheduled_tasks)} tasks across {len(windows)} windows"
+    )
+    return scheduled_tasks
+
+
+def split_horizon(start_date, end_date):
+    """
+    Split the scheduling period into windows that end on week boundaries
+
+    Returns:
+        list: Tuples (day_offset, day_count) counted in days from start_date
+    """
+    total_days = (end_date.date() - start_date.date()).days + 1
+    windows = []
+    day_offset = 0
+    while day_offset < total_days:
+        # Windows run Monday to Sunday, except possibly the first and last
+        day_count = 7 - (start_date + timedelta(days=day_offset)).weekday()
+        day_count = min(day_count, total_days - day_offset)
+        windows.append((day_offset, day_count))
+        day_offset += day_count
+    return windows
+
+
+def _get_process_pool(max_workers):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Spawn rather than fork: the app process runs job threads and
+            # holds DB connections that must not be copied into workers
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _process_pool
+
+
+def _make_hooks(progress_callback, should_cancel):
+    def report(stage, placed, total):
+        if progress_callback is not None:
+            progress_callback(stage, placed, total)
+
+    def check_cancelled():
+        if should_cancel is not None and should_cancel():
+            raise ScheduleCancelled()
+
+    return report, check_cancelled
+
+
+def _busy_slots_in_window(busy_slots, start_date, day_offset, day_count):
+    window_start = datetime.combine(start_date.date(), datetime.min.time())
+    window_start += timedelta(days=day_offset)
+    window_end = window_start + timedelta(days=day_count)
+    return [
+        (busy_start, busy_end)
+        for busy_start, busy_end in busy_slots
+        if busy_end > window_start and busy_start < window_end
+    ]
+
+
+def _window_free_slots(busy_slots, start_date, day_offset, day_count):
+    return find_free_slots(
+        busy_slots,
+        start_date + timedelta(days=day_offset),
+        start_date + timedelta(days=day_offset + day_count - 1),
+    )
+
+
+def _window_recurring_tasks(
+    recurring_tasks, available_slots, start_date, end_date, day_offset, day_count
+):
+    metrics = ScheduleMetrics()
+    report, check_cancelled = _make_hooks(None, None)
+    placements = _place_recurring_tasks(
+        recurring_tasks,
+        available_slots,
+        start_date,
+        end_date,
+        metrics,
+        report,
+        check_cancelled,
+        day_offset=day_offset,
+        day_count=day_count,
+    )
+    return placements, metrics
+
+
+def _load_schedule_inputs(start_date, end_date):
     # Get calendar events for the period (these are the constraints)
     calendar_events = (
         CalendarEvent.query.filter(
@@ -35,12 +427,13 @@ def generate_schedule(start_date, end_date):
     )
 
     # Get incomplete one-off tasks with due dates in this period or earlier
+    one_off_filter = (
+        Task.task_type == "one-off",
+        Task.is_completed == False,
+        db.or_(Task.due_by <= end_date, Task.due_by == None),
+    )
     one_off_tasks = (
-        Task.query.filter(
-            Task.task_type == "one-off",
-            Task.is_completed == False,
-            db.or_(Task.due_by <= end_date, Task.due_by == None),
-        )
+        Task.query.filter(*one_off_filter)
         .order_by(Task.due_by.asc().nullslast())
         .all()
     )
@@ -50,51 +443,83 @@ def generate_schedule(start_date, end_date):
         Task.task_type == "recurring", Task.is_active == True
     ).all()
 
-    # Collect task dependencies
-    task_dependencies = {}
-    for task in one_off_tasks:
-        deps = (
-            db.session.query(TaskDependency.dependency_id)
-            .filter_by(task_id=task.id)
-            .all()
-        )
-        task_dependencies[task.id] = [dep[0] for dep in deps]
+    # Collect task dependencies in one query rather than one per task
+    task_dependencies = {task.id: [] for task in one_off_tasks}
+    dependency_rows = (
+        db.session.query(TaskDependency.task_id, TaskDependency.dependency_id)
+        .join(Task, Task.id == TaskDependency.task_id)
+        .filter(*one_off_filter)
+    )
+    for task_id, dependency_id in dependency_rows:
+        task_dependencies[task_id].append(dependency_id)
 
-    # Find available time slots (for a real implementation, this would be more sophisticated)
-    available_slots = find_available_slots(calendar_events, start_date, end_date)
+    return calendar_events, one_off_tasks, recurring_tasks, task_dependencies
 
-    # Schedule one-off tasks based on priority
-    scheduled_tasks = []
 
-    # Simple topological sort for dependency resolution
-    scheduled_task_ids = set()
+def _order_by_dependencies(one_off_tasks, task_dependencies):
+    """
+    Order tasks so each comes after its dependencies, keeping priority order
+    otherwise
+
+    The first task (in priority order) whose dependencies have all been
+    placed goes next. When none is ready, because of a cycle or a dependency
+    outside the list, the first remaining task goes next regardless. Runs in
+    O((tasks + dependencies) log tasks).
+    """
+    one_off_tasks = list(one_off_tasks)
+    unmet = []  # per task, the dependency ids not yet ordered
+    dependents = {}  # dependency id -> indexes of tasks waiting on it
+    ready = []  # heap of indexes of tasks whose dependencies are all ordered
+    for i, task in enumerate(one_off_tasks):
+        deps = set(task_dependencies.get(task.id, []))
+        unmet.append(deps)
+        for dep_id in deps:
+            dependents.setdefault(dep_id, []).append(i)
+        if not deps:
+            ready.append(i)
+    heapq.heapify(ready)
+
+    ordered_ids = set()
+    done = [False] * len(one_off_tasks)
+    first_remaining = 0
     to_schedule = []
 
-    # Process tasks with dependencies first
-    while one_off_tasks:
-        scheduled_this_round = False
-        for i, task in enumerate(one_off_tasks):
-            # Check if all dependencies are scheduled
-            deps = task_dependencies.get(task.id, [])
-            if all(dep_id in scheduled_task_ids for dep_id in deps):
-                # This task's dependencies are satisfied
-                to_schedule.append(task)
-                scheduled_task_ids.add(task.id)
-                one_off_tasks.pop(i)
-                scheduled_this_round = True
-                break
+    while len(to_schedule) < len(one_off_tasks):
+        while ready and done[ready[0]]:
+            heapq.heappop(ready)
+        if ready:
+            i = heapq.heappop(ready)
+        else:
+            while done[first_remaining]:
+                first_remaining += 1
+            i = first_remaining
+
+        task = one_off_tasks[i]
+        done[i] = True
+        to_schedule.append(task)
+        if task.id in ordered_ids:
+            continue
+        ordered_ids.add(task.id)
+        for j in dependents.pop(task.id, []):
+            unmet[j].discard(task.id)
+            if not unmet[j] and not done[j]:
+                heapq.heappush(ready, j)
 
-        if not scheduled_this_round and one_off_tasks:
-            # There must be a circular dependency or unresolvable constraint
-            # For simplicity, just add the first task and move on
-            to_schedule.append(one_off_tasks[0])
-            scheduled_task_ids.add(one_off_tasks[0].id)
-            one_off_tasks.pop(0)
+    return to_schedule
+
+
+def _place_one_off_tasks(
+    to_schedule, available_slots, metrics, report, check_cancelled
+):
+    scheduled_tasks = []
 
-    # Schedule the sorted tasks
+    report("one-off", 0, len(to_schedule))
     for task in to_schedule:
+        check_cancelled()
+
         # Find an appropriate slot for this task
         for slot_start, slot_end in available_slots:
+            metrics.slot_scans += 1
             slot_duration = (slot_end - slot_start).total_seconds() / 60
             if slot_duration >= task.duration:
                 # This slot fits the task
@@ -103,18 +528,44 @@ def generate_schedule(start_date, end_date):
                 scheduled_tasks.append(
                     {"task_id": task.id, "start": slot_start, "end": task_end}
                 )
+                if task.due_by and task_end > task.due_by:
+                    metrics.add_deadline_miss(task.id, task.due_by, task_end)
 
                 # Update available slots
                 available_slots.remove((slot_start, slot_end))
                 if task_end < slot_end:
                     available_slots.append((task_end, slot_end))
 
+                report("one-off", len(scheduled_tasks), len(to_schedule))
                 break
+        else:
+            metrics.add_unscheduled(task.id, "no_slot_long_enough")
+
+    return scheduled_tasks
+
+
+def _place_recurring_tasks(
+    recurring_tasks,
+    available_slots,
+    start_date,
+    end_date,
+    metrics,
+    report,
+    check_cancelled,
+    day_offset=0,
+    day_count=None,
+):
+    # day_offset/day_count restrict placement to a run of days from start_date,
+    # which lets windowed scheduling split the horizon without changing results
+    scheduled_tasks = []
 
     # Schedule recurring tasks (simplified implementation)
+    report("recurring", 0, None)
     for task in recurring_tasks:
         recurrence_pattern = task.recurrence
         if not recurrence_pattern:
+            if day_offset == 0:
+                metrics.add_unscheduled(task.id, "missing_recurrence")
             continue
 
         # Extract recurrence pattern (simplified for placeholder)
@@ -132,7 +583,14 @@ def generate_schedule(start_date, end_date):
                     minute=task.time_window_start.minute,
                 )
 
-            while current_date < end_date:
+            current_date = current_date + timedelta(days=day_offset)
+            days_seen = 0
+
+            while current_date < end_date and (
+                day_count is None or days_seen < day_count
+            ):
+                check_cancelled()
+
                 # Check if this time works with the task's time window
                 in_time_window = True
                 if task.time_window_start and task.time_window_end:
@@ -141,9 +599,12 @@ def generate_schedule(start_date, end_date):
                         task.time_window_start <= current_time <= task.time_window_end
                     )
 
-                if in_time_window:
+                if not in_time_window:
+                    metrics.add_unscheduled(task.id, "outside_time_window")
+                else:
                     # Find an available slot that contains this time
                     for slot_start, slot_end in available_slots:
+                        metrics.slot_scans += 1
                         if slot_start <= current_date < slot_end:
                             task_end = current_date + timedelta(minutes=task.duration)
                             if task_end <= slot_end:
@@ -162,12 +623,17 @@ def generate_schedule(start_date, end_date):
                                 if task_end < slot_end:
                                     available_slots.append((task_end, slot_end))
 
+                                report("recurring", len(scheduled_tasks), None)
                                 break
+                    else:
+                        metrics.add_unscheduled(task.id, "slot_unavailable")
 
                 # Move to next day
                 current_date = current_date + timedelta(days=1)
+                days_seen += 1
+        elif day_offset == 0:
+            metrics.add_unscheduled(task.id, "unsupported_recurrence")
 
-    logger.info(f"Scheduled {len(scheduled_tasks)} tasks")
     return scheduled_tasks
 
 
@@ -191,6 +657,21 @@ def find_available_slots(calendar_events, start_date, end_date):
     # Create a list of busy slots from calendar events
     busy_slots = [(event.start, event.end) for event in calendar_events]
 
+    return find_free_slots(busy_slots, start_date, end_date)
+
+
+def find_free_slots(busy_slots, start_date, end_date):
+    """
+    Find available work-hour slots around a list of busy intervals
+
+    Args:
+        busy_slots (list): Tuples (start, end) of time that can't be used
+        start_date (datetime): Start date for the scheduling period
+        end_date (datetime): End date for the scheduling period
+
+    Returns:
+        list: List of tuples (start_time, end_time) representing available slots
+    """
     # Assume workday is 8 AM - 4 PM
     work_start_hour = 8
     work_end_hour = 16
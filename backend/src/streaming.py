@@ -0,0 +1,80 @@
+import json
+
+from flask import Response, stream_with_context
+
+from backend.extensions import create_logger
+
+logger = create_logger(__name__)
+
+
+def iter_stream_text(completion):
+    """Yield the text deltas from a streamed chat completion"""
+    for chunk in completion:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+def _close_upstream(completion):
+    close = getattr(completion, "close", None)
+    if close is not None:
+        close()
+
+
+def sse_response(completion):
+    """
+    Relay a streamed chat completion to the client as server-sent events
+
+    Each text delta is sent as a `data: {"content": ...}` event, followed by a
+    final `done` event (or an `error` event if the upstream stream fails).
+    If the client disconnects the upstream request is closed so generation
+    stops instead of running to completion.
+    """
+
+    def generate():
+        try:
+            for text in iter_stream_text(completion):
+                yield f"data: {json.dumps({'content': text})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except GeneratorExit:
+            logger.info("Client disconnected from LLM stream")
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming LLM response: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            _close_upstream(completion)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def chunked_response(completion):
+    """
+    Relay a streamed chat completion as a plain-text chunked response, for
+    clients that just want the raw text as it arrives
+    """
+
+    def generate():
+        try:
+            yield from iter_stream_text(completion)
+        except GeneratorExit:
+            logger.info("Client disconnected from LLM stream")
+            raise
+        finally:
+            _close_upstream(completion)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/plain",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
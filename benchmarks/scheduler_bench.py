@@ -0,0 +1,220 @@
+"""
+Scheduler benchmark
+
+Runs generate_schedule and find_available_slots against synthetic workloads in
+an in-memory SQLite database and reports wall time, peak memory and placements
+per second. Results are written to JSON so runs can be compared across commits:
+
+    python -m benchmarks.scheduler_bench --output bench/before.json
+    python -m benchmarks.scheduler_bench --output bench/after.json \
+        --compare bench/before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+# Config refuses to load without a secret key
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from backend import create_app
+from backend.config import TestingConfig
+from backend.extensions import db
+from backend.models import CalendarEvent
+from backend.src.schedule_metrics import ScheduleMetrics
+from backend.src.scheduler import find_available_slots, generate_schedule
+
+from benchmarks.workloads import generate_workload, load_workload
+
+CASES = {
+    "small": dict(n_tasks=50, dependency_density=0.02, n_events=40, n_days=7),
+    "medium": dict(n_tasks=300, dependency_density=0.01, n_events=200, n_days=30),
+    "large": dict(
+        n_tasks=1000,
+        dependency_density=0.005,
+        n_events=800,
+        n_days=90,
+        n_recurring=10,
+    ),
+    # Long enough for --parallel to split the period (see PARALLEL_MIN_DAYS)
+    "year": dict(
+        n_tasks=1000,
+        dependency_density=0.005,
+        n_events=3200,
+        n_days=365,
+        n_recurring=10,
+    ),
+}
+
+
+class BenchmarkConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+
+def _measure(func, repeat):
+    """Return (result, wall times) for repeat calls, plus peak memory of one call"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    # Measured separately because tracing slows the call down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, times, peak
+
+
+def _summarize(times, peak, placements=None):
+    summary = {
+        "wall_s_min": round(min(times), 6),
+        "wall_s_median": round(statistics.median(times), 6),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+    if placements is not None:
+        summary["placements"] = placements
+        summary["placements_per_s"] = round(placements / statistics.median(times), 1)
+    return summary
+
+
+def run_case(app, name, params, repeat=5, seed=0, parallel=False):
+    workload = generate_workload(seed=seed, **params)
+    start_date, end_date = workload["start_date"], workload["end_date"]
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        load_workload(workload)
+
+        run_metrics = []
+
+        def run_generate():
+            db.session.expire_all()
+            metrics = ScheduleMetrics()
+            run_metrics.append(metrics)
+            return generate_schedule(
+                start_date, end_date, metrics=metrics, parallel=parallel
+            )
+
+        scheduled, times, peak = _measure(run_generate, repeat)
+        generate_result = _summarize(times, peak, len(scheduled))
+        # Phases from the last untraced run
+        generate_result["phases_ms"] = run_metrics[repeat - 1].to_dict()["phases_ms"]
+        generate_result["slot_scans"] = run_metrics[repeat - 1].slot_scans
+
+        events = (
+            CalendarEvent.query.filter(
+                CalendarEvent.end >= start_date, CalendarEvent.start <= end_date
+            )
+            .order_by(CalendarEvent.start)
+            .all()
+        )
+        slots, times, peak = _measure(
+            lambda: find_available_slots(events, start_date, end_date), repeat
+        )
+        slots_result = _summarize(times, peak)
+        slots_result["slots"] = len(slots)
+
+    return {
+        "name": name,
+        "params": dict(params, seed=seed, parallel=parallel),
+        "generate_schedule": generate_result,
+        "find_available_slots": slots_result,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print the change in median wall time per case against a baseline run"""
+    baseline_cases = {case["name"]: case for case in baseline["cases"]}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for case in results["cases"]:
+        old = baseline_cases.get(case["name"])
+        if old is None:
+            continue
+        for target in ("generate_schedule", "find_available_slots"):
+            before = old[target]["wall_s_median"]
+            after = case[target]["wall_s_median"]
+            change = (after - before) / before * 100 if before else 0.0
+            print(
+                f"  {case['name']:<8} {target:<22} "
+                f"{before * 1000:9.2f} ms -> {after * 1000:9.2f} ms ({change:+.1f}%)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--cases", nargs="+", default=list(CASES), choices=list(CASES)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--parallel", action="store_true", help="Use windowed parallel scheduling"
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig())
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": [],
+    }
+
+    for name in args.cases:
+        case = run_case(
+            app,
+            name,
+            CASES[name],
+            repeat=args.repeat,
+            seed=args.seed,
+            parallel=args.parallel,
+        )
+        results["cases"].append(case)
+        generate = case["generate_schedule"]
+        slots = case["find_available_slots"]
+        print(
+            f"{name:<8} generate_schedule {generate['wall_s_median'] * 1000:9.2f} ms "
+            f"({generate['placements_per_s']:.0f} placements/s, "
+            f"peak {generate['peak_memory_kb']:.0f} KB)  "
+            f"find_available_slots {slots['wall_s_median'] * 1000:8.2f} ms"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Deterministic synthetic workloads for benchmarking the scheduler
+
+A workload is plain data (dicts of model fields) generated from a seed, so the
+same parameters always produce the same tasks, dependencies and calendar.
+"""
+
+import random
+from datetime import datetime, time, timedelta
+
+from backend.extensions import db
+from backend.models import CalendarEvent, Task, TaskDependency
+
+DEFAULT_START = datetime(2025, 1, 6)  # a Monday
+
+
+def generate_workload(
+    n_tasks=200,
+    dependency_density=0.01,
+    n_events=100,
+    n_days=14,
+    n_recurring=5,
+    seed=0,
+    start_date=DEFAULT_START,
+):
+    """
+    Generate a synthetic scheduling workload
+
+    Args:
+        n_tasks (int): Number of one-off tasks
+        dependency_density (float): Probability that a task depends on any
+            given earlier task; edges only point backwards so the graph is a DAG
+        n_events (int): Number of calendar events
+        n_days (int): Length of the scheduling period in days
+        n_recurring (int): Number of daily recurring tasks
+        seed (int): Random seed
+        start_date (datetime): Start of the scheduling period
+
+    Returns:
+        dict: tasks, dependencies, events, start_date and end_date
+    """
+    rng = random.Random(seed)
+    end_date = start_date + timedelta(days=n_days)
+
+    tasks = []
+    for i in range(n_tasks):
+        due_by = None
+        if rng.random() < 0.7:
+            due_by = start_date + timedelta(
+                days=rng.randint(0, n_days), hours=rng.randint(8, 17)
+            )
+        tasks.append(
+            {
+                "id": f"task-{i}",
+                "content": f"Task {i}",
+                "duration": rng.choice([15, 30, 45, 60, 90, 120]),
+                "task_type": "one-off",
+                "due_by": due_by,
+            }
+        )
+
+    dependencies = []
+    for i in range(1, n_tasks):
+        n_deps = min(i, int(dependency_density * i + rng.random()))
+        for j in rng.sample(range(i), n_deps):
+            dependencies.append({"task_id": f"task-{i}", "dependency_id": f"task-{j}"})
+
+    for i in range(n_recurring):
+        window_start = None
+        window_end = None
+        if rng.random() < 0.8:
+            window_start = time(rng.randint(8, 14), rng.choice([0, 30]))
+            window_end = time(window_start.hour + 2, window_start.minute)
+        tasks.append(
+            {
+                "id": f"recurring-{i}",
+                "content": f"Recurring {i}",
+                "duration": rng.choice([15, 30, 45]),
+                "task_type": "recurring",
+                "recurrence": {"daily": True},
+                "time_window_start": window_start,
+                "time_window_end": window_end,
+                "is_active": True,
+            }
+        )
+
+    events = []
+    for i in range(n_events):
+        start = start_date + timedelta(
+            days=rng.randrange(max(n_days, 1)),
+            hours=rng.randint(7, 16),
+            minutes=rng.choice([0, 15, 30, 45]),
+        )
+        events.append(
+            {
+                "id": f"event-{i}",
+                "subject": f"Event {i}",
+                "start": start,
+                "end": start + timedelta(minutes=rng.choice([15, 30, 60, 90, 180])),
+            }
+        )
+
+    return {
+        "tasks": tasks,
+        "dependencies": dependencies,
+        "events": events,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def load_workload(workload):
+    """Insert a generated workload into the current app's database"""
+    db.session.bulk_insert_mappings(Task, workload["tasks"])
+    db.session.bulk_insert_mappings(TaskDependency, workload["dependencies"])
+    db.session.bulk_insert_mappings(CalendarEvent, workload["events"])
+    db.session.commit()
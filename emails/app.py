@@ -1,5 +1,4 @@
 import os
-from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from slack_sdk.signature import SignatureVerifier
 from slack_bolt.adapter.flask import SlackRequestHandler
@@ -7,6 +6,10 @@ from slack_bolt import App
 from dotenv import find_dotenv, load_dotenv
 from flask import Flask, request, abort
 from functions import respond
+from chains import registry
+from event_queue import EventQueue
+from history import history
+import slack_client
 import logging
 from functools import wraps
 import time
@@ -21,7 +24,10 @@ SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"]
 
 
 # Initialize the Slack app
-app = App(token=SLACK_BOT_TOKEN)
+app = App(token=SLACK_BOT_TOKEN, client=slack_client.get_client())
+
+# Build the LLM chains up front so the first mention doesn't pay for it
+registry.build_all()
 
 # Initialize the Flask app
 # Flask is a web application framework written in Python
@@ -46,10 +52,8 @@ def get_bot_user_id():
         str: The bot user ID.
     """
     try:
-        # Initialize the Slack client with your bot token
-        slack_client = WebClient(token=SLACK_BOT_TOKEN)
-        response = slack_client.auth_test()
-        return response["user_id"]
+        # Cached, so this only calls auth.test once an hour
+        return slack_client.get_bot_user_id()
     except SlackApiError as e:
         print(f"Error: {e}")
 
@@ -68,34 +72,71 @@ def my_function(text):
     return response
 
 
+def process_event(body):
+    """
+    Generate a reply to a Slack event and post it to the event's channel
+    (in the thread, if the event was in one). Runs on an event queue worker.
+
+    Args:
+        body (dict): The event data received from Slack.
+    """
+    event = body["event"]
+    response = respond(body)
+    result = app.client.chat_postMessage(
+        channel=event["channel"],
+        text=response,
+        thread_ts=event.get("thread_ts"),
+    )
+    history.record(dict(result["message"], channel=event["channel"]))
+
+
+event_queue = EventQueue(
+    process_event,
+    workers=int(os.environ.get("SLACK_EVENT_WORKERS", 4)),
+    max_size=int(os.environ.get("SLACK_EVENT_QUEUE_SIZE", 100)),
+)
+
+
+def enqueue_event(body, ack, say):
+    """
+    Acknowledge the event straight away so Slack doesn't retry it, then hand
+    it to the event queue. Retries of events we've already accepted are
+    dropped.
+    """
+    ack()
+    # Recorded on arrival so history stays in order whatever the queue does
+    history.record(body["event"])
+    if event_queue.submit(body) == "full":
+        say("I'm a bit busy right now, please try again in a minute.")
+
+
 @app.event("app_mention")
-def handle_mentions(body, say):
+def handle_mentions(body, ack, say):
     """
     Event listener for mentions in Slack.
-    When the bot is mentioned, this function processes the text and sends a response.
+    When the bot is mentioned, the event is queued and the reply is posted
+    once it has been generated.
 
     Args:
         body (dict): The event data received from Slack.
+        ack (callable): Acknowledges the event to Slack.
         say (callable): A function for sending a response to the channel.
     """
-    
-    # response = my_function(text)
-    response = respond(body)
-    say(response)
+    enqueue_event(body, ack, say)
 
 @app.event('message')
-def handle_message(body, say):
+def handle_message(body, ack, say):
     """
     Event listener for messages in Slack.
-    When a message is posted, this function processes the text and sends a response.
+    When a message is posted, the event is queued and the reply is posted
+    once it has been generated.
 
     Args:
         body (dict): The event data received from Slack.
+        ack (callable): Acknowledges the event to Slack.
         say (callable): A function for sending a response to the channel.
     """
-    # response = my_function(text)
-    response = respond(body)
-    say(response)
+    enqueue_event(body, ack, say)
 
 @flask_app.route("/slack/events", methods=["POST"])
 @require_slack_verification
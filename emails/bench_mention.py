@@ -0,0 +1,119 @@
+"""
+Per-mention overhead benchmark
+
+Runs the Slack mention pipeline (routing plus the chosen prompt) against a
+local stub of the OpenAI API, so the numbers measure our own overhead rather
+than model latency. Compares rebuilding every chain and HTTP client per mention
+(the old behaviour) with reusing the shared chain registry:
+
+    python bench_mention.py --mentions 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+# The pipeline reads these at import; the stub never checks the key
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("SLACK_BOT_USER_ID", "UBENCH")
+
+from chains import registry
+from functions import FUNCTION_DESCRIPTIONS, FUNCTION_MAP
+from router import route
+
+MENTIONS = [
+    "<@UBENCH> can you check this paragraph for spelling mistakes: I has a dog",
+    "<@UBENCH> please draft a reply to this email saying I'm out next week",
+    "<@UBENCH> what is the weather usually like in Lisbon in April?",
+    "<@UBENCH> summarize this for me",
+    "<@UBENCH> how do I sort a dictionary by value in python",
+]
+
+
+def stub_transport(latency=0.0):
+    """Answer chat completion requests locally with a canned response"""
+
+    def handler(request):
+        if latency:
+            time.sleep(latency)
+        body = json.loads(request.content)
+        if body.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps({"information": "enough", "function": "generic_prompt"})
+        else:
+            content = "Stub reply."
+        return httpx.Response(
+            200,
+            json={
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }
+                ],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            },
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def handle_mention(text):
+    text = text.replace("<@UBENCH>", "").strip()
+    _, function_name = route(text, FUNCTION_DESCRIPTIONS)
+    return FUNCTION_MAP[function_name](text)
+
+
+def run(mentions, shared, latency):
+    transport = stub_transport(latency)
+    registry.http_client = httpx.Client(transport=transport)
+    registry.clear()
+    if shared:
+        registry.build_all()
+
+    times = []
+    for i in range(mentions):
+        if not shared:
+            registry.http_client.close()
+        start = time.perf_counter()
+        if not shared:
+            # What every mention used to pay: new clients and chains
+            registry.http_client = httpx.Client(transport=transport)
+            registry.clear()
+        handle_mention(MENTIONS[i % len(MENTIONS)])
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mentions", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Simulated model latency (s)"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for label, shared in (("rebuilt per mention", False), ("shared registry", True)):
+        times = run(args.mentions, shared, args.latency)
+        results[label] = times
+        print(
+            f"{label:<20} median {statistics.median(times) * 1000:8.2f} ms  "
+            f"p95 {sorted(times)[int(len(times) * 0.95) - 1] * 1000:8.2f} ms"
+        )
+
+    before = statistics.median(results["rebuilt per mention"])
+    after = statistics.median(results["shared registry"])
+    print(f"Overhead saved per mention: {(before - after) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
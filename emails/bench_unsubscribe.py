@@ -0,0 +1,153 @@
+"""
+Unsubscribe link extraction benchmark
+
+Builds a corpus of sample newsletter messages in the shape the Gmail API
+returns them and compares the original extractor (first MIME part only, the
+full URL regex over str(bytes)) with the header-first extractor in
+unsubscribe.py. Reports extraction time, links found and how many messages
+would need a full-body fetch:
+
+    python bench_unsubscribe.py --messages 2000
+"""
+
+import argparse
+import base64
+import random
+import re
+import time
+
+from unsubscribe import URL_REGEX, domain_key, emailbody, header_links
+
+SENDERS = [
+    "news.example.com",
+    "mail.shop.example",
+    "updates.social.example",
+    "act.campaign.example",
+    "digest.blog.example",
+]
+
+
+def _encode(text):
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _filler(rng, words):
+    vocabulary = ["deal", "update", "news", "sale", "week", "read", "more", "today"]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def make_message(rng, i, header_rate):
+    sender = rng.choice(SENDERS)
+    link = f"https://{sender}/unsubscribe?id={i}&token={rng.getrandbits(64):x}"
+    text = (
+        f"{_filler(rng, 400)}\nhttps://{sender}/article/{i}\n{_filler(rng, 400)}\n"
+        f"To stop receiving these emails, unsubscribe here: {link}\n"
+    )
+    html = (
+        f"<html><body><p>{_filler(rng, 600)}</p>"
+        f'<a href="https://{sender}/article/{i}">Read more</a>'
+        f'<p>{_filler(rng, 200)}</p><a href="{link}&amp;src=html">Unsubscribe</a>'
+        "</body></html>"
+    )
+    # Some senders only put the link in the HTML part
+    plain = text if rng.random() < 0.5 else _filler(rng, 800)
+    headers = [{"name": "Subject", "value": f"Newsletter {i}"}]
+    if rng.random() < header_rate:
+        headers.append(
+            {"name": "List-Unsubscribe", "value": f"<mailto:u@{sender}>, <{link}>"}
+        )
+        headers.append(
+            {"name": "List-Unsubscribe-Post", "value": "List-Unsubscribe=One-Click"}
+        )
+
+    return {
+        "id": str(i),
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": headers,
+            "parts": [
+                {"mimeType": "text/plain", "body": {"data": _encode(plain)}},
+                {"mimeType": "text/html", "body": {"data": _encode(html)}},
+            ],
+        },
+    }
+
+
+def legacy_emailbody(msg, pattern):
+    """The original extractor: first part only, regex over str(bytes)"""
+    links = []
+    payld = msg["payload"]
+    if "parts" in payld:
+        part_body = payld["parts"][0]["body"]
+        if "data" in part_body:
+            clean_one = part_body["data"].replace("-", "+").replace("_", "/")
+            clean_two = base64.b64decode(
+                bytes(clean_one + "=" * (-len(clean_one) % 4), "UTF-8")
+            )
+            for val in pattern.findall(str(clean_two)):
+                if "unsubscribe" in val[0]:
+                    links.append(val[0])
+    return links
+
+
+def run_legacy(corpus):
+    # re caches compiled patterns, as the original re.findall call did
+    pattern = re.compile(URL_REGEX)
+    domains = set()
+    for message in corpus:
+        for url in legacy_emailbody(message, pattern):
+            domains.add(domain_key(url))
+    return {"domains": len(domains), "body_fetches": len(corpus)}
+
+
+def run_new(corpus):
+    domains = set()
+    body_fetches = 0
+    for message in corpus:
+        urls = header_links(message)
+        if not urls:
+            body_fetches += 1
+            urls = emailbody(message)
+        for url in urls[:1]:
+            domains.add(domain_key(url))
+    return {"domains": len(domains), "body_fetches": body_fetches}
+
+
+def messages_found(corpus, extract):
+    return sum(1 for message in corpus if extract(message))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument(
+        "--header-rate",
+        type=float,
+        default=0.7,
+        help="Share of messages with a List-Unsubscribe header",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_message(rng, i, args.header_rate) for i in range(args.messages)]
+
+    pattern = re.compile(URL_REGEX)
+    for label, run, extract in (
+        ("original", run_legacy, lambda m: legacy_emailbody(m, pattern)),
+        ("header-first", run_new, lambda m: header_links(m) or emailbody(m)),
+    ):
+        start = time.perf_counter()
+        result = run(corpus)
+        elapsed = time.perf_counter() - start
+        found = messages_found(corpus, extract)
+        print(
+            f"{label:<13} {elapsed * 1000:9.1f} ms  "
+            f"{elapsed / len(corpus) * 1e6:8.1f} us/message  "
+            f"links in {found}/{len(corpus)} messages  "
+            f"{result['body_fetches']} body fetches"
+        )
+
+
+if __name__ == "__main__":
+    main()
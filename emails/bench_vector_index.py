@@ -0,0 +1,84 @@
+"""
+Local vector index benchmark
+
+Builds a VectorIndex of random unit vectors in a temporary directory and
+measures open time, query latency and, when hnswlib is installed, HNSW recall
+against exact search. Runs offline; no embeddings API is called:
+
+    python bench_vector_index.py --vectors 100000 --dim 1536
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import vector_index
+from vector_index import VectorIndex
+
+
+def time_queries(index, queries, k):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([doc["id"] for doc, _ in index.search(query, k=k)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    path = tempfile.mkdtemp(prefix="vector_index_")
+
+    start = time.perf_counter()
+    index = VectorIndex.create(path, dim=args.dim)
+    for offset in range(0, args.vectors, 5000):
+        count = min(5000, args.vectors - offset)
+        vectors = rng.standard_normal((count, args.dim), dtype=np.float32)
+        index.add(vectors, [{"id": offset + i} for i in range(count)])
+    print(f"Wrote {args.vectors} vectors in {time.perf_counter() - start:.2f} s")
+
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    start = time.perf_counter()
+    index = VectorIndex(path)
+    print(f"Opened index in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    exact, latencies = time_queries(index, queries, args.k)
+    print(
+        f"brute  median {statistics.median(latencies):7.2f} ms  "
+        f"max {max(latencies):7.2f} ms"
+    )
+
+    if vector_index.hnswlib is None:
+        print("hnswlib is not installed, skipping HNSW")
+        return
+
+    start = time.perf_counter()
+    index = VectorIndex(path, mode="hnsw")
+    index.search(queries[0], k=args.k)
+    print(f"Built HNSW graph in {time.perf_counter() - start:.2f} s")
+
+    approx, latencies = time_queries(index, queries, args.k)
+    recall = sum(
+        len(set(a) & set(e)) for a, e in zip(approx, exact)
+    ) / (args.k * len(exact))
+    print(
+        f"hnsw   median {statistics.median(latencies):7.2f} ms  "
+        f"max {max(latencies):7.2f} ms  recall@{args.k} {recall:.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import threading
+
+import httpx
+from langchain.chat_models import ChatOpenAI
+from langchain.chains import LLMChain
+from langchain.prompts.chat import (
+    ChatPromptTemplate,
+    SystemMessagePromptTemplate,
+    HumanMessagePromptTemplate,
+)
+
+from config import create_logger
+from llm_metrics import LLMMetricsHandler
+
+logger = create_logger(__name__)
+
+# Connection pool shared by every chain's OpenAI client
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+class ChainRegistry:
+    """
+    Builds each LLM chain once and reuses it across requests and threads.
+
+    Chains are registered with their prompt templates up front and built on
+    first use (or all at once with build_all() at startup). Every chain's
+    model shares one pooled HTTP client, so connections to OpenAI are kept
+    alive between requests instead of being set up for each call.
+
+    Args:
+        http_client (httpx.Client): Client to share between models. Defaults to
+            a new pooled client.
+        llm_factory (callable): Builds the chat model for a chain from
+            (name, model_name, temperature, model_kwargs, http_client). Defaults
+            to ChatOpenAI; benchmarks pass a stub.
+    """
+
+    def __init__(self, http_client=None, llm_factory=None):
+        self.http_client = http_client or httpx.Client(
+            limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+        )
+        self.llm_factory = llm_factory or _chat_openai
+        self._specs = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name,
+        system_template,
+        human_template,
+        model_name="gpt-3.5-turbo",
+        temperature=1,
+        model_kwargs=None,
+    ):
+        """
+        Register a chain built from a system and a human message template.
+        Registering a name again replaces the chain.
+        """
+        with self._lock:
+            self._specs[name] = {
+                "system_template": system_template,
+                "human_template": human_template,
+                "model_name": model_name,
+                "temperature": temperature,
+                "model_kwargs": model_kwargs or {},
+            }
+            self._chains.pop(name, None)
+
+    def _build(self, name):
+        spec = self._specs[name]
+        llm = self.llm_factory(
+            name,
+            spec["model_name"],
+            spec["temperature"],
+            spec["model_kwargs"],
+            self.http_client,
+        )
+        chat_prompt = ChatPromptTemplate.from_messages(
+            [
+                SystemMessagePromptTemplate.from_template(spec["system_template"]),
+                HumanMessagePromptTemplate.from_template(spec["human_template"]),
+            ]
+        )
+        return LLMChain(llm=llm, prompt=chat_prompt)
+
+    def get(self, name):
+        chain = self._chains.get(name)
+        if chain is not None:
+            return chain
+
+        with self._lock:
+            chain = self._chains.get(name)
+            if chain is None:
+                chain = self._build(name)
+                self._chains[name] = chain
+            return chain
+
+    def clear(self):
+        """Drop built chains so they are rebuilt on next use"""
+        with self._lock:
+            self._chains.clear()
+
+    def build_all(self):
+        """Build every registered chain, e.g. at startup"""
+        for name in list(self._specs):
+            self.get(name)
+        logger.info(f"Built {len(self._chains)} LLM chains")
+
+
+def _chat_openai(name, model_name, temperature, model_kwargs, http_client):
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        model_kwargs=model_kwargs,
+        http_client=http_client,
+        callbacks=[LLMMetricsHandler(name)],
+    )
+
+
+registry = ChainRegistry()
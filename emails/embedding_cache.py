@@ -0,0 +1,147 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import ROOT_DIR, create_logger
+
+logger = create_logger(__name__)
+
+CACHE_PATH = ROOT_DIR / "data/embedding_cache.db"
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+SQLITE_MAX_VARIABLES = 500  # keys per SELECT ... IN (...)
+
+
+def content_key(text, model):
+    """Hash of the model name and the exact chunk text"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embeddings keyed by content_key, so a chunk is only ever
+    embedded once per model however often it is re-indexed.
+
+    Args:
+        path (str): The SQLite database file.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    dim INTEGER,
+                    vector BLOB
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        """
+        Look up cached vectors.
+
+        Returns:
+            dict: Maps each key that was found to its float32 vector.
+        """
+        keys = list(keys)
+        found = {}
+        with self._connect() as conn:
+            for i in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[i:i + SQLITE_MAX_VARIABLES]
+                rows = conn.execute(
+                    "SELECT key, vector FROM embeddings WHERE key IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items, model):
+        """
+        Store vectors.
+
+        Args:
+            items (list): (key, vector) pairs.
+            model (str): The embedding model they came from.
+        """
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, model, len(vector), vector.tobytes()))
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows
+            )
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings:
+    """
+    Wraps a LangChain embeddings object so embed_documents only sends texts
+    it hasn't embedded before, in batches of `batch_size`. Each batch is
+    stored as soon as it returns, so an interrupted run keeps its progress.
+    Identical chunks within a call are embedded once.
+
+    Args:
+        embeddings: A LangChain Embeddings instance, e.g. OpenAIEmbeddings.
+        model (str): Model name; part of the cache key.
+        cache (EmbeddingCache): Defaults to data/embedding_cache.db.
+        batch_size (int): Texts per embeddings request.
+    """
+
+    def __init__(self, embeddings, model, cache=None, batch_size=BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        keys = [content_key(text, self.model) for text in texts]
+        vectors = self.cache.get_many(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        logger.info(
+            f"Embedding cache: {len(texts) - len(missing)} of {len(texts)} "
+            f"chunks cached, embedding {len(missing)}"
+        )
+
+        missing = list(missing.items())
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            embedded = self.embeddings.embed_documents([text for _, text in batch])
+            items = [(key, vector) for (key, _), vector in zip(batch, embedded)]
+            self.cache.put_many(items, self.model)
+            vectors.update(
+                (key, np.asarray(vector, dtype=np.float32)) for key, vector in items
+            )
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text):
+        # Queries are rarely repeated, so they go straight to the model
+        return self.embeddings.embed_query(text)
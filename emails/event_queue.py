@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from config import create_logger
+
+logger = create_logger(__name__)
+
+
+class TTLSet:
+    """
+    Thread-safe set whose members expire after `ttl` seconds, used to drop
+    Slack's retries of events we have already accepted.
+
+    Args:
+        ttl (float): Seconds to remember a key. Defaults to 10 minutes, longer
+            than Slack's retry window.
+        max_size (int): Oldest keys are forgotten beyond this many.
+    """
+
+    def __init__(self, ttl=600, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._keys = OrderedDict()  # key -> time added
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """
+        Add a key.
+
+        Returns:
+            bool: False if the key was already present (and not expired).
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._keys:
+                added = next(iter(self._keys.values()))
+                if now - added <= self.ttl and len(self._keys) < self.max_size:
+                    break
+                self._keys.popitem(last=False)
+
+            if key in self._keys:
+                return False
+            self._keys[key] = now
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+class EventQueue:
+    """
+    Bounded work queue served by a pool of worker threads.
+
+    Slack handlers acknowledge the event, submit it here and return straight
+    away; the LLM work happens on a worker. Events are deduplicated by
+    event_id so retries of an event that is queued or already handled are
+    ignored.
+
+    Args:
+        handler (callable): Called with each event body on a worker thread.
+        workers (int): Number of worker threads.
+        max_size (int): Maximum number of events waiting to be processed.
+        dedup_ttl (float): Seconds to remember handled event ids.
+    """
+
+    def __init__(self, handler, workers=4, max_size=100, dedup_ttl=600):
+        self.handler = handler
+        self._queue = queue.Queue(maxsize=max_size)
+        self._seen = TTLSet(ttl=dedup_ttl)
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self._work, name=f"slack-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, body):
+        """
+        Queue an event for processing.
+
+        Returns:
+            str: "queued", "duplicate" if the event id was seen recently, or
+            "full" if the queue is at capacity.
+        """
+        event_id = body.get("event_id")
+        if event_id is not None and not self._seen.add(event_id):
+            logger.info(f"Ignoring duplicate event {event_id}")
+            return "duplicate"
+
+        try:
+            self._queue.put_nowait(body)
+        except queue.Full:
+            # Let a later retry through rather than dropping it as a duplicate
+            if event_id is not None:
+                self._seen.discard(event_id)
+            logger.warning(f"Event queue full, rejecting event {event_id}")
+            return "full"
+        return "queued"
+
+    def _work(self):
+        while True:
+            body = self._queue.get()
+            try:
+                self.handler(body)
+            except Exception as e:
+                logger.error(f"Error handling event {body.get('event_id')}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def join(self):
+        """Block until every queued event has been processed"""
+        self._queue.join()
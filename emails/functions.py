@@ -1,17 +1,10 @@
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
+from chains import registry
+from router import route
 from dotenv import find_dotenv, load_dotenv
 import os
 
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
-import os
-
-from langchain.prompts.chat import (
-    ChatPromptTemplate,
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate,
-)
+import slack_client
+from history import history, format_context
 
 load_dotenv(find_dotenv())
 
@@ -42,10 +35,7 @@ SLACK_BOT_USER_ID = os.environ["SLACK_BOT_USER_ID"]
 #         return response
     
 
-def generic_prompt(user_input):
-    chat = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=1)
-    
-    template = """
+GENERIC_PROMPT_TEMPLATE = """
     You are a helpful assistant that provides information and assistance to users.
 
     Your goal is to provide accurate and concise information in a polite and friendly manner.
@@ -58,26 +48,22 @@ def generic_prompt(user_input):
 
     Remember to keep your responses concise and to the point, and avoid using technical jargon or complex language that the user may not understand.
     """
-    
-    system_message_prompt = SystemMessagePromptTemplate.from_template(template)
 
-    human_template = "Here's the input from the user: {user_input}"
-    human_message_prompt = HumanMessagePromptTemplate.from_template(human_template)
+registry.register(
+    "generic_prompt",
+    GENERIC_PROMPT_TEMPLATE,
+    "Here's the input from the user: {user_input}",
+)
 
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [system_message_prompt, human_message_prompt]
-    )
 
-    chain = LLMChain(llm=chat, prompt=chat_prompt)
+def generic_prompt(user_input):
+    chain = registry.get("generic_prompt")
     response = chain.run(user_input=user_input)
 
     return response
     
 
-def grammarly_prompt(user_input):
-    chat = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=1)
-
-    template = """
+GRAMMARLY_PROMPT_TEMPLATE = """
     You are a helpful assistant that corrects grammar and spelling mistakes in a given text.
 
     Your goal is to help the user improve their writing by correcting any errors and suggesting improvements.
@@ -92,16 +78,15 @@ def grammarly_prompt(user_input):
 
     """
 
-    system_message_prompt = SystemMessagePromptTemplate.from_template(template)
-
-    human_template = "Here's the text to improve: {user_input}"
-    human_message_prompt = HumanMessagePromptTemplate.from_template(human_template)
+registry.register(
+    "grammarly_prompt",
+    GRAMMARLY_PROMPT_TEMPLATE,
+    "Here's the text to improve: {user_input}",
+)
 
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [system_message_prompt, human_message_prompt]
-    )
 
-    chain = LLMChain(llm=chat, prompt=chat_prompt)
+def grammarly_prompt(user_input):
+    chain = registry.get("grammarly_prompt")
     response = chain.run(user_input=user_input)
 
     return response
@@ -109,10 +94,7 @@ def grammarly_prompt(user_input):
     
 
 
-def draft_email(user_input, name="Landon"):
-    chat = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=1)
-
-    template = """
+DRAFT_EMAIL_TEMPLATE = """
     
     You are a helpful assistant that drafts an email reply based on an a new email.
     
@@ -126,17 +108,16 @@ def draft_email(user_input, name="Landon"):
     
     """
 
-    signature = f"Kind regards, \n\{name}"
-    system_message_prompt = SystemMessagePromptTemplate.from_template(template)
-
-    human_template = "Here's the email to reply to and consider any other comments from the user for reply as well: {user_input}"
-    human_message_prompt = HumanMessagePromptTemplate.from_template(human_template)
+registry.register(
+    "draft_email",
+    DRAFT_EMAIL_TEMPLATE,
+    "Here's the email to reply to and consider any other comments from the user for reply as well: {user_input}",
+)
 
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [system_message_prompt, human_message_prompt]
-    )
 
-    chain = LLMChain(llm=chat, prompt=chat_prompt)
+def draft_email(user_input, name="Landon"):
+    signature = f"Kind regards, \n\{name}"
+    chain = registry.get("draft_email")
     response = chain.run(user_input=user_input, signature=signature, name=name)
 
     return response
@@ -175,108 +156,31 @@ FUNCTION_DESCRIPTIONS = {
 
 FUNCTION_MAP = {name: globals()[name] for name in FUNCTION_DESCRIPTIONS.keys()}
 
-from langchain.prompts.chat import (
-    ChatPromptTemplate,
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate,
-)
-
-load_dotenv(find_dotenv())
-
-def check_for_enough_information(user_input):
-    chat = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=1)
-
-    template = f"""
-    You are a helpful assistant that determines if there is enough information in a request to properly respond to it.
-    You have three options for a response:
-    "enough": meaning you do not need any additional information to respond to the request.
-    "history": meaning you need more information from the user's prior chat history with you.
-    "clarify": meaning you need more information from the user's prior chat history with you and you need the user to clarify their request.
-    Remember, your output must be one of "enough", "history", or "clarify".
-    """
-
-    system_message_prompt = SystemMessagePromptTemplate.from_template(template)
-    template = "Here is the text that you are analyzing: {user_input}"
-    human_message_prompt = HumanMessagePromptTemplate.from_template(template)
-
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [system_message_prompt, human_message_prompt]
-    )
-
-    chain = LLMChain(llm=chat, prompt=chat_prompt)
-    response = chain.run(user_input=user_input)
-
-    response = response.lower()
-    
-    if response not in ['enough', 'history', 'clarify']:
-        return 'enough'
-    else:
-        return response
-    
-
-
-def decide_function(user_input):
-    chat = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=1)
-
-    template = f"""
-    You are a helpful assistant that decides which function to use based on user input.
-    Your goal is to determine which function is most relevant based on the user input.
-    Start by analyzing the user input and determining which function is most relevant.
-    Your output will be the name of the function that is most relevant. If you dont think any function is relevant, then output "generic_prompt".
-    Remember, your output should just be the name of the function and nothing else (or "generic_prompt" if you dont think any function is relevant)
-    The following dictionary pairs the name of each function with a description of what that function does:
-    """
-    for name, description in FUNCTION_DESCRIPTIONS.items():
-        template = template + f"\n{name}: {description}"
-
-    system_message_prompt = SystemMessagePromptTemplate.from_template(template)
-    human_message_prompt = HumanMessagePromptTemplate.from_template("{user_input}")
-
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [system_message_prompt, human_message_prompt]
-    )
-
-    chain = LLMChain(llm=chat, prompt=chat_prompt)
-    response = chain.run(user_input = user_input)
-    
-    response = response.lower()
-    
-    if response not in FUNCTION_DESCRIPTIONS.keys():
-        template = template + f"It is required that your output be just one of the following: {FUNCTION_DESCRIPTIONS.keys()}"
-        system_message_prompt = SystemMessagePromptTemplate.from_template(template)
-        human_message_prompt = HumanMessagePromptTemplate.from_template("{user_input}")
-
-        chat_prompt = ChatPromptTemplate.from_messages(
-            [system_message_prompt, human_message_prompt]
-        )
-
-        chain = LLMChain(llm=chat, prompt=chat_prompt)
-        response = chain.run(user_input = user_input)
-        
-        response = response.lower()
-        
-        if response not in FUNCTION_DESCRIPTIONS.keys():
-            raise ValueError(f"Langchain couldnt decide what to do")
-    
-    print(response)
-    return FUNCTION_MAP[response]
 
 def respond(body):
     text = body["event"]["text"]
 
     mention = f"<@{SLACK_BOT_USER_ID}>"
     text = text.replace(mention, "").strip()
-    info_check = check_for_enough_information(text)
+    # One routing step instead of separate sufficiency and function calls
+    info_check, function_name = route(text, FUNCTION_DESCRIPTIONS)
     if info_check == 'history':
         print('asking for more history')
-        # get the most recent messages from the user
-        pass
+        event = body["event"]
+        messages = history.context(
+            event["channel"], event.get("thread_ts"), before=event.get("ts")
+        )
+        if messages:
+            text = (
+                f"Recent conversation:\n{format_context(messages)}\n\n"
+                f"Latest message: {text}"
+            )
     elif info_check == 'clarify':
         print('asking to clarify')
         # ask user to provide more information
         pass
     
-    function = decide_function(text)
+    function = FUNCTION_MAP[function_name]
     response = function(text)
     return response
 
@@ -294,15 +198,8 @@ def get_recent_messages(channel_id, count=10):
     Returns:
         list: A list of message dictionaries.
     """
-    try:
-        # Initialize the Slack client with your bot token
-        slack_client = WebClient(token=os.environ["SLACK_BOT_TOKEN"])
-        response = slack_client.conversations_history(channel=channel_id, limit=count)
-        messages = response["messages"]
-        return messages
-    except SlackApiError as e:
-        print(f"Error: {e}")
-        return []
+    # Shared client and short-lived cache; see slack_client.get_recent_messages
+    return slack_client.get_recent_messages(channel_id, count=count)
     
     
     
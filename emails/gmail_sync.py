@@ -0,0 +1,323 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from googleapiclient.errors import HttpError
+
+from config import ROOT_DIR, create_logger
+from src import batch_get_emails, get_service, iter_message_ids
+
+logger = create_logger(__name__, file="gmail_sync.log")
+
+CACHE_PATH = ROOT_DIR / "data/gmail_cache.db"
+HEADERS = ["Subject", "From", "Date", "List-Unsubscribe", "List-Unsubscribe-Post"]
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+_lock = threading.Lock()
+
+
+class GmailCache:
+    """
+    Local SQLite copy of message metadata plus the historyId it is current as
+    of, so later runs only fetch what changed.
+
+    Args:
+        path (str): The SQLite database file.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id TEXT PRIMARY KEY,
+                    thread_id TEXT,
+                    history_id TEXT,
+                    label_ids TEXT,
+                    subject TEXT,
+                    sender TEXT,
+                    date TEXT,
+                    list_unsubscribe TEXT,
+                    list_unsubscribe_post TEXT,
+                    snippet TEXT,
+                    internal_date INTEGER,
+                    updated_at TEXT
+                )
+                """
+            )
+            # Unsubscribe links found in message bodies. Bodies never change,
+            # so each one only has to be fetched and scanned once
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS body_links (
+                    id TEXT PRIMARY KEY,
+                    links TEXT
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_state(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+            return row["value"] if row else None
+
+    def set_state(self, key, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def upsert(self, messages):
+        now = datetime.utcnow().isoformat()
+        rows = []
+        for message in messages:
+            headers = {
+                header["name"].lower(): header["value"]
+                for header in message.get("payload", {}).get("headers", [])
+            }
+            rows.append(
+                (
+                    message["id"],
+                    message.get("threadId"),
+                    message.get("historyId"),
+                    json.dumps(message.get("labelIds", [])),
+                    headers.get("subject"),
+                    headers.get("from"),
+                    headers.get("date"),
+                    headers.get("list-unsubscribe"),
+                    headers.get("list-unsubscribe-post"),
+                    message.get("snippet"),
+                    int(message.get("internalDate", 0)),
+                    now,
+                )
+            )
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, ids):
+        rows = [(id,) for id in ids]
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM messages WHERE id = ?", rows)
+            conn.executemany("DELETE FROM body_links WHERE id = ?", rows)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM body_links")
+            conn.execute("DELETE FROM sync_state")
+
+    def get_body_links(self):
+        """
+        Returns:
+            dict: Maps each message whose body has been scanned to its links.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, links FROM body_links").fetchall()
+        return {row["id"]: json.loads(row["links"]) for row in rows}
+
+    def set_body_links(self, links):
+        """Record the links found in message bodies, keyed by message id"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO body_links (id, links) VALUES (?, ?)",
+                [(id, json.dumps(urls)) for id, urls in links.items()],
+            )
+
+    def messages(self, label_id=None):
+        """
+        Cached messages, newest first.
+
+        Args:
+            label_id (str): Only messages with this label, e.g. "UNREAD".
+
+        Returns:
+            list: Message metadata dicts.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM messages ORDER BY internal_date DESC"
+            ).fetchall()
+
+        messages = []
+        for row in rows:
+            message = dict(row)
+            message["label_ids"] = json.loads(message["label_ids"] or "[]")
+            if label_id is None or label_id in message["label_ids"]:
+                messages.append(message)
+        return messages
+
+
+def _fetch_metadata(ids):
+    return batch_get_emails(
+        ids,
+        format="metadata",
+        metadata_headers=HEADERS,
+        fields="id,threadId,historyId,labelIds,snippet,internalDate,payload/headers",
+    )
+
+
+def full_sync(cache, query):
+    """
+    Rebuild the cache from every message matching the query.
+
+    The mailbox's historyId is read before listing, so changes made while the
+    sync runs are picked up by the next incremental sync.
+    """
+    service = get_service()
+    history_id = service.users().getProfile(userId="me").execute()["historyId"]
+
+    cache.clear()
+    batch = []
+    count = 0
+    for id in iter_message_ids(query):
+        batch.append(id)
+        if len(batch) == 500:
+            messages = _fetch_metadata(batch)
+            cache.upsert(messages.values())
+            count += len(messages)
+            batch = []
+    if batch:
+        messages = _fetch_metadata(batch)
+        cache.upsert(messages.values())
+        count += len(messages)
+
+    cache.set_state("history_id", str(history_id))
+    cache.set_state("query", query)
+    logger.info(f"Full sync cached {count} messages at history {history_id}")
+    return {"full": True, "changed": count, "deleted": 0}
+
+
+def _list_history(service, start_history_id):
+    """
+    Collect message changes since a historyId.
+
+    Returns:
+        tuple: (changed ids, deleted ids, latest historyId)
+    """
+    changed = set()
+    deleted = set()
+    page_token = None
+    latest = start_history_id
+    while True:
+        kwargs = {
+            "userId": "me",
+            "startHistoryId": start_history_id,
+            "historyTypes": HISTORY_TYPES,
+        }
+        if page_token:
+            kwargs["pageToken"] = page_token
+        response = service.users().history().list(**kwargs).execute()
+        latest = response.get("historyId", latest)
+
+        for record in response.get("history", []):
+            for key in ("messagesAdded", "labelsAdded", "labelsRemoved"):
+                for item in record.get(key, []):
+                    changed.add(item["message"]["id"])
+            for item in record.get("messagesDeleted", []):
+                deleted.add(item["message"]["id"])
+
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    return changed - deleted, deleted, latest
+
+
+def _matching_ids(query, ids):
+    """
+    The subset of ids that match a search query.
+
+    Listing stops once every id has been seen, which is usually within the
+    first page since changes are mostly new mail and results come newest
+    first.
+    """
+    matching = set()
+    if not ids:
+        return matching
+    for id in iter_message_ids(query):
+        if id in ids:
+            matching.add(id)
+            if len(matching) == len(ids):
+                break
+    return matching
+
+
+def sync(query="is:unread", cache=None):
+    """
+    Bring the local message cache up to date.
+
+    The first run (or a run with a different query) lists every message
+    matching the query. Later runs ask users.history.list for what changed
+    since the stored historyId, refetch the metadata of added or relabelled
+    messages and drop deleted ones. If Gmail no longer has history that far
+    back (HTTP 404) it falls back to a full sync.
+
+    History can't be filtered by a search query, so the changed ids are
+    checked against a listing of the query's matches (ids only) before any
+    metadata is fetched. Changed messages that no longer match are dropped.
+
+    Args:
+        query (str): Gmail search query for full syncs.
+        cache (GmailCache): Defaults to the cache in data/gmail_cache.db.
+
+    Returns:
+        dict: {"full": bool, "changed": int, "deleted": int}
+    """
+    cache = cache or GmailCache()
+    with _lock:
+        history_id = cache.get_state("history_id")
+        if history_id is None or cache.get_state("query") != query:
+            return full_sync(cache, query)
+
+        service = get_service()
+        try:
+            changed, deleted, latest = _list_history(service, history_id)
+        except HttpError as error:
+            if error.resp.status == 404:
+                logger.info(f"History {history_id} has expired, running a full sync")
+                return full_sync(cache, query)
+            raise
+
+        matching = _matching_ids(query, changed)
+        messages = _fetch_metadata(list(matching)) if matching else {}
+        cache.upsert(messages.values())
+        cache.delete(deleted | (changed - matching))
+        cache.set_state("history_id", str(latest))
+
+        logger.info(
+            f"Incremental sync from history {history_id} to {latest}: "
+            f"{len(messages)} changed, {len(deleted)} deleted"
+        )
+        return {"full": False, "changed": len(messages), "deleted": len(deleted)}
+
+
+if __name__ == "__main__":
+    print(sync())
@@ -0,0 +1,173 @@
+import threading
+from collections import OrderedDict, deque
+
+from config import create_logger
+import slack_client
+
+logger = create_logger(__name__)
+
+MAX_CONVERSATIONS = 500
+MAX_MESSAGES = 50
+MAX_TOKENS = 2000  # per conversation
+CONTEXT_TOKENS = 1000  # default budget for prompt context
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def _message(event):
+    return {
+        "user": event.get("user") or event.get("bot_id") or "unknown",
+        "text": event["text"],
+        "ts": event.get("ts"),
+        "tokens": estimate_tokens(event["text"]),
+    }
+
+
+class ConversationHistory:
+    """
+    Rolling in-memory history of recent messages per channel and per thread.
+
+    Each conversation is a ring buffer capped by message count and by
+    estimated tokens; the least recently used conversations are evicted once
+    there are more than `max_conversations`. It is kept up to date from
+    incoming events, so adding context to a prompt doesn't need a Slack API
+    call. A conversation seen for the first time is seeded once from the
+    channel's history.
+
+    Args:
+        max_conversations (int): Conversations kept before LRU eviction.
+        max_messages (int): Messages kept per conversation.
+        max_tokens (int): Estimated tokens kept per conversation.
+    """
+
+    def __init__(
+        self,
+        max_conversations=MAX_CONVERSATIONS,
+        max_messages=MAX_MESSAGES,
+        max_tokens=MAX_TOKENS,
+    ):
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self._conversations = OrderedDict()  # (channel, thread_ts) -> buffer
+        self._seeded = set()  # channels loaded from Slack history
+        self._lock = threading.Lock()
+
+    def _buffer(self, key):
+        """Get (or create) a conversation's buffer and mark it recently used"""
+        buffer = self._conversations.get(key)
+        if buffer is None:
+            buffer = {"messages": deque(maxlen=self.max_messages), "tokens": 0}
+            self._conversations[key] = buffer
+            while len(self._conversations) > self.max_conversations:
+                (channel, thread_ts), _ = self._conversations.popitem(last=False)
+                if thread_ts is None:
+                    self._seeded.discard(channel)
+        else:
+            self._conversations.move_to_end(key)
+        return buffer
+
+    def _append(self, buffer, message):
+        messages = buffer["messages"]
+        if message["ts"] and any(m["ts"] == message["ts"] for m in messages):
+            return
+        if len(messages) == messages.maxlen:
+            buffer["tokens"] -= messages[0]["tokens"]
+        messages.append(message)
+        buffer["tokens"] += message["tokens"]
+        while buffer["tokens"] > self.max_tokens and len(messages) > 1:
+            buffer["tokens"] -= messages.popleft()["tokens"]
+
+    def record(self, event):
+        """
+        Add a message event to its channel's (and thread's) history.
+
+        Args:
+            event (dict): A Slack message or app_mention event.
+        """
+        text = event.get("text")
+        channel = event.get("channel")
+        if not text or not channel:
+            return
+
+        message = _message(event)
+        with self._lock:
+            self._append(self._buffer((channel, None)), message)
+            thread_ts = event.get("thread_ts")
+            if thread_ts:
+                self._append(self._buffer((channel, thread_ts)), message)
+
+    def _seed(self, channel):
+        """Merge a channel's recent Slack history in the first time it's needed"""
+        with self._lock:
+            if channel in self._seeded:
+                return
+            self._seeded.add(channel)
+
+        try:
+            fetched = slack_client.get_recent_messages(channel, count=self.max_messages)
+        except Exception as e:
+            logger.error(f"Could not load history for {channel}: {e}")
+            return
+
+        with self._lock:
+            buffer = self._buffer((channel, None))
+            messages = {m["ts"]: m for m in buffer["messages"]}
+            for event in fetched:
+                if event.get("text") and event.get("ts") not in messages:
+                    messages[event["ts"]] = _message(event)
+
+            buffer["messages"].clear()
+            buffer["tokens"] = 0
+            for ts in sorted(messages, key=float):
+                self._append(buffer, messages[ts])
+
+    def context(
+        self, channel, thread_ts=None, token_budget=CONTEXT_TOKENS, before=None
+    ):
+        """
+        Get the most recent messages of a conversation that fit in a token
+        budget, oldest first.
+
+        Args:
+            channel (str): The channel ID.
+            thread_ts (str): The thread, or None for the channel itself.
+            token_budget (int): Maximum estimated tokens to return.
+            before (str): Only messages older than this timestamp, e.g. to
+                leave out the message being answered.
+
+        Returns:
+            list: Message dicts with user, text and ts.
+        """
+        if thread_ts is None:
+            self._seed(channel)
+
+        with self._lock:
+            buffer = self._conversations.get((channel, thread_ts))
+            if buffer is None:
+                return []
+            self._conversations.move_to_end((channel, thread_ts))
+            messages = list(buffer["messages"])
+
+        selected = []
+        used = 0
+        for message in reversed(messages):
+            if before and message["ts"] and float(message["ts"]) >= float(before):
+                continue
+            if used + message["tokens"] > token_budget:
+                break
+            selected.append(message)
+            used += message["tokens"]
+        selected.reverse()
+        return [{k: m[k] for k in ("user", "text", "ts")} for m in selected]
+
+
+def format_context(messages):
+    """Render messages as "user: text" lines for a prompt"""
+    return "\n".join(f"{m['user']}: {m['text']}" for m in messages)
+
+
+history = ConversationHistory()
@@ -0,0 +1,290 @@
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+from langchain.document_loaders import UnstructuredFileLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config import create_logger
+from embedding_cache import BATCH_SIZE
+from vector_index import COMPACT_RATIO, VectorIndex
+
+logger = create_logger(__name__)
+
+CHUNK_SIZE = 2000
+CHUNK_OVERLAP = 0
+WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+MANIFEST_FILE = "manifest.db"
+DEFAULT_DIM = 1536  # used when there is nothing to embed
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_and_split(path, known_hash=None):
+    """
+    Hash, load and split one file. Runs in a worker process.
+
+    Returns:
+        tuple: (hash, chunk dicts), with chunks None if the hash matches
+        `known_hash` and the file didn't need loading.
+    """
+    digest = file_hash(path)
+    if digest == known_hash:
+        return digest, None
+
+    documents = UnstructuredFileLoader(path).load()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    chunks = []
+    for doc in splitter.split_documents(documents):
+        metadata = dict(doc.metadata, source=path)
+        chunks.append({"page_content": doc.page_content, "metadata": metadata})
+    return digest, chunks
+
+
+class Manifest:
+    """
+    What has been indexed: one row per file with the mtime, size and content
+    hash it had when its chunks were written.
+
+    Args:
+        path (str): The SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL,
+                    size INTEGER,
+                    hash TEXT,
+                    chunks INTEGER
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def files(self):
+        """
+        Returns:
+            dict: Maps each path to its (mtime, size, hash) row.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path, mtime, size, hash FROM files")
+            return {path: (mtime, size, digest) for path, mtime, size, digest in rows}
+
+    def set_many(self, rows):
+        """Record (path, mtime, size, hash, chunks) rows"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def delete(self, paths):
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in paths]
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files")
+
+
+def scan(directory):
+    """Every non-hidden file under the directory, like DirectoryLoader's glob"""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def ingest(
+    directory,
+    index_path,
+    embeddings,
+    model,
+    mode="brute",
+    workers=WORKERS,
+    batch_size=BATCH_SIZE,
+    rebuild=False,
+):
+    """
+    Bring an index up to date with the files in a directory.
+
+    Files whose mtime and size match the manifest are skipped without being
+    read. The rest are hashed, loaded and split on a process pool, at most
+    two files per worker in flight, so memory stays bounded however large
+    the folder is. Files whose hash hasn't changed only have their manifest
+    row updated. Chunks are embedded and appended to the index in batches of
+    `batch_size` as files finish. A file's old chunks are deleted and its
+    manifest row written only once its new chunks are in the index, so an
+    interrupted run picks up where it left off. Files that have disappeared
+    are removed from the index.
+
+    Args:
+        directory (str): Folder of documents.
+        index_path (str): VectorIndex directory; the manifest lives there too.
+        embeddings: Object with embed_documents, e.g. CachedEmbeddings.
+        model (str): Embedding model name. Changing it rebuilds the index.
+        mode (str): VectorIndex search mode.
+        workers (int): Loader processes.
+        batch_size (int): Chunks embedded and written per batch.
+        rebuild (bool): Re-index every file.
+
+    Returns:
+        VectorIndex: The updated index.
+    """
+    index_path = str(index_path)
+    os.makedirs(index_path, exist_ok=True)
+    manifest = Manifest(os.path.join(index_path, MANIFEST_FILE))
+
+    index = None
+    if VectorIndex.exists(index_path):
+        index = VectorIndex(index_path, mode=mode)
+        if index.info.get("model") != model:
+            logger.info(f"Embedding model changed to {model}, rebuilding the index")
+            rebuild = True
+    if rebuild:
+        index = None
+        manifest.clear()
+
+    # Row ids per source file, kept current as rows are added
+    rows = {}
+    if index is not None:
+        for i, document in index.documents():
+            rows.setdefault(document["metadata"].get("source"), []).append(i)
+
+    known = manifest.files()
+    paths = list(scan(str(directory)))
+    removed = set(known) - set(paths)
+    if removed and index is not None:
+        index.delete(
+            [i for path in removed for i in rows.pop(path, [])], compact=False
+        )
+    manifest.delete(removed)
+
+    todo = []
+    for path in paths:
+        stat = os.stat(path)
+        row = known.get(path)
+        if row and row[0] == stat.st_mtime and row[1] == stat.st_size:
+            continue
+        todo.append((path, stat.st_mtime, stat.st_size, row[2] if row else None))
+    logger.info(
+        f"{len(paths)} files in {directory}: {len(todo)} to check, "
+        f"{len(paths) - len(todo)} unchanged, {len(removed)} removed"
+    )
+
+    pending = []  # (path, mtime, size, hash, chunks) waiting to be written
+    stats = {"indexed": 0, "unchanged": 0, "failed": 0, "chunks": 0}
+
+    def flush():
+        nonlocal index
+        if not pending:
+            return
+        documents = [chunk for *_, chunks in pending for chunk in chunks]
+        vectors = embeddings.embed_documents(
+            [document["page_content"] for document in documents]
+        )
+        if index is None:
+            dim = len(vectors[0]) if len(vectors) else DEFAULT_DIM
+            index = VectorIndex.create(
+                index_path, dim, mode=mode, info={"model": model}
+            )
+
+        # Add before deleting, so a crash in between leaves duplicates that
+        # the next run cleans up rather than a file missing from the index
+        old_rows = [i for path, *_ in pending for i in rows.pop(path, [])]
+        start = index.count
+        index.add(vectors, documents)
+        index.delete(old_rows, compact=False)
+        for offset, document in enumerate(documents):
+            rows.setdefault(document["metadata"]["source"], []).append(start + offset)
+
+        manifest.set_many(
+            [
+                (path, mtime, size, digest, len(chunks))
+                for path, mtime, size, digest, chunks in pending
+            ]
+        )
+        stats["indexed"] += len(pending)
+        stats["chunks"] += len(documents)
+        pending.clear()
+
+    # Spawn rather than fork: the caller may hold threads, locks and open
+    # connections (the embeddings client, the manifest) that must not be
+    # copied into the workers
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        queue = iter(todo)
+        in_flight = {}
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                in_flight[executor.submit(load_and_split, item[0], item[3])] = item
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        buffered = 0
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, mtime, size, _ = in_flight.pop(future)
+                submit_next()
+                try:
+                    digest, chunks = future.result()
+                except Exception as e:
+                    logger.error(f"Could not load {path}: {e}")
+                    stats["failed"] += 1
+                    continue
+
+                if chunks is None:
+                    count = len(rows.get(path, []))
+                    manifest.set_many([(path, mtime, size, digest, count)])
+                    stats["unchanged"] += 1
+                    continue
+                pending.append((path, mtime, size, digest, chunks))
+                buffered += len(chunks)
+                if buffered >= batch_size:
+                    flush()
+                    buffered = 0
+        flush()
+
+    if index is None:
+        index = VectorIndex.create(
+            index_path, DEFAULT_DIM, mode=mode, info={"model": model}
+        )
+    if len(index.deleted) > COMPACT_RATIO * index.count:
+        index.compact()
+
+    logger.info(
+        f"Indexed {stats['chunks']} chunks from {stats['indexed']} files; "
+        f"{stats['unchanged']} touched but unchanged, {stats['failed']} failed"
+    )
+    return index
@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.globals import get_llm_cache
+
+from config import ROOT_DIR, create_logger
+
+logger = create_logger(__name__, file="llm_calls.log")
+
+# Separate from the backend's LLM_METRICS_DB/LLM_METRICS_SINKS, whose llm_calls
+# table has different columns
+METRICS_DB = os.environ.get(
+    "EMAILS_LLM_METRICS_DB", str(ROOT_DIR / "data/email_llm_metrics.db")
+)
+METRICS_SINKS = os.environ.get("EMAILS_LLM_METRICS_SINKS", "log,sqlite")
+
+
+class LogSink:
+    """Write each call to data/logs/llm_calls.log"""
+
+    def emit(self, call):
+        logger.info(
+            f"{call['prompt'] or 'llm'} ({call['model']}): "
+            f"{call['latency_ms']:.0f} ms, "
+            f"{call['prompt_tokens']}+{call['completion_tokens']} tokens, "
+            f"cache {call['cache']}"
+            + (f", error {call['error']}" if call["error"] else "")
+        )
+
+
+class SQLiteSink:
+    """Append each call to the chain_calls table for offline analysis"""
+
+    def __init__(self, path=METRICS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def emit(self, call):
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=10)
+            try:
+                with conn:
+                    if not self._ready:
+                        conn.execute(
+                            """
+                            CREATE TABLE IF NOT EXISTS chain_calls (
+                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                timestamp TEXT NOT NULL,
+                                prompt TEXT,
+                                model TEXT,
+                                prompt_tokens INTEGER,
+                                completion_tokens INTEGER,
+                                ttft_ms REAL,
+                                latency_ms REAL NOT NULL,
+                                cache TEXT NOT NULL,
+                                error TEXT
+                            )
+                            """
+                        )
+                        self._ready = True
+                    conn.execute(
+                        "INSERT INTO chain_calls (timestamp, prompt, model, "
+                        "prompt_tokens, completion_tokens, ttft_ms, latency_ms, "
+                        "cache, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            call["timestamp"],
+                            call["prompt"],
+                            call["model"],
+                            call["prompt_tokens"],
+                            call["completion_tokens"],
+                            call["ttft_ms"],
+                            call["latency_ms"],
+                            call["cache"],
+                            call["error"],
+                        ),
+                    )
+            finally:
+                conn.close()
+
+
+def sinks_from_names(names=METRICS_SINKS):
+    """
+    Build sinks from a comma-separated list of log and sqlite, as in
+    EMAILS_LLM_METRICS_SINKS
+    """
+    names = [name.strip() for name in names.split(",")]
+    sinks = []
+    if "log" in names:
+        sinks.append(LogSink())
+    if "sqlite" in names:
+        sinks.append(SQLiteSink())
+    return sinks
+
+
+_default_sinks = None
+_default_sinks_lock = threading.Lock()
+
+
+def get_default_sinks():
+    """The sinks handlers report to when none are given"""
+    global _default_sinks
+    with _default_sinks_lock:
+        if _default_sinks is None:
+            _default_sinks = sinks_from_names()
+        return _default_sinks
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    LangChain callback that records the model, token usage, time to first
+    token, total latency and cache status of every LLM call made through a
+    chain.
+
+    A call is a cache hit when LangChain answers it from its LLM cache, a miss
+    when a cache is set but the model was called, and a bypass when no cache
+    is set.
+
+    Args:
+        prompt (str): Name of the prompt the calls belong to, e.g. "draft_email"
+        sinks (list): Objects with an emit(call) method. Defaults to the sinks
+            named in EMAILS_LLM_METRICS_SINKS.
+    """
+
+    def __init__(self, prompt=None, sinks=None):
+        self.prompt = prompt
+        self.sinks = sinks
+        self._runs = {}  # run_id -> {"start": ..., "ttft_ms": ...}
+
+    def _start(self, run_id):
+        self._runs[run_id] = {"start": time.perf_counter(), "ttft_ms": None}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run["ttft_ms"] is None:
+            run["ttft_ms"] = (time.perf_counter() - run["start"]) * 1000
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        run = self._runs.get(run_id)
+        if get_llm_cache() is None:
+            cache = "bypass"
+        elif not llm_output and run is not None and run["ttft_ms"] is None:
+            # Cached results are replayed without the provider's llm_output
+            # and without streaming any tokens
+            cache = "hit"
+        else:
+            cache = "miss"
+        self._finish(
+            run_id,
+            model=llm_output.get("model_name"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            cache=cache,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error.__class__.__name__)
+
+    def _finish(
+        self,
+        run_id,
+        model=None,
+        prompt_tokens=None,
+        completion_tokens=None,
+        cache="bypass",
+        error=None,
+    ):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+
+        call = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "prompt": self.prompt,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "ttft_ms": run["ttft_ms"],
+            "latency_ms": (time.perf_counter() - run["start"]) * 1000,
+            "cache": cache,
+            "error": error,
+        }
+        sinks = get_default_sinks() if self.sinks is None else self.sinks
+        for sink in sinks:
+            try:
+                sink.emit(call)
+            except Exception as e:
+                logger.error(
+                    f"LLM metrics sink {sink.__class__.__name__} failed: {e}"
+                )
@@ -0,0 +1,193 @@
+import json
+import math
+import re
+import zlib
+from collections import Counter
+
+from chains import registry
+from config import create_logger
+
+logger = create_logger(__name__)
+
+INFO_OPTIONS = ["enough", "history", "clarify"]
+DEFAULT_FUNCTION = "generic_prompt"
+
+# Phrases that make the intent unambiguous
+KEYWORD_RULES = {
+    "grammarly_prompt": re.compile(
+        r"\b(grammar|spelling|spell[- ]?check|proof ?read|typos?|fix (the|my) wording)\b",
+        re.IGNORECASE,
+    ),
+    "draft_email": re.compile(
+        r"\b(draft|write|compose) (a |an |the )?(reply|response|email|answer)\b"
+        r"|\breply to (this|the|that) email\b",
+        re.IGNORECASE,
+    ),
+}
+
+# Labelled examples for the bag-of-words pre-classifier
+EXAMPLES = {
+    "grammarly_prompt": [
+        "can you check this for grammar mistakes",
+        "please fix the spelling in this paragraph",
+        "correct my writing and tell me what you changed",
+        "does this sentence sound right",
+        "clean up the wording of this message",
+    ],
+    "draft_email": [
+        "help me respond to this email from my manager",
+        "write back to this message and say I can make it",
+        "reply to the email below and decline politely",
+        "what should I say back to this email",
+        "answer this email for me",
+    ],
+    "generic_prompt": [
+        "what is the capital of france",
+        "explain how compound interest works",
+        "give me ideas for dinner tonight",
+        "how do I convert a list to a set in python",
+        "summarize the main causes of the first world war",
+    ],
+}
+
+N_FEATURES = 2**12
+# Minimum cosine similarity, and margin over the runner-up, to skip the LLM
+MIN_SIMILARITY = 0.35
+MIN_MARGIN = 0.1
+# Requests shorter than this may rely on earlier messages, so the LLM decides
+MIN_WORDS_FOR_LOCAL = 8
+
+TOKEN_REGEX = re.compile(r"[a-z']+")
+
+
+def _vectorize(text):
+    """Hashed bag-of-words (unigrams and bigrams) as a sparse unit vector"""
+    words = TOKEN_REGEX.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    counts = Counter(zlib.crc32(f.encode()) % N_FEATURES for f in features)
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {k: v / norm for k, v in counts.items()} if norm else {}
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def _centroid(texts):
+    total = Counter()
+    for text in texts:
+        total.update(_vectorize(text))
+    norm = math.sqrt(sum(v * v for v in total.values()))
+    return {k: v / norm for k, v in total.items()}
+
+
+CENTROIDS = {name: _centroid(texts) for name, texts in EXAMPLES.items()}
+
+
+def classify_locally(user_input):
+    """
+    Try to pick the function without calling the LLM.
+
+    Args:
+        user_input (str): The user's message with the bot mention removed.
+
+    Returns:
+        str or None: The function name, or None if the intent isn't obvious.
+    """
+    if len(user_input.split()) < MIN_WORDS_FOR_LOCAL:
+        return None
+
+    matches = [name for name, rule in KEYWORD_RULES.items() if rule.search(user_input)]
+    if len(matches) == 1:
+        return matches[0]
+    if matches:
+        return None
+
+    vector = _vectorize(user_input)
+    scores = sorted(
+        ((_cosine(vector, centroid), name) for name, centroid in CENTROIDS.items()),
+        reverse=True,
+    )
+    (best, name), (runner_up, _) = scores[0], scores[1]
+    if best >= MIN_SIMILARITY and best - runner_up >= MIN_MARGIN:
+        return name
+    return None
+
+
+def _parse_route(response, function_names):
+    try:
+        data = json.loads(response)
+    except (TypeError, ValueError):
+        logger.warning(f"Router returned invalid JSON: {response!r}")
+        return "enough", DEFAULT_FUNCTION
+
+    info = str(data.get("information", "")).lower()
+    function = str(data.get("function", "")).lower()
+    if info not in INFO_OPTIONS:
+        info = "enough"
+    if function not in function_names:
+        function = DEFAULT_FUNCTION
+    return info, function
+
+
+ROUTE_TEMPLATE = (
+    "You route requests sent to a helpful assistant.\n"
+    "Decide two things about the user's request and answer with a JSON object "
+    'with the keys "information" and "function".\n'
+    '"information" is one of:\n'
+    '"enough": you do not need any additional information to respond.\n'
+    "\"history\": you need the user's prior chat history with you.\n"
+    '"clarify": you need the user to clarify their request.\n'
+    '"function" is the name of the most relevant function below, or '
+    f'"{DEFAULT_FUNCTION}" if none fits:\n'
+    "{functions}"
+)
+
+registry.register(
+    "route",
+    ROUTE_TEMPLATE,
+    "{user_input}",
+    temperature=0,
+    model_kwargs={"response_format": {"type": "json_object"}},
+)
+
+
+def route_with_llm(user_input, function_descriptions):
+    """
+    Decide in a single JSON-mode call whether there is enough information to
+    respond and which function should handle the request.
+
+    Returns:
+        tuple: (information, function_name)
+    """
+    functions = "\n".join(
+        f"{name}: {description}" for name, description in function_descriptions.items()
+    )
+    chain = registry.get("route")
+    response = chain.run(user_input=user_input, functions=functions)
+    return _parse_route(response, function_descriptions.keys())
+
+
+def route(user_input, function_descriptions):
+    """
+    Route a request using the local pre-classifier when the intent is obvious,
+    and a single LLM call otherwise.
+
+    Args:
+        user_input (str): The user's message with the bot mention removed.
+        function_descriptions (dict): Maps function names to descriptions.
+
+    Returns:
+        tuple: (information, function_name) where information is one of
+        "enough", "history" or "clarify".
+    """
+    function = classify_locally(user_input)
+    if function is not None and function in function_descriptions:
+        logger.info(f"Routed locally to {function}")
+        return "enough", function
+
+    info, function = route_with_llm(user_input, function_descriptions)
+    logger.info(f"Routed by LLM to {function} ({info})")
+    return info, function
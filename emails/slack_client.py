@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+
+from dotenv import find_dotenv, load_dotenv
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+
+from config import create_logger
+
+load_dotenv(find_dotenv())
+
+logger = create_logger(__name__)
+
+IDENTITY_TTL = 3600  # bot identity only changes if the app is reinstalled
+CHANNEL_TTL = 600
+HISTORY_TTL = 30
+HISTORY_PAGE_SIZE = 200  # Slack's recommended maximum per page
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class TTLCache:
+    """
+    Small thread-safe cache whose entries expire after `ttl` seconds
+
+    Args:
+        ttl (float): Seconds an entry stays valid.
+        max_size (int): Oldest entries are dropped beyond this many.
+    """
+
+    def __init__(self, ttl, max_size=1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.max_size:
+                self._entries.pop(next(iter(self._entries)))
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+_identity_cache = TTLCache(IDENTITY_TTL, max_size=1)
+_channel_cache = TTLCache(CHANNEL_TTL)
+_history_cache = TTLCache(HISTORY_TTL)
+
+
+def get_client():
+    """
+    Return the process-wide WebClient. Sharing one client avoids rebuilding
+    it per event, and its retry handler waits out rate limits instead of
+    failing the request.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WebClient(
+                token=os.environ["SLACK_BOT_TOKEN"],
+                retry_handlers=[RateLimitErrorRetryHandler(max_retry_count=2)],
+            )
+        return _client
+
+
+def get_bot_identity():
+    """
+    Get the bot's identity from auth.test, cached for an hour.
+
+    Returns:
+        dict: The auth.test response data (user_id, bot_id, team_id, ...).
+    """
+    identity = _identity_cache.get("identity")
+    if identity is None:
+        identity = get_client().auth_test().data
+        _identity_cache.set("identity", identity)
+    return identity
+
+
+def get_bot_user_id():
+    """
+    Get the bot user ID.
+
+    Returns:
+        str: The bot user ID.
+    """
+    return get_bot_identity()["user_id"]
+
+
+def get_channel_info(channel_id):
+    """
+    Get a channel's metadata from conversations.info, cached for ten minutes.
+
+    Args:
+        channel_id (str): The ID of the Slack channel.
+
+    Returns:
+        dict: The channel object.
+    """
+    channel = _channel_cache.get(channel_id)
+    if channel is None:
+        channel = get_client().conversations_info(channel=channel_id)["channel"]
+        _channel_cache.set(channel_id, channel)
+    return channel
+
+
+def iter_history(channel_id, limit=None, oldest=None, page_size=HISTORY_PAGE_SIZE):
+    """
+    Iterate over a channel's messages, newest first, following pagination
+    cursors until `limit` messages have been yielded or history runs out.
+
+    Args:
+        channel_id (str): The ID of the Slack channel.
+        limit (int): Maximum number of messages. Defaults to all of them.
+        oldest (str): Only messages after this timestamp.
+        page_size (int): Messages requested per page.
+    """
+    client = get_client()
+    cursor = None
+    yielded = 0
+    while True:
+        kwargs = {"channel": channel_id, "limit": page_size}
+        if limit is not None:
+            kwargs["limit"] = min(page_size, limit - yielded)
+        if cursor:
+            kwargs["cursor"] = cursor
+        if oldest:
+            kwargs["oldest"] = oldest
+
+        response = client.conversations_history(**kwargs)
+        for message in response["messages"]:
+            yield message
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more") or not cursor:
+            return
+
+
+def get_recent_messages(channel_id, count=10):
+    """
+    Get the most recent messages sent in a Slack channel. Results are cached
+    for a few seconds so bursts of events don't each refetch history.
+
+    Args:
+        channel_id (str): The ID of the Slack channel to get messages from.
+        count (int): The number of messages to retrieve. Defaults to 10.
+
+    Returns:
+        list: A list of message dictionaries.
+    """
+    key = (channel_id, count)
+    messages = _history_cache.get(key)
+    if messages is not None:
+        return messages
+
+    try:
+        messages = list(iter_history(channel_id, limit=count))
+    except SlackApiError as e:
+        logger.error(f"Error fetching history for {channel_id}: {e}")
+        return []
+
+    _history_cache.set(key, messages)
+    return messages
@@ -1,4 +1,10 @@
 import os.path
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -12,7 +18,26 @@ SCOPES = [
     "https://mail.google.com/"
     ]
 
-def get_service() -> Resource:
+# Refresh the access token this long before it expires, so a request never
+# goes out with a token that lapses mid-flight
+REFRESH_MARGIN = timedelta(minutes=5)
+
+_creds = None
+_creds_lock = threading.Lock()
+# httplib2 isn't thread-safe, so each thread builds its own service object
+_local = threading.local()
+# Fetch pools by size. They live as long as the process, so their threads
+# (and the services those threads have built) are reused across calls
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _save_credentials(creds):
+    with open("token.json", "w") as token:
+        token.write(creds.to_json())
+
+
+def _load_credentials():
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -24,85 +49,429 @@ def get_service() -> Resource:
                 "credentials.json", SCOPES
             )
             creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+        _save_credentials(creds)
+    return creds
 
-    service = build("gmail", "v1", credentials=creds)
-    
+
+def _expires_soon(creds):
+    if not creds.valid:
+        return True
+    # google-auth keeps expiry as a naive UTC datetime
+    if creds.expiry is None:
+        return False
+    return creds.expiry - datetime.utcnow() < REFRESH_MARGIN
+
+
+def get_credentials() -> Credentials:
+    """
+    Return the process-wide Gmail credentials, loading them from token.json on
+    first use and refreshing them shortly before they expire. The lock makes
+    sure only one thread refreshes at a time.
+    """
+    global _creds
+    with _creds_lock:
+        if _creds is None:
+            _creds = _load_credentials()
+        elif _expires_soon(_creds) and _creds.refresh_token:
+            _creds.refresh(Request())
+            _save_credentials(_creds)
+        return _creds
+
+
+def get_service() -> Resource:
+    """
+    Return a Gmail service for the current thread. Services are built once
+    per thread from the bundled discovery document (no discovery request at
+    runtime) and share the cached credentials.
+    """
+    creds = get_credentials()
+    service = getattr(_local, "service", None)
+    if service is None or _local.creds is not creds:
+        service = build(
+            "gmail",
+            "v1",
+            credentials=creds,
+            static_discovery=True,
+            cache_discovery=False,
+        )
+        _local.service = service
+        _local.creds = creds
     return service
 
-def mark_emails_as_spam(email_ids):
+
+# Gmail API limits
+BATCH_MODIFY_LIMIT = 1000  # ids per users.messages.batchModify call
+BATCH_REQUEST_LIMIT = 100  # calls per batch HTTP request
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _modify_individually(service, email_ids, body):
+    """
+    Modify each message with its own call, sent as batch HTTP requests, so
+    a failure only affects the message it belongs to. If a batch request
+    fails as a whole, its error is recorded against every id it hadn't
+    answered.
+    """
+    results = {}
+
+    def callback(request_id, response, exception):
+        results[request_id] = exception
+
+    for chunk in _chunks(email_ids, BATCH_REQUEST_LIMIT):
+        batch = service.new_batch_http_request(callback=callback)
+        for id in chunk:
+            batch.add(
+                service.users().messages().modify(userId='me', id=id, body=body),
+                request_id=id,
+            )
+        try:
+            batch.execute()
+        except Exception as error:
+            for id in chunk:
+                results.setdefault(id, error)
+    return results
+
+
+def batch_modify_labels(email_ids, add_label_ids=None, remove_label_ids=None):
+    """
+    Add and remove labels on many messages with as few requests as possible.
+
+    Uses users.messages.batchModify in chunks of 1000 ids. If a chunk fails,
+    its messages are retried one call each (in batch HTTP requests of 100) to
+    find out which ones failed.
+
+    Args:
+        email_ids (list): Message ids to modify.
+        add_label_ids (list): Labels to add.
+        remove_label_ids (list): Labels to remove.
+
+    Returns:
+        dict: Maps each message id to None on success or the exception that
+        made it fail, including failures to reach Gmail at all.
+    """
+    email_ids = list(dict.fromkeys(email_ids))
+    body = {
+        'addLabelIds': add_label_ids or [],
+        'removeLabelIds': remove_label_ids or [],
+    }
     try:
         service = get_service()
-        for id in email_ids:
-            service.users().messages().modify(userId='me', id=id, body={'removeLabelIds': [], 'addLabelIds': ['SPAM']}).execute()
-        return True
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        return error
+    except Exception as error:
+        print(f"Could not connect to Gmail: {error}")
+        return {id: error for id in email_ids}
+
+    results = {}
+    for chunk in _chunks(email_ids, BATCH_MODIFY_LIMIT):
+        try:
+            service.users().messages().batchModify(
+                userId='me', body=dict(body, ids=chunk)
+            ).execute()
+            results.update((id, None) for id in chunk)
+        except Exception as error:
+            print(f"batchModify failed, modifying individually: {error}")
+            results.update(_modify_individually(service, chunk, body))
+    return results
+
+
+def mark_emails_as_spam(email_ids):
+    """
+    Move messages to spam.
+
+    Returns:
+        dict: Maps each message id to None on success or the error it hit.
+    """
+    results = batch_modify_labels(email_ids, add_label_ids=['SPAM'])
+    for id, error in results.items():
+        if error is not None:
+            print(f"An error occurred marking {id} as spam: {error}")
+    return results
+
+
+def iter_message_pages(
+    query="is:unread",
+    page_size=500,
+    label_ids=None,
+    fields="messages/id,nextPageToken",
+):
+    """
+    Yield pages of messages matching a search, following nextPageToken until
+    there are no more. Only the fields asked for are returned (just the ids by
+    default), which keeps list responses small.
+
+    Args:
+        query (str): Gmail search query.
+        page_size (int): Messages per page, at most 500.
+        label_ids (list): Only messages with all of these labels.
+        fields (str): Partial response selector for the list call.
+
+    Yields:
+        list: The message dicts of one page.
+    """
+    service = get_service()
+    kwargs = {"userId": "me", "q": query, "maxResults": page_size, "fields": fields}
+    if label_ids:
+        kwargs["labelIds"] = label_ids
+
+    page_token = None
+    while True:
+        if page_token:
+            kwargs["pageToken"] = page_token
+        results = service.users().messages().list(**kwargs).execute()
+        messages = results.get("messages", [])
+        if messages:
+            yield messages
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def iter_message_ids(query="is:unread", page_size=500, label_ids=None):
+    """Stream the ids of every message matching a search, page by page"""
+    for page in iter_message_pages(query, page_size, label_ids):
+        for message in page:
+            yield message["id"]
+
+
+def iter_messages(
+    query="is:unread",
+    format="metadata",
+    fields=None,
+    metadata_headers=None,
+    page_size=100,
+    prefetch_pages=2,
+    max_workers=4,
+):
+    """
+    Stream message details for every message matching a search.
+
+    A background thread lists pages of ids while the caller processes the
+    messages of earlier pages, which are fetched with batch_get_emails. At
+    most `prefetch_pages` pages are buffered, so memory stays constant however
+    large the inbox is.
+
+    Args:
+        query (str): Gmail search query.
+        format, fields, metadata_headers, max_workers: See batch_get_emails.
+        page_size (int): Ids listed (and fetched) per page.
+        prefetch_pages (int): Pages of ids listed ahead of the consumer.
+
+    Yields:
+        dict: Message resources, in list order.
+    """
+    pages = queue.Queue(maxsize=prefetch_pages)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up if the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in iter_message_pages(query, page_size):
+                if not put([message["id"] for message in page]):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    producer = threading.Thread(target=produce, name="gmail-list", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            messages = batch_get_emails(
+                item,
+                format=format,
+                fields=fields,
+                metadata_headers=metadata_headers,
+                max_workers=max_workers,
+            )
+            yield from messages.values()
+    finally:
+        stop.set()
 
 
 def get_inbox_emails(n = 50):
-    """Gets the first n messages in the user's inbox."""
+    """Gets the first n unread messages in the user's inbox."""
     try:
-        service = get_service()
-        results = (
-            service.users()
-            .messages()
-            .list(userId="me", maxResults=n, q="is:unread")
-            .execute()
-        )
-        messages = results.get("messages", [])
+        messages = []
+        for page in iter_message_pages(
+            "is:unread",
+            page_size=min(n, 500),
+            fields="messages(id,threadId),nextPageToken",
+        ):
+            messages.extend(page[:n - len(messages)])
+            if len(messages) >= n:
+                break
         return messages
     except HttpError as error:
         print(f"An error occurred: {error}")
 
-def batch_get_emails(email_ids):
-    response_list = []
-    def callback(request_id, response, exception):
-        if exception:
-            print(f"An error occurred: {exception}")
-        else:
-            response_list.append(response)
+
+# Gmail allows 100 calls per batch but rate-limits large ones; 50 is the
+# size its docs recommend
+BATCH_GET_SIZE = 50
+MAX_RETRIES = 5
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+def _is_retryable(error):
+    # Dropped connections and timeouts from httplib2
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status in RETRYABLE_STATUSES:
+        return True
+    details = error.error_details if isinstance(error.error_details, list) else []
+    reasons = {d.get("reason") for d in details if isinstance(d, dict)}
+    return error.resp.status == 403 and bool(reasons & RATE_LIMIT_REASONS)
+
+
+def _backoff(attempt):
+    return min(32, 2 ** attempt) + random.random()
+
+
+def _get_executor(max_workers):
+    with _executors_lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="gmail-fetch"
+            )
+            _executors[max_workers] = executor
+        return executor
+
+
+def _get_chunk(email_ids, get_kwargs, max_retries=MAX_RETRIES):
+    """
+    Fetch one chunk of messages in a batch request, retrying the calls that
+    were rate limited or hit a server error. If the batch request as a whole
+    fails with a retryable error, the ids that hadn't come back yet are
+    retried the same way.
+
+    Returns:
+        tuple: (messages keyed by id, errors keyed by id)
+    """
     service = get_service()
-    batch = service.new_batch_http_request()
-    for id in email_ids:
-        batch.add(service.users().messages().get(id = id, userId='me'), callback=callback)
-    
-    batch.execute()
-    
-    return response_list
-    
-    
+    results = {}
+    errors = {}
+    pending = list(email_ids)
+
+    for attempt in range(max_retries + 1):
+        retry = []
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = response
+                errors.pop(request_id, None)
+            elif _is_retryable(exception):
+                retry.append(request_id)
+                errors[request_id] = exception
+            else:
+                errors[request_id] = exception
+
+        batch = service.new_batch_http_request(callback=callback)
+        for id in pending:
+            batch.add(
+                service.users().messages().get(userId='me', id=id, **get_kwargs),
+                request_id=id,
+            )
+        try:
+            batch.execute()
+        except Exception as error:
+            if not _is_retryable(error):
+                raise
+            # Retry everything that didn't succeed or fail for good
+            retry = [
+                id for id in pending
+                if id not in results
+                and (id not in errors or _is_retryable(errors[id]))
+            ]
+            errors.update((id, error) for id in retry)
 
+        if not retry or attempt == max_retries:
+            break
+        pending = retry
+        time.sleep(_backoff(attempt))
+
+    return results, errors
+
+
+def batch_get_emails(
+    email_ids,
+    format="full",
+    fields=None,
+    metadata_headers=None,
+    max_workers=4,
+):
+    """
+    Fetch many messages with batch requests.
+
+    Ids are split into batches of BATCH_GET_SIZE that run concurrently on a
+    long-lived thread pool, shared by every call with the same max_workers;
+    calls that are rate limited are retried with exponential backoff.
+
+    Args:
+        email_ids (list): Message ids to fetch.
+        format (str): "full", "metadata", "minimal" or "raw".
+        fields (str): Partial response selector, e.g. "id,snippet,payload/headers".
+        metadata_headers (list): Headers to return with format="metadata".
+        max_workers (int): Batches in flight at once.
+
+    Returns:
+        dict: Messages keyed by id, in the order the ids were given. Messages
+        that could not be fetched are left out and their errors printed.
+    """
+    email_ids = list(dict.fromkeys(email_ids))
+    get_kwargs = {"format": format}
+    if fields:
+        get_kwargs["fields"] = fields
+    if metadata_headers:
+        get_kwargs["metadataHeaders"] = metadata_headers
+
+    results = {}
+    executor = _get_executor(max_workers)
+    futures = [
+        executor.submit(_get_chunk, chunk, get_kwargs)
+        for chunk in _chunks(email_ids, BATCH_GET_SIZE)
+    ]
+    for future in futures:
+        messages, errors = future.result()
+        results.update(messages)
+        for id, error in errors.items():
+            print(f"An error occurred fetching {id}: {error}")
+
+    return {id: results[id] for id in email_ids if id in results}
 
 
 def authorize():
   """Shows basic usage of the Gmail API.
   Lists the user's Gmail labels.
   """
-  creds = None
   # The file token.json stores the user's access and refresh tokens, and is
   # created automatically when the authorization flow completes for the first
   # time.
-  if os.path.exists("token.json"):
-    creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-  # If there are no (valid) credentials available, let the user log in.
-  if not creds or not creds.valid:
-    if creds and creds.expired and creds.refresh_token:
-      creds.refresh(Request())
-    else:
-      flow = InstalledAppFlow.from_client_secrets_file(
-          "credentials.json", SCOPES
-      )
-      creds = flow.run_local_server(port=0)
-    # Save the credentials for the next run
-    with open("token.json", "w") as token:
-      token.write(creds.to_json())
-
   try:
     # Call the Gmail API
-    service = build("gmail", "v1", credentials=creds)
+    service = get_service()
     
     results = service.users().labels().list(userId="me").execute()
     labels = results.get("labels", [])
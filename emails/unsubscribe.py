@@ -11,36 +11,99 @@
 # 
 
 import base64
+import html
 import re
 import webbrowser
 from urllib.parse import urlparse
-from googleapiclient.discovery import build
-from httplib2 import Http
+
+from config import ROOT_DIR
+from gmail_sync import GmailCache, sync
+from src import BATCH_GET_SIZE, batch_get_emails
 
 
 # URL REGEX for finding all types of links.
 URL_REGEX = r"""(?i)\b((?:https?:(?:/{1,3}|[a-z0-9%])|[a-z0-9.\-]+[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)/)(?:[^\s()<>{}\[\]]+|\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\))+(?:\([^\s()]*?\([^\s()]+\)[^\s()]*?\)|\([^\s]+?\)|[^\s`!()\[\]{};:'".,<>?«»“”‘’])|(?:(?<!@)[a-z0-9]+(?:[.\-][a-z0-9]+)*[.](?:com|net|org|edu|gov|mil|aero|asia|biz|cat|coop|info|int|jobs|mobi|museum|name|post|pro|tel|travel|xxx|ac|ad|ae|af|ag|ai|al|am|an|ao|aq|ar|as|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|cr|cs|cu|cv|cx|cy|cz|dd|de|dj|dk|dm|do|dz|ec|ee|eg|eh|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|io|iq|ir|is|it|je|jm|jo|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mk|ml|mm|mn|mo|mp|mq|mr|ms|mt|mu|mv|mw|mx|my|mz|na|nc|ne|nf|ng|ni|nl|no|np|nr|nu|nz|om|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|Ja|sk|sl|sm|sn|so|sr|ss|st|su|sv|sx|sy|sz|tc|td|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|ye|yt|yu|za|zm|zw)()))"""
 
 
-def filewriter(url):
-    """ A simple file writer """
-    with open("links.csv", "a") as f:
-        f.write(f"{url}\n")
+URL_PATTERN = re.compile(URL_REGEX)
+
+# Links with a scheme that mention unsubscribe somewhere in the URL. Anchored on
+# the scheme, so it is far cheaper than URL_PATTERN
+UNSUBSCRIBE_LINK = re.compile(
+    r"""https?://[^\s"'<>()]*?unsubscribe[^\s"'<>()]*""", re.IGNORECASE
+)
+HEADER_LINK = re.compile(r"<([^>]+)>")
+
+# Kept apart from the default sync cache, which follows a different query
+CACHE_PATH = ROOT_DIR / "data/unsubscribe_cache.db"
+
+
+def write_links(urls, path="links.csv"):
+    """Write all the links in one buffered pass"""
+    with open(path, "w") as f:
+        f.writelines(f"{url}\n" for url in urls)
+
+
+def domain_key(url):
+    """The scheme-less host a link points to, used to keep one link per sender"""
+    if not url.startswith('http://') and not url.startswith('https://'):
+        url = 'http://' + url
+    return urlparse(url).netloc.lower()
 
 
-def getemails(service, page_token):
-    """Recursive function to read all the emails. 
-    The google responses has next page token, 
-    which is used to call the next page of emails"""
-    msgs = service.users().messages().list(userId='me', pageToken=page_token, q='unsubscribe', maxResults=500).execute()
-    if 'nextPageToken' in msgs:
-        next_page_token = msgs['nextPageToken']
-    else:
-        return True
-    for msg in msgs['messages']:
-        emailbody(service, msg['id'])
-    print(f"Next Page Token = {next_page_token}")
-    getemails(service, next_page_token)
+def getemails(query='unsubscribe', max_workers=4, cache=None):
+    """Read every email matching the query and collect one unsubscribe link
+    per domain.
+
+    Message headers come from a local cache brought up to date with
+    gmail_sync.sync, so after the first run only new or changed messages are
+    fetched. The link is taken from the List-Unsubscribe header where there
+    is one. Messages without a web link in their headers have their full
+    bodies fetched and scanned once; the links found are kept in the cache.
+
+    Returns:
+        dict: Maps each domain to the first unsubscribe link found for it.
+    """
+    cache = cache or GmailCache(CACHE_PATH)
+    sync(query, cache=cache)
+
+    links = {}
+    scanned = cache.get_body_links()
+    from_bodies = []
+    needs_body = []
+    messages = cache.messages()
+    for message in messages:
+        urls = list_unsubscribe_links(
+            message['list_unsubscribe'], message['list_unsubscribe_post']
+        )
+        if urls:
+            links.setdefault(domain_key(urls[0]), urls[0])
+        elif message['id'] in scanned:
+            from_bodies.extend(scanned[message['id']])
+        else:
+            needs_body.append(message['id'])
+    print(
+        f"{len(messages)} cached email headers, {len(needs_body)} bodies to scan"
+    )
+
+    page_size = BATCH_GET_SIZE * max_workers  # one batch per worker per page
+    for i in range(0, len(needs_body), page_size):
+        bodies = batch_get_emails(
+            needs_body[i:i + page_size],
+            format='full',
+            fields='id,payload',
+            max_workers=max_workers,
+        )
+        found = {id: emailbody(message) for id, message in bodies.items()}
+        cache.set_body_links(found)
+        for urls in found.values():
+            from_bodies.extend(urls)
+
+    for url in from_bodies:
+        links.setdefault(domain_key(url), url)
+
+    print(f"Found {len(links)} domains")
+    return links
 
 
 def openlinks():
@@ -57,34 +120,81 @@ def openlinks():
             webbrowser.open_new_tab(lst[link])
 
 
-def emailbody(service, email_id):
-    msg = service.users().messages().get(userId='me', id=email_id).execute()
-    payld = msg['payload']
-    if 'parts' in payld:
-        mssg_parts = payld['parts']  # fetching the message parts
-        part_one = mssg_parts[0]  # fetching first element of the part
-        part_body = part_one['body']  # fetching body of the message
-        if 'data' in part_body:
-            part_data = part_body['data']  # fetching data from the body
-            # decoding from Base64 to UTF-8
-            clean_one = part_data.replace("-", "+").replace("_", "/")
-            # decoding from Base64 to UTF-8
-            clean_two = base64.b64decode(bytes(clean_one, 'UTF-8'))
-            values = re.findall(URL_REGEX, str(clean_two))
-            for val in values:
-                if 'unsubscribe' in val[0]:
-                    filewriter(val[0])
+def header_links(msg):
+    """Web links from a message's List-Unsubscribe header, one-click first
+
+    mailto: links are skipped since they can't be opened in the browser.
+    """
+    headers = {
+        header['name'].lower(): header['value']
+        for header in msg.get('payload', {}).get('headers', [])
+    }
+    return list_unsubscribe_links(
+        headers.get('list-unsubscribe'), headers.get('list-unsubscribe-post')
+    )
+
+
+def list_unsubscribe_links(value, post=None):
+    """Web links from List-Unsubscribe and List-Unsubscribe-Post values"""
+    if not value:
+        return []
+    urls = [
+        url.strip() for url in HEADER_LINK.findall(value)
+        if url.strip().lower().startswith(('http://', 'https://'))
+    ]
+    # RFC 8058: with List-Unsubscribe-Post the https link unsubscribes in one
+    # click, so put it first
+    if 'one-click' in (post or '').lower():
+        urls.sort(key=lambda url: not url.lower().startswith('https://'))
+    return urls
+
+
+def _walk_parts(part):
+    yield part
+    for child in part.get('parts', []):
+        yield from _walk_parts(child)
+
+
+def _decode(data):
+    # Gmail uses unpadded URL-safe base64
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)).decode(
+        'utf-8', errors='replace'
+    )
+
+
+def body_links(text):
+    """Unsubscribe links in a decoded body
+
+    A plain substring check rules out most bodies before any regex runs; the
+    anchored pattern handles links with a scheme and the full URL_PATTERN is
+    only used when that finds nothing.
+    """
+    if 'unsubscribe' not in text.lower():
+        return []
+    links = [html.unescape(url) for url in UNSUBSCRIBE_LINK.findall(text)]
+    if not links:
+        links = [
+            match[0] for match in URL_PATTERN.findall(text)
+            if 'unsubscribe' in match[0].lower()
+        ]
+    return links
+
+
+def emailbody(msg):
+    """Unsubscribe links in every text part of a fetched message"""
+    links = []
+    for part in _walk_parts(msg['payload']):
+        data = part.get('body', {}).get('data')
+        if data and part.get('mimeType', 'text/plain').startswith('text/'):
+            links.extend(body_links(_decode(data)))
+    return list(dict.fromkeys(links))
 
 
 def main():
-    """Shows basic usage of the Gmail API.
-    Lists the user's Gmail labels.
-    """
-    service = build('gmail', 'v1', http=Http())
-    msg = service.users().messages().list(userId='me', q="unsubscribe", maxResults=500).execute()
-    output = getemails(service, msg['nextPageToken'])
-    if output is True:
-        openlinks()
+    """Collect an unsubscribe link for every sender and open them."""
+    links = getemails()
+    write_links(links.values())
+    openlinks()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,336 @@
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import create_logger
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = create_logger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+DOCUMENTS_FILE = "documents.jsonl"
+META_FILE = "meta.json"
+HNSW_FILE = "hnsw.bin"
+
+# HNSW build and search parameters; higher means better recall, slower builds
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Rewrite the files once this share of rows has been deleted
+COMPACT_RATIO = 0.2
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _write_meta(path, meta):
+    # Atomic replace, so readers never see a half-written file
+    tmp = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, META_FILE))
+
+
+class VectorIndex:
+    """
+    On-disk cosine similarity index.
+
+    Vectors are stored normalized as a raw float32 file that is memory-mapped
+    for search, so opening an index costs almost nothing and the OS only pages
+    in what a search touches. Documents (text and metadata) live next to it as
+    JSON lines, one per vector. Rows are only ever appended; meta.json holds
+    the committed row count and is written last, so an interrupted write
+    leaves the index as it was. Deleted rows are skipped by search until
+    enough of them pile up, then the files are rewritten without them.
+
+    Search is exact brute force (one matrix-vector product) by default. With
+    mode="hnsw" and hnswlib installed, an approximate HNSW graph is built on
+    first search, saved alongside the vectors and extended as rows are added.
+
+    Args:
+        path (str): Directory holding the index files.
+        mode (str): "brute" or "hnsw".
+    """
+
+    def __init__(self, path, mode="brute"):
+        self.path = str(path)
+        if mode == "hnsw" and hnswlib is None:
+            logger.warning("hnswlib is not installed, using brute-force search")
+            mode = "brute"
+        self.mode = mode
+        self._lock = threading.RLock()
+        self._vectors = None
+        self._documents = None
+        self._hnsw = None
+
+        with open(self._file(META_FILE)) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.documents_size = meta.get("documents_size", 0)
+        self.deleted = set(meta.get("deleted", []))
+        self.generation = meta.get("generation", 0)
+        self.info = meta.get("info", {})
+
+    @classmethod
+    def create(cls, path, dim, mode="brute", info=None):
+        """
+        Create an empty index, replacing any index already at `path`.
+
+        Args:
+            path (str): Directory for the index files.
+            dim (int): Vector dimension.
+            mode (str): "brute" or "hnsw".
+            info (dict): Extra metadata to keep, e.g. the embedding model.
+        """
+        path = str(path)
+        os.makedirs(path, exist_ok=True)
+        for pattern in ("vectors*.f32", "documents*.jsonl", HNSW_FILE):
+            for name in glob.glob(os.path.join(path, pattern)):
+                os.remove(name)
+        open(os.path.join(path, VECTORS_FILE), "wb").close()
+        open(os.path.join(path, DOCUMENTS_FILE), "w").close()
+        _write_meta(path, {"dim": dim, "count": 0, "info": info or {}})
+        return cls(path, mode=mode)
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(str(path), META_FILE))
+
+    def _save_meta(self):
+        meta = {
+            "dim": self.dim,
+            "count": self.count,
+            "documents_size": self.documents_size,
+            "deleted": sorted(self.deleted),
+            "generation": self.generation,
+            "info": self.info,
+        }
+        _write_meta(self.path, meta)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @property
+    def vectors_file(self):
+        if self.generation == 0:
+            return self._file(VECTORS_FILE)
+        return self._file(f"vectors.{self.generation}.f32")
+
+    @property
+    def documents_file(self):
+        if self.generation == 0:
+            return self._file(DOCUMENTS_FILE)
+        return self._file(f"documents.{self.generation}.jsonl")
+
+    def __len__(self):
+        return self.count - len(self.deleted)
+
+    def add(self, vectors, documents):
+        """
+        Append vectors and their documents and persist them.
+
+        Args:
+            vectors (array-like): Shape (n, dim).
+            documents (list): One dict per vector, with "page_content" and
+                "metadata".
+        """
+        vectors = _normalize(vectors).reshape(-1, self.dim)
+        if len(vectors) != len(documents):
+            raise ValueError(
+                f"Got {len(vectors)} vectors but {len(documents)} documents"
+            )
+        if not len(vectors):
+            return
+
+        with self._lock:
+            # Truncate anything past the committed rows left by a failed write
+            with open(self.vectors_file, "r+b") as f:
+                f.truncate(self.count * self.dim * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(vectors.tobytes())
+            with open(self.documents_file, "r+b") as f:
+                f.truncate(self.documents_size)
+                f.seek(0, os.SEEK_END)
+                for document in documents:
+                    f.write((json.dumps(document) + "\n").encode("utf-8"))
+                documents_size = f.tell()
+
+            self.count += len(vectors)
+            self.documents_size = documents_size
+            self._save_meta()
+            self._vectors = None
+            if self._documents is not None:
+                self._documents.extend(documents)
+
+    def documents(self):
+        """
+        The live documents.
+
+        Returns:
+            list: (row id, document) pairs.
+        """
+        with self._lock:
+            documents = self._load_documents()
+            return [
+                (i, document)
+                for i, document in enumerate(documents)
+                if i not in self.deleted
+            ]
+
+    def delete(self, ids, compact=True):
+        """
+        Remove rows from search results, compacting the files once more than
+        COMPACT_RATIO of the rows are deleted.
+
+        Args:
+            ids (iterable): Row ids, as returned by documents().
+            compact (bool): Set to False to keep row ids stable, e.g. during
+                a batch of updates, and call compact() afterwards.
+        """
+        ids = {int(i) for i in ids if 0 <= int(i) < self.count}
+        if not ids:
+            return
+        with self._lock:
+            self.deleted |= ids
+            self._save_meta()
+            if compact and len(self.deleted) > COMPACT_RATIO * self.count:
+                self.compact()
+
+    def compact(self):
+        """
+        Rewrite the vectors and documents without the deleted rows.
+
+        The new files get a new generation number and meta.json is switched
+        over to them in one atomic write, so a crash part way through leaves
+        the old files in use. Row ids change, and the HNSW graph is rebuilt
+        on the next search.
+        """
+        with self._lock:
+            if not self.deleted:
+                return
+            keep = np.array(
+                [i for i in range(self.count) if i not in self.deleted],
+                dtype=np.int64,
+            )
+            vectors = self._load_vectors()
+            documents = self._load_documents()
+            old_files = [self.vectors_file, self.documents_file]
+
+            self.generation += 1
+            with open(self.vectors_file, "wb") as f:
+                for i in range(0, len(keep), 10000):
+                    f.write(vectors[keep[i:i + 10000]].tobytes())
+            with open(self.documents_file, "wb") as f:
+                for i in keep:
+                    f.write((json.dumps(documents[i]) + "\n").encode("utf-8"))
+                documents_size = f.tell()
+
+            # The graph's labels are the old row ids
+            self._hnsw = None
+            if os.path.exists(self._file(HNSW_FILE)):
+                os.remove(self._file(HNSW_FILE))
+
+            logger.info(f"Compacted index from {self.count} to {len(keep)} rows")
+            self.count = len(keep)
+            self.documents_size = documents_size
+            self.deleted = set()
+            self._save_meta()
+            self._vectors = None
+            self._documents = None
+            for name in old_files:
+                os.remove(name)
+
+    def _load_vectors(self):
+        if self._vectors is None:
+            if self.count == 0:
+                self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(
+                    self.vectors_file,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(self.count, self.dim),
+                )
+        return self._vectors
+
+    def _load_documents(self):
+        if self._documents is None:
+            with open(self.documents_file, "rb") as f:
+                data = f.read(self.documents_size)
+            self._documents = [json.loads(line) for line in data.splitlines()]
+        return self._documents
+
+    def _load_hnsw(self):
+        """Open the saved HNSW graph and add any rows it doesn't have yet"""
+        vectors = self._load_vectors()
+        if self._hnsw is None:
+            graph = hnswlib.Index(space="ip", dim=self.dim)
+            if os.path.exists(self._file(HNSW_FILE)):
+                graph.load_index(self._file(HNSW_FILE), max_elements=self.count)
+            else:
+                graph.init_index(
+                    max_elements=max(self.count, 1),
+                    ef_construction=HNSW_EF_CONSTRUCTION,
+                    M=HNSW_M,
+                )
+            self._hnsw = graph
+
+        indexed = self._hnsw.get_current_count()
+        if indexed < self.count:
+            logger.info(f"Adding {self.count - indexed} vectors to the HNSW graph")
+            self._hnsw.resize_index(self.count)
+            self._hnsw.add_items(vectors[indexed:], np.arange(indexed, self.count))
+            self._hnsw.save_index(self._file(HNSW_FILE))
+        return self._hnsw
+
+    def search(self, vector, k=4):
+        """
+        Find the documents most similar to a vector.
+
+        Args:
+            vector (array-like): Query vector of length dim.
+            k (int): Number of results.
+
+        Returns:
+            list: (document, cosine similarity) pairs, best first.
+        """
+        query = _normalize(vector).reshape(self.dim)
+        with self._lock:
+            k = min(k, len(self))
+            if k <= 0:
+                return []
+            if self.mode == "hnsw":
+                # Ask for extra neighbours to make up for deleted rows
+                fetch = min(k + len(self.deleted), self.count)
+                graph = self._load_hnsw()
+                graph.set_ef(max(HNSW_EF_SEARCH, fetch))
+                labels, distances = graph.knn_query(query, k=fetch)
+                results = [
+                    (i, 1 - d)
+                    for i, d in zip(labels[0], distances[0])
+                    if i not in self.deleted
+                ][:k]
+                ids = [i for i, _ in results]
+                scores = [score for _, score in results]
+            else:
+                scores = self._load_vectors() @ query
+                if self.deleted:
+                    scores[list(self.deleted)] = -np.inf
+                ids = np.argpartition(-scores, k - 1)[:k]
+                ids = ids[np.argsort(-scores[ids])]
+                scores = scores[ids]
+            documents = self._load_documents()
+
+        return [(documents[i], float(score)) for i, score in zip(ids, scores)]
@@ -1,52 +1,95 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Pinecone
 from langchain.embeddings.openai import OpenAIEmbeddings
 from langchain.llms import OpenAI
 from langchain.chains.question_answering import load_qa_chain
-from langchain.document_loaders import UnstructuredPDFLoader, DirectoryLoader
-import pinecone
+from langchain.docstore.document import Document
 import os
+import threading
 from dotenv import load_dotenv
 from config import *
+from embedding_cache import CachedEmbeddings
+from ingest import ingest
+from vector_index import VectorIndex
 
 load_dotenv()
 
+logger = create_logger(__name__)
+
 INDEX_NAME = 'chewbacca'
 DIRECTORY_PATH = ROOT_DIR/"data/pdfs/"
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
-PINECONE_API_ENV = os.getenv('PINECONE_API_ENV')
-
-# Load the data
-loader = DirectoryLoader(DIRECTORY_PATH)
-data = loader.load()
-
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=0)
-docs = text_splitter.split_documents(data)
-
-embeddings=OpenAIEmbeddings()
-
-# initialize pinecone
-pinecone.init(
-    api_key=PINECONE_API_KEY,  
-    environment=PINECONE_API_ENV
-)
-
-# First, check if our index already exists. If it doesn't, we create it
-if INDEX_NAME not in pinecone.list_indexes():
-    # we create a new index
-    pinecone.create_index(name=INDEX_NAME, metric="cosine", dimension=1536)
-    docsearch = Pinecone.from_documents(docs, embeddings, index_name=INDEX_NAME)
-else:
-    docsearch = Pinecone.from_existing_index(INDEX_NAME, embeddings)
-
-query = "What did the president say about Ketanji Brown Jackson"
-docs = docsearch.similarity_search(query)
-
-def query_index(query, index_name):
-    embeddings=OpenAIEmbeddings()
-    docsearch = Pinecone.from_existing_index(INDEX_NAME, embeddings)
-    docs = docsearch.similarity_search(query)
+INDEX_DIR = ROOT_DIR/"data/vector_index/"
+# "brute" (exact) or "hnsw" (approximate, needs hnswlib)
+INDEX_MODE = os.getenv('VECTOR_INDEX_MODE', 'brute')
+EMBEDDING_MODEL = 'text-embedding-ada-002'
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+_indexes = {}
+_indexes_lock = threading.RLock()
+
+
+def get_embeddings():
+    """OpenAI embeddings behind the local cache, so unchanged chunks are free"""
+    return CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
+
+
+def build_index(index_name=INDEX_NAME, directory=DIRECTORY_PATH, rebuild=False):
+    """
+    Bring the local index up to date with the documents in the directory.
+    Only new or changed files are loaded and embedded; see ingest.ingest.
+
+    Returns:
+        VectorIndex: The updated index.
+    """
+    index = ingest(
+        directory,
+        INDEX_DIR/index_name,
+        get_embeddings(),
+        EMBEDDING_MODEL,
+        mode=INDEX_MODE,
+        rebuild=rebuild,
+    )
+    with _indexes_lock:
+        _indexes[index_name] = index
+    return index
+
+
+def get_index(index_name=INDEX_NAME):
+    """
+    Open the local index, building it from the PDFs the first time. Each
+    index is loaded once per process.
+    """
+    with _indexes_lock:
+        if index_name not in _indexes:
+            if VectorIndex.exists(INDEX_DIR/index_name):
+                _indexes[index_name] = VectorIndex(
+                    INDEX_DIR/index_name, mode=INDEX_MODE
+                )
+            else:
+                _indexes[index_name] = build_index(index_name)
+        return _indexes[index_name]
+
+
+def similarity_search(query, k=4, index_name=INDEX_NAME):
+    """
+    Find the chunks most similar to a query.
+
+    Returns:
+        list: LangChain Documents, best match first.
+    """
+    index = get_index(index_name)
+    vector = get_embeddings().embed_query(query)
+    return [
+        Document(page_content=doc['page_content'], metadata=doc['metadata'])
+        for doc, score in index.search(vector, k=k)
+    ]
+
+
+def query_index(query, index_name=INDEX_NAME):
+    docs = similarity_search(query, index_name=index_name)
     llm = OpenAI(model_name="gpt-3.5-turbo", temperature=0, openai_api_key=OPENAI_API_KEY)
     chain = load_qa_chain(llm, chain_type="stuff")
     return chain.run(input_documents=docs, question=query)
-    
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    build_index()
+    print(query_index("What did the president say about Ketanji Brown Jackson"))
@@ -0,0 +1,23 @@
+import pytest
+
+from backend import create_app
+from backend.config import TestingConfig
+from backend.extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Jobs write from worker threads on their own connections, which an
+    # in-memory database doesn't share, so each test gets a database file
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        SESSION_FILE_DIR = str(tmp_path / "flask_session")
+        SCHEDULE_JOB_PROGRESS_INTERVAL = 0.0
+        LLM_METRICS_SINKS = ""
+
+    app = create_app(Config())
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
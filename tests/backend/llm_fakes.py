@@ -0,0 +1,93 @@
+"""Stand-ins for the OpenAI SDK used by the LLM client tests"""
+
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from backend.src.llm_metrics import CallRecorder
+from backend.src.llm_resilience import RetryPolicy
+from backend.src.OpenRouter import OpenRouterClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+REQUEST = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+
+
+def status_error(status_code, headers=None):
+    response = httpx.Response(status_code, request=REQUEST, headers=headers)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def connection_error():
+    return openai.APIConnectionError(request=REQUEST)
+
+
+def completion(content, model="primary"):
+    return SimpleNamespace(
+        model=model,
+        usage=SimpleNamespace(prompt_tokens=3, completion_tokens=5),
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+    )
+
+
+def chunk(content=None, usage=None, model="primary"):
+    choices = []
+    if content is not None:
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(model=model, usage=usage, choices=choices)
+
+
+class ListSink:
+    def __init__(self):
+        self.calls = []
+
+    def emit(self, call):
+        self.calls.append(call)
+
+
+class FakeCompletions:
+    """Plays back a script of results (or errors) for successive create calls"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class FakeAsyncStream:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+
+def make_client(completions, **kwargs):
+    """An OpenRouterClient that calls `completions` and records to a ListSink"""
+    sink = ListSink()
+    client = OpenRouterClient(
+        api_key="test",
+        default_model="primary",
+        retry_policy=RetryPolicy(max_retries=2, base_delay=0),
+        recorder=CallRecorder([sink]),
+        **kwargs,
+    )
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, sink
@@ -0,0 +1,87 @@
+import asyncio
+
+from llm_fakes import MESSAGES, FakeAsyncStream, chunk, completion, connection_error
+
+from backend.src.llm_metrics import CallRecorder
+from backend.src.llm_resilience import RetryPolicy
+from backend.src.OpenRouter import AsyncOpenRouterClient
+
+
+def make_async_client(create, **kwargs):
+    client = AsyncOpenRouterClient(
+        api_key="test",
+        default_model="primary",
+        recorder=CallRecorder(),
+        **kwargs,
+    )
+    client._client.chat.completions.create = create
+    return client
+
+
+def test_concurrency_is_bounded():
+    async def run():
+        in_flight = 0
+        peak = 0
+
+        async def create(messages, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return completion(messages[0]["content"])
+
+        client = make_async_client(create, max_concurrency=3)
+        prompts = [str(i) for i in range(10)]
+        assert await client.complete_many(prompts) == prompts
+        assert peak == 3
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_chat_many_can_return_exceptions():
+    async def run():
+        async def create(messages, **kwargs):
+            if messages[0]["content"] == "bad":
+                raise ValueError("bad prompt")
+            return completion("ok")
+
+        client = make_async_client(create)
+        results = await client.complete_many(["good", "bad"], return_exceptions=True)
+        assert results[0] == "ok"
+        assert isinstance(results[1], ValueError)
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_stream_releases_its_slot_during_backoff():
+    async def run():
+        requests = []
+
+        async def create(**kwargs):
+            requests.append(kwargs)
+            if len(requests) == 1:
+                raise connection_error()
+            return FakeAsyncStream([chunk("a")])
+
+        client = make_async_client(
+            create,
+            max_concurrency=1,
+            retry_policy=RetryPolicy(max_retries=1, base_delay=0.2, jitter=False),
+        )
+        stream = await client.chat(MESSAGES, stream=True)
+
+        async def locked_during_backoff():
+            await asyncio.sleep(0.1)
+            return client._semaphore.locked()
+
+        check = asyncio.create_task(locked_during_backoff())
+        chunks = [c async for c in stream]
+        assert not await check
+        assert len(chunks) == 1 and len(requests) == 2
+        assert not client._semaphore.locked()
+        await client.close()
+
+    asyncio.run(run())
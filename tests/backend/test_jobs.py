@@ -0,0 +1,229 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from backend.extensions import db
+from backend.models import ScheduleJob
+from backend.src import jobs
+from backend.src.scheduler import ScheduleCancelled
+
+WINDOW = (datetime(2024, 1, 1), datetime(2024, 1, 8))
+
+
+class FakeScheduler:
+    """
+    Stands in for generate_schedule and save_schedule. Each run reports that
+    it started and then waits for release() or a cancellation.
+    """
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.released = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def generate(
+        self,
+        start_date,
+        end_date,
+        progress_callback=None,
+        should_cancel=None,
+        **kwargs,
+    ):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            self.started.release()
+            progress_callback("one-off", 0, 1)
+            while not self.released.wait(0.01):
+                if should_cancel():
+                    raise ScheduleCancelled()
+            progress_callback("one-off", 1, 1)
+            return ["placement"]
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def save(self, start_date, end_date, scheduled_tasks):
+        self.saved += 1
+        return len(scheduled_tasks)
+
+    def wait_started(self, timeout=5):
+        assert self.started.acquire(timeout=timeout), "job never started"
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    fake = FakeScheduler()
+    monkeypatch.setattr(jobs, "generate_schedule", fake.generate)
+    monkeypatch.setattr(jobs, "save_schedule", fake.save)
+    yield fake
+    # Let anything still running finish so it doesn't outlive the test app
+    fake.released.set()
+
+
+def wait_for_status(job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = db.session.get(ScheduleJob, job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} is still {job.status}")
+
+
+def test_job_runs_to_completion(app, scheduler):
+    job, created = jobs.submit_schedule_job(*WINDOW)
+    assert created
+    scheduler.wait_started()
+    scheduler.released.set()
+
+    job = wait_for_status(job.id, {"done"})
+    assert job.result["tasks_scheduled"] == 1
+    assert job.progress == {"one-off": {"placed": 1, "total": 1}}
+    assert job.started_at is not None and job.finished_at is not None
+    assert scheduler.saved == 1
+
+
+def test_request_for_active_window_is_merged(app, scheduler):
+    job, _ = jobs.submit_schedule_job(*WINDOW)
+    scheduler.wait_started()
+
+    again, created = jobs.submit_schedule_job(*WINDOW)
+    assert not created
+    assert again.id == job.id
+
+    scheduler.released.set()
+    wait_for_status(job.id, {"done"})
+
+
+def test_requests_for_the_same_days_are_merged(app, scheduler):
+    # Requests that default to "now" differ by microseconds
+    job, _ = jobs.submit_schedule_job(
+        datetime(2024, 1, 1, 9, 30, 1, 5), datetime(2024, 1, 8, 9, 30, 1, 5)
+    )
+    scheduler.wait_started()
+
+    again, created = jobs.submit_schedule_job(
+        datetime(2024, 1, 1, 9, 30, 2, 7), datetime(2024, 1, 8, 9, 30, 2, 7)
+    )
+    assert not created
+    assert again.id == job.id
+    assert job.start_date == datetime(2024, 1, 1)
+    assert job.end_date.date() == datetime(2024, 1, 8).date()
+
+    scheduler.released.set()
+    wait_for_status(job.id, {"done"})
+
+
+def test_overlapping_windows_run_one_at_a_time(app, scheduler):
+    first, _ = jobs.submit_schedule_job(*WINDOW)
+    scheduler.wait_started()
+
+    second, created = jobs.submit_schedule_job(
+        datetime(2024, 1, 5), datetime(2024, 1, 12)
+    )
+    assert created
+    assert not scheduler.started.acquire(timeout=0.2)
+
+    scheduler.released.set()
+    wait_for_status(first.id, {"done"})
+    wait_for_status(second.id, {"done"})
+    assert scheduler.max_running == 1
+
+
+def test_separate_windows_run_together(app, scheduler):
+    first, _ = jobs.submit_schedule_job(*WINDOW)
+    second, _ = jobs.submit_schedule_job(datetime(2024, 2, 1), datetime(2024, 2, 8))
+    scheduler.wait_started()
+    scheduler.wait_started()
+    assert scheduler.max_running == 2
+
+    scheduler.released.set()
+    wait_for_status(first.id, {"done"})
+    wait_for_status(second.id, {"done"})
+
+
+def test_waiting_job_can_be_cancelled(app, scheduler):
+    first, _ = jobs.submit_schedule_job(*WINDOW)
+    scheduler.wait_started()
+    second, _ = jobs.submit_schedule_job(datetime(2024, 1, 5), datetime(2024, 1, 12))
+
+    jobs.cancel_schedule_job(second)
+    wait_for_status(second.id, {"cancelled"})
+    assert db.session.get(ScheduleJob, first.id).status == "running"
+
+    scheduler.released.set()
+    wait_for_status(first.id, {"done"})
+
+
+def test_cancelled_job_stops_without_saving(app, scheduler):
+    job, _ = jobs.submit_schedule_job(*WINDOW)
+    scheduler.wait_started()
+
+    assert jobs.cancel_schedule_job(job)
+    job = wait_for_status(job.id, {"cancelled"})
+    assert scheduler.saved == 0
+    assert not jobs.cancel_schedule_job(job)
+
+
+def test_new_job_waits_for_cancelled_job_to_stop(app, scheduler, monkeypatch):
+    # Make the cancelled job slow to notice, so the replacement is queued
+    # while the first one is still running
+    stop = threading.Event()
+    generate = scheduler.generate
+
+    def slow_to_cancel(*args, should_cancel=None, **kwargs):
+        return generate(
+            *args, should_cancel=lambda: stop.is_set() and should_cancel(), **kwargs
+        )
+
+    monkeypatch.setattr(jobs, "generate_schedule", slow_to_cancel)
+
+    first, _ = jobs.submit_schedule_job(*WINDOW)
+    scheduler.wait_started()
+    jobs.cancel_schedule_job(first)
+
+    second, created = jobs.submit_schedule_job(*WINDOW)
+    assert created
+    assert second.id != first.id
+    # The replacement can't start while the cancelled job holds the window
+    assert not scheduler.started.acquire(timeout=0.2)
+
+    stop.set()
+    wait_for_status(first.id, {"cancelled"})
+    scheduler.wait_started()
+    scheduler.released.set()
+    wait_for_status(second.id, {"done"})
+    assert scheduler.max_running == 1
+
+
+def test_failed_job_records_error(app, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("no slots")
+
+    monkeypatch.setattr(jobs, "generate_schedule", broken)
+    job, _ = jobs.submit_schedule_job(*WINDOW)
+
+    job = wait_for_status(job.id, {"failed"})
+    assert job.error == "no slots"
+
+
+def test_fail_interrupted_jobs(app):
+    for status in ("queued", "running", "done"):
+        db.session.add(
+            ScheduleJob(start_date=WINDOW[0], end_date=WINDOW[1], status=status)
+        )
+    db.session.commit()
+
+    assert jobs.fail_interrupted_jobs() == 2
+
+    db.session.expire_all()
+    statuses = sorted(job.status for job in ScheduleJob.query.all())
+    assert statuses == ["done", "failed", "failed"]
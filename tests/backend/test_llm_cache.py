@@ -0,0 +1,54 @@
+from llm_fakes import MESSAGES, FakeCompletions, completion, make_client
+
+from backend.src.llm_cache import MemoryCache, ResponseCache, SQLiteCache
+
+
+def test_deterministic_requests_are_cached():
+    completions = FakeCompletions(completion("cached"))
+    client, sink = make_client(completions, cache=ResponseCache())
+
+    assert client.chat(MESSAGES, temperature=0) == "cached"
+    assert client.chat(MESSAGES, temperature=0) == "cached"
+    assert len(completions.requests) == 1
+    assert [call.cache for call in sink.calls] == ["miss", "hit"]
+    assert client.cache.stats()["hits"] == 1
+
+
+def test_sampled_requests_bypass_the_cache():
+    completions = FakeCompletions(completion("one"), completion("two"))
+    client, sink = make_client(completions, cache=ResponseCache())
+
+    assert client.chat(MESSAGES, temperature=0.7) == "one"
+    assert client.chat(MESSAGES, temperature=0.7) == "two"
+    assert [call.cache for call in sink.calls] == ["bypass", "bypass"]
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"))
+    ResponseCache(disk=disk).set("key", "value")
+
+    cache = ResponseCache(memory=MemoryCache(), disk=disk)
+    assert cache.get("key") == "value"
+    assert cache.get("key") == "value"
+    assert cache.get("other") is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_disk_cache_evicts_past_max_bytes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=30)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    cache.get("a")
+    cache.set("c", "z" * 10)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
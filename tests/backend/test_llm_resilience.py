@@ -0,0 +1,73 @@
+import openai
+import pytest
+from llm_fakes import (
+    MESSAGES,
+    FakeCompletions,
+    completion,
+    connection_error,
+    make_client,
+    status_error,
+)
+
+from backend.src.llm_resilience import RetryPolicy, TokenBucket, call_with_retries
+
+
+def test_transient_errors_are_retried():
+    completions = FakeCompletions(
+        status_error(503), connection_error(), completion("hi")
+    )
+    client, sink = make_client(completions)
+
+    assert client.chat(MESSAGES) == "hi"
+    assert [r["model"] for r in completions.requests] == ["primary"] * 3
+    assert sink.calls[0].error is None
+    assert sink.calls[0].prompt_tokens == 3
+
+
+def test_falls_back_once_retries_are_exhausted():
+    completions = FakeCompletions(
+        status_error(429),
+        status_error(429),
+        status_error(429),
+        completion("hi", model="backup"),
+    )
+    client, _ = make_client(completions, fallback_models=["backup"])
+
+    assert client.chat(MESSAGES) == "hi"
+    assert [r["model"] for r in completions.requests] == ["primary"] * 3 + ["backup"]
+
+
+def test_non_transient_errors_are_raised_immediately():
+    completions = FakeCompletions(status_error(400), completion("unused"))
+    client, sink = make_client(completions, fallback_models=["backup"])
+
+    with pytest.raises(openai.APIStatusError):
+        client.chat(MESSAGES)
+    assert len(completions.requests) == 1
+    assert sink.calls[0].error is not None
+
+
+def test_retry_after_header_sets_the_delay():
+    error = status_error(429, headers={"retry-after": "7"})
+    assert RetryPolicy(max_delay=30).delay(0, error) == 7
+    assert RetryPolicy(max_delay=5).delay(0, error) == 5
+
+
+def test_call_with_retries_gives_up_with_the_last_error():
+    errors = [status_error(500), status_error(502)]
+
+    def request(model):
+        raise errors.pop(0)
+
+    with pytest.raises(openai.APIStatusError) as excinfo:
+        call_with_retries(
+            request, ["primary"], RetryPolicy(max_retries=1, base_delay=0)
+        )
+    assert excinfo.value.status_code == 502
+
+
+def test_token_bucket_limits_bursts():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+from llm_fakes import (
+    MESSAGES,
+    FakeAsyncStream,
+    FakeCompletions,
+    chunk,
+    make_client,
+)
+
+from backend.src.llm_metrics import CallRecorder
+from backend.src.OpenRouter import AsyncOpenRouterClient
+from backend.src.streaming import iter_stream_text
+
+USAGE = SimpleNamespace(prompt_tokens=4, completion_tokens=2)
+
+
+def test_stream_requests_usage_and_records_it():
+    completions = FakeCompletions(iter([chunk("a"), chunk("b"), chunk(usage=USAGE)]))
+    client, sink = make_client(completions)
+
+    stream = client.chat(MESSAGES, stream=True)
+    assert list(iter_stream_text(stream)) == ["a", "b"]
+    assert completions.requests[0]["stream_options"] == {"include_usage": True}
+    assert sink.calls[0].completion_tokens == 2
+    assert sink.calls[0].ttft_ms is not None
+
+
+def test_caller_stream_options_are_kept():
+    completions = FakeCompletions(iter([]))
+    client, _ = make_client(completions)
+
+    list(client.chat(MESSAGES, stream=True, stream_options={"include_usage": False}))
+    assert completions.requests[0]["stream_options"] == {"include_usage": False}
+
+
+def test_async_stream_requests_usage():
+    async def run():
+        requests = []
+
+        async def create(**kwargs):
+            requests.append(kwargs)
+            return FakeAsyncStream([chunk("a"), chunk(usage=USAGE)])
+
+        client = AsyncOpenRouterClient(api_key="test", recorder=CallRecorder())
+        client._client.chat.completions.create = create
+        chunks = [c async for c in await client.chat(MESSAGES, stream=True)]
+        assert len(chunks) == 2
+        assert requests[0]["stream_options"] == {"include_usage": True}
+        await client.close()
+
+    asyncio.run(run())
@@ -0,0 +1,172 @@
+from datetime import datetime
+
+import pytest
+
+from backend.extensions import db
+from backend.models import CalendarEvent, Task, TaskDependency
+from backend.src.schedule_snapshot import (
+    EventSnapshot,
+    ScheduleSnapshot,
+    TaskSnapshot,
+    invalidate_snapshot,
+)
+
+MONDAY = datetime(2025, 1, 6)
+PERIOD = {"start_date": "2025-01-06T00:00:00", "end_date": "2025-01-06T23:59:00"}
+
+
+def make_snapshot():
+    return ScheduleSnapshot(
+        [
+            TaskSnapshot(id="a", content="A", duration=60, task_type="one-off"),
+            TaskSnapshot(id="b", content="B", duration=30, task_type="one-off"),
+        ],
+        [],
+        {"b": ["a"]},
+        [
+            EventSnapshot(
+                "e", "Standup", MONDAY.replace(hour=9), MONDAY.replace(hour=10)
+            )
+        ],
+    )
+
+
+def test_copy_leaves_the_original_untouched():
+    snapshot = make_snapshot()
+    preview = snapshot.copy()
+    preview.remove_task("a")
+    preview.remove_event("e")
+
+    assert set(snapshot.one_off_tasks) == {"a", "b"}
+    assert snapshot.task_dependencies == {"b": ["a"]}
+    assert "e" in snapshot.events
+    assert preview.task_dependencies == {"b": []}
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda snapshot: snapshot.remove_task("missing"),
+        lambda snapshot: snapshot.update_task("missing", duration=10),
+        lambda snapshot: snapshot.remove_event("missing"),
+        lambda snapshot: snapshot.move_event("missing", MONDAY, MONDAY),
+    ],
+)
+def test_unknown_ids_raise_key_error(change):
+    with pytest.raises(KeyError):
+        change(make_snapshot())
+
+
+def test_schedule_inputs_skip_tasks_due_after_the_period():
+    snapshot = make_snapshot()
+    snapshot.add_task(
+        TaskSnapshot(
+            id="later",
+            content="Later",
+            duration=30,
+            task_type="one-off",
+            due_by=datetime(2025, 2, 1),
+        )
+    )
+    one_off_tasks, _, task_dependencies, busy_slots = snapshot.schedule_inputs(
+        MONDAY, MONDAY.replace(hour=23)
+    )
+    assert [task.id for task in one_off_tasks] == ["a", "b"]
+    assert task_dependencies == {"a": [], "b": ["a"]}
+    assert busy_slots == [(MONDAY.replace(hour=9), MONDAY.replace(hour=10))]
+
+
+@pytest.fixture
+def client(app):
+    db.session.add_all(
+        [
+            Task(id="a", content="A", duration=60, task_type="one-off"),
+            Task(id="b", content="B", duration=30, task_type="one-off"),
+            CalendarEvent(
+                id="e",
+                subject="Standup",
+                start=MONDAY.replace(hour=8),
+                end=MONDAY.replace(hour=10),
+            ),
+        ]
+    )
+    db.session.add(TaskDependency(task_id="b", dependency_id="a"))
+    db.session.commit()
+    invalidate_snapshot()
+    yield app.test_client()
+    invalidate_snapshot()
+
+
+def preview(client, overrides=None):
+    body = dict(PERIOD)
+    if overrides is not None:
+        body["overrides"] = overrides
+    return client.post("/api/schedule/preview", json=body)
+
+
+def test_preview_schedules_around_events(client):
+    response = preview(client)
+    assert response.status_code == 200
+    scheduled = response.get_json()["scheduled"]
+    assert [(t["task_id"], t["start"]) for t in scheduled] == [
+        ("a", "2025-01-06T10:00:00"),
+        ("b", "2025-01-06T11:00:00"),
+    ]
+
+
+def test_preview_applies_overrides_without_saving(client):
+    response = preview(
+        client,
+        {
+            "remove_tasks": ["a"],
+            "remove_events": ["e"],
+            "add_tasks": [{"content": "C", "duration": 15, "task_type": "one-off"}],
+        },
+    )
+    assert response.status_code == 200
+    scheduled = response.get_json()["scheduled"]
+    assert [(t["task_content"], t["start"]) for t in scheduled] == [
+        ("B", "2025-01-06T08:00:00"),
+        ("C", "2025-01-06T08:30:00"),
+    ]
+    assert Task.query.count() == 2
+    assert CalendarEvent.query.count() == 1
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"remove_tasks": ["missing"]},
+        {"update_tasks": [{"id": "missing", "duration": 10}]},
+        {"remove_events": ["missing"]},
+        {
+            "move_events": [
+                {
+                    "id": "missing",
+                    "start": "2025-01-06T12:00:00",
+                    "end": "2025-01-06T13:00:00",
+                }
+            ]
+        },
+    ],
+)
+def test_preview_rejects_unknown_ids(client, overrides):
+    response = preview(client, overrides)
+    assert response.status_code == 404
+    assert "missing" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        [1],
+        "remove_tasks",
+        {"remove_tasks": "a"},
+        {"add_tasks": [1]},
+        {"add_tasks": [{"content": "C"}]},
+        {"add_events": [{"start": "not a date", "end": "2025-01-06T10:00:00"}]},
+    ],
+)
+def test_preview_rejects_malformed_overrides(client, overrides):
+    response = preview(client, overrides)
+    assert response.status_code == 400
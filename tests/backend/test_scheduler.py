@@ -0,0 +1,97 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from backend.src import scheduler
+from backend.src.schedule_snapshot import TaskSnapshot
+from benchmarks.workloads import generate_workload
+
+# (n_tasks, dependency_density, n_events, n_days, n_recurring), each run with
+# three seeds
+WORKLOADS = [
+    (20, 0.05, 10, 8, 2),
+    (60, 0.02, 40, 15, 3),
+    (120, 0.01, 80, 30, 5),
+    (200, 0.01, 150, 45, 5),
+    (80, 0.1, 30, 20, 0),
+    (150, 0.0, 200, 60, 8),
+]
+
+
+def plan_inputs(workload):
+    """The workload as plan_schedule's in-memory arguments"""
+    tasks = [
+        TaskSnapshot(
+            id=task["id"],
+            content=task["content"],
+            duration=task["duration"],
+            task_type=task["task_type"],
+            due_by=task.get("due_by"),
+            recurrence=task.get("recurrence"),
+            time_window_start=task.get("time_window_start"),
+            time_window_end=task.get("time_window_end"),
+        )
+        for task in workload["tasks"]
+    ]
+    one_off_tasks = sorted(
+        (task for task in tasks if task.task_type == "one-off"),
+        key=lambda task: (task.due_by is None, task.due_by or datetime.min),
+    )
+    recurring_tasks = [task for task in tasks if task.task_type == "recurring"]
+    task_dependencies = {}
+    for dependency in workload["dependencies"]:
+        task_dependencies.setdefault(dependency["task_id"], []).append(
+            dependency["dependency_id"]
+        )
+    busy_slots = sorted((event["start"], event["end"]) for event in workload["events"])
+    return one_off_tasks, recurring_tasks, task_dependencies, busy_slots
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("params", WORKLOADS)
+def test_windowed_plan_matches_sequential_plan(params, seed):
+    n_tasks, density, n_events, n_days, n_recurring = params
+    workload = generate_workload(
+        n_tasks=n_tasks,
+        dependency_density=density,
+        n_events=n_events,
+        n_days=n_days,
+        n_recurring=n_recurring,
+        seed=seed,
+    )
+    start_date, end_date = workload["start_date"], workload["end_date"]
+
+    sequential = scheduler.plan_schedule(*plan_inputs(workload), start_date, end_date)
+    windowed = scheduler.plan_schedule_windowed(
+        *plan_inputs(workload), start_date, end_date, max_workers=2
+    )
+    assert windowed == sequential
+    assert sequential
+
+
+def test_dependencies_come_first_and_cycles_fall_back_to_priority():
+    tasks = [SimpleNamespace(id=id) for id in ["a", "b", "c", "d", "e"]]
+    dependencies = {"a": ["c"], "b": ["x"], "d": ["e"], "e": ["d"]}
+
+    ordered = scheduler._order_by_dependencies(tasks, dependencies)
+    # c unblocks a; b waits on a task that isn't being scheduled and the
+    # d/e cycle never resolves, so those go in priority order at the end
+    assert [task.id for task in ordered] == ["c", "a", "b", "d", "e"]
+
+
+def test_parallel_mode_only_splits_long_periods(app, monkeypatch):
+    windowed = []
+    monkeypatch.setattr(
+        scheduler,
+        "plan_schedule_windowed",
+        lambda *args, **kwargs: windowed.append(args) or [],
+    )
+    start_date, end_date = datetime(2025, 1, 6), datetime(2025, 1, 31)
+
+    scheduler.generate_schedule(start_date, end_date, parallel=True)
+    assert not windowed
+    scheduler.generate_schedule(
+        start_date, end_date, parallel=True, parallel_min_days=7
+    )
+    assert len(windowed) == 1
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# backend.config refuses to load without a secret key
+os.environ.setdefault("SECRET_KEY", "test")
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
@@ -0,0 +1,55 @@
+import importlib
+import sys
+import types
+from pathlib import Path
+
+# The bot's modules import each other by bare name from the emails folder
+EMAILS_DIR = Path(__file__).resolve().parents[2] / "emails"
+if str(EMAILS_DIR) not in sys.path:
+    sys.path.insert(0, str(EMAILS_DIR))
+
+
+class HttpError(Exception):
+    """Enough of googleapiclient's HttpError for src's retry checks"""
+
+    def __init__(self, resp, content=b"", uri=None):
+        super().__init__(f"HTTP {resp.status}")
+        self.resp = resp
+        self.content = content
+        self.uri = uri
+        self.error_details = ""
+
+
+def _stub_google():
+    """
+    Install placeholder Google client modules when they aren't installed, so
+    src can be imported. Tests replace get_service with a fake.
+    """
+    try:
+        importlib.import_module("googleapiclient.errors")
+        return
+    except ImportError:
+        pass
+
+    names = {
+        "google": [],
+        "google.auth": [],
+        "google.auth.transport": [],
+        "google.auth.transport.requests": ["Request"],
+        "google.oauth2": [],
+        "google.oauth2.credentials": ["Credentials"],
+        "google_auth_oauthlib": [],
+        "google_auth_oauthlib.flow": ["InstalledAppFlow"],
+        "googleapiclient": [],
+        "googleapiclient.discovery": ["build", "Resource"],
+        "googleapiclient.errors": [],
+    }
+    for name, attributes in names.items():
+        module = types.ModuleType(name)
+        for attribute in attributes:
+            setattr(module, attribute, type(attribute, (), {}))
+        sys.modules[name] = module
+    sys.modules["googleapiclient.errors"].HttpError = HttpError
+
+
+_stub_google()
@@ -0,0 +1,170 @@
+from types import SimpleNamespace
+
+import pytest
+from googleapiclient.errors import HttpError
+
+import src
+
+
+def http_error(status):
+    return HttpError(SimpleNamespace(status=status, reason=""), b"")
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.ids = []
+
+    def add(self, request, request_id):
+        self.ids.append(request_id)
+
+    def execute(self):
+        self.service.batches.append(list(self.ids))
+        outcome = self.service.outcomes.pop(0) if self.service.outcomes else {}
+        for id in self.ids:
+            if outcome.get("stop_before") == id:
+                raise outcome["raise"]
+            error = outcome.get(id)
+            if error is None:
+                self.callback(id, {"id": id}, None)
+            else:
+                self.callback(id, None, error)
+        if "raise" in outcome and "stop_before" not in outcome:
+            raise outcome["raise"]
+
+
+class FakeService:
+    """
+    Gmail service whose batch requests play back a list of outcomes, one per
+    execute(). An outcome maps ids to the error their call fails with; with
+    "raise" the request as a whole fails, after answering the ids before
+    "stop_before" if that is given.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.batches = []
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, userId, id, **kwargs):
+        return id
+
+    def modify(self, userId, id, body):
+        return id
+
+    def batchModify(self, userId, body):
+        def execute():
+            raise http_error(500)
+
+        return SimpleNamespace(execute=execute)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeService()
+    monkeypatch.setattr(src, "get_service", lambda: fake)
+    monkeypatch.setattr(src, "_backoff", lambda attempt: 0)
+    return fake
+
+
+def test_rate_limited_calls_are_retried(service):
+    service.outcomes = [{"b": http_error(429)}]
+
+    results, errors = src._get_chunk(["a", "b", "c"], {})
+    assert sorted(results) == ["a", "b", "c"]
+    assert errors == {}
+    assert service.batches == [["a", "b", "c"], ["b"]]
+
+
+def test_permanent_errors_are_not_retried(service):
+    service.outcomes = [{"b": http_error(404)}]
+
+    results, errors = src._get_chunk(["a", "b"], {})
+    assert list(results) == ["a"]
+    assert errors["b"].resp.status == 404
+    assert len(service.batches) == 1
+
+
+def test_failed_batch_retries_only_unanswered_ids(service):
+    service.outcomes = [
+        {"c": http_error(404), "stop_before": "d", "raise": ConnectionError()},
+    ]
+
+    results, errors = src._get_chunk(["a", "b", "c", "d", "e"], {})
+    assert sorted(results) == ["a", "b", "d", "e"]
+    assert list(errors) == ["c"]
+    assert service.batches[1] == ["d", "e"]
+
+
+def test_failed_batch_with_server_error_is_retried(service):
+    service.outcomes = [
+        {"stop_before": "a", "raise": http_error(503)},
+        {"stop_before": "a", "raise": http_error(500)},
+    ]
+
+    results, errors = src._get_chunk(["a", "b"], {})
+    assert sorted(results) == ["a", "b"]
+    assert errors == {}
+    assert service.batches == [["a", "b"]] * 3
+
+
+def test_failed_batch_with_client_error_is_raised(service):
+    service.outcomes = [{"stop_before": "a", "raise": http_error(401)}]
+
+    with pytest.raises(HttpError):
+        src._get_chunk(["a", "b"], {})
+
+
+def test_retries_stop_after_max_retries(service):
+    service.outcomes = [{"a": http_error(503)}] * 3
+
+    results, errors = src._get_chunk(["a"], {}, max_retries=2)
+    assert results == {}
+    assert errors["a"].resp.status == 503
+    assert len(service.batches) == 3
+
+
+def test_batch_get_emails_keeps_order_across_chunks(service, monkeypatch):
+    monkeypatch.setattr(src, "BATCH_GET_SIZE", 2)
+    ids = ["e", "d", "c", "b", "a", "d"]
+    service.outcomes = [{}] * 3
+
+    messages = src.batch_get_emails(ids, max_workers=2)
+    assert list(messages) == ["e", "d", "c", "b", "a"]
+    assert sorted(len(batch) for batch in service.batches) == [1, 2, 2]
+
+
+def test_fetch_pool_is_reused(service):
+    src.batch_get_emails(["a"], max_workers=3)
+    executor = src._get_executor(3)
+    src.batch_get_emails(["b"], max_workers=3)
+    assert src._get_executor(3) is executor
+
+
+def test_failed_modify_batch_records_the_error_for_unanswered_ids(service):
+    error = ConnectionError()
+    service.outcomes = [{"b": http_error(404), "stop_before": "c", "raise": error}]
+
+    results = src.batch_modify_labels(["a", "b", "c", "d"], add_label_ids=["SPAM"])
+    assert results["a"] is None
+    assert results["b"].resp.status == 404
+    assert results["c"] is error and results["d"] is error
+
+
+def test_spam_results_survive_a_failure_to_connect(monkeypatch):
+    error = FileNotFoundError("credentials.json")
+
+    def get_service():
+        raise error
+
+    monkeypatch.setattr(src, "get_service", get_service)
+    assert src.mark_emails_as_spam(["a", "b"]) == {"a": error, "b": error}
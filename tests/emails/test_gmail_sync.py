@@ -0,0 +1,65 @@
+import gmail_sync
+from gmail_sync import GmailCache
+
+
+def message(id):
+    return {
+        "id": id,
+        "payload": {"headers": [{"name": "Subject", "value": f"Subject {id}"}]},
+    }
+
+
+def test_incremental_sync_only_caches_messages_matching_the_query(
+    tmp_path, monkeypatch
+):
+    cache = GmailCache(tmp_path / "cache.db")
+    cache.upsert([message("old-match"), message("relabelled")])
+    cache.set_state("history_id", "1")
+    cache.set_state("query", "unsubscribe")
+
+    listed = []
+    fetched = []
+
+    def iter_message_ids(query):
+        listed.append(query)
+        yield from ["new-match", "old-match", "unchanged"]
+
+    def fetch_metadata(ids):
+        fetched.extend(ids)
+        return {id: message(id) for id in ids}
+
+    monkeypatch.setattr(gmail_sync, "get_service", lambda: None)
+    monkeypatch.setattr(
+        gmail_sync,
+        "_list_history",
+        lambda service, history_id: (
+            {"new-match", "new-personal", "relabelled"},
+            set(),
+            "2",
+        ),
+    )
+    monkeypatch.setattr(gmail_sync, "iter_message_ids", iter_message_ids)
+    monkeypatch.setattr(gmail_sync, "_fetch_metadata", fetch_metadata)
+
+    result = gmail_sync.sync("unsubscribe", cache=cache)
+
+    assert listed == ["unsubscribe"]
+    assert fetched == ["new-match"]
+    assert result == {"full": False, "changed": 1, "deleted": 0}
+    assert {m["id"] for m in cache.messages()} == {"new-match", "old-match"}
+    assert cache.get_state("history_id") == "2"
+
+
+def test_matching_ids_stops_listing_once_every_id_is_found(monkeypatch):
+    listed = []
+
+    def iter_message_ids(query):
+        for id in ["a", "b", "c", "d"]:
+            listed.append(id)
+            yield id
+
+    monkeypatch.setattr(gmail_sync, "iter_message_ids", iter_message_ids)
+
+    assert gmail_sync._matching_ids("q", {"a", "b"}) == {"a", "b"}
+    assert listed == ["a", "b"]
+    assert gmail_sync._matching_ids("q", set()) == set()
@@ -0,0 +1,49 @@
+import sqlite3
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("langchain")
+
+import llm_metrics
+from llm_metrics import LLMMetricsHandler, SQLiteSink
+
+
+class ListSink:
+    def __init__(self):
+        self.calls = []
+
+    def emit(self, call):
+        self.calls.append(call)
+
+
+def run_call(handler, llm_output):
+    run_id = uuid4()
+    handler.on_chat_model_start({}, [], run_id=run_id)
+    handler.on_llm_end(SimpleNamespace(llm_output=llm_output), run_id=run_id)
+
+
+def test_cache_status_is_recorded(monkeypatch):
+    sink = ListSink()
+    handler = LLMMetricsHandler("draft_email", sinks=[sink])
+    output = {"model_name": "gpt", "token_usage": {"prompt_tokens": 3}}
+
+    monkeypatch.setattr(llm_metrics, "get_llm_cache", lambda: None)
+    run_call(handler, output)
+    monkeypatch.setattr(llm_metrics, "get_llm_cache", lambda: object())
+    run_call(handler, output)
+    run_call(handler, None)
+
+    assert [call["cache"] for call in sink.calls] == ["bypass", "miss", "hit"]
+    assert sink.calls[0]["prompt_tokens"] == 3
+
+
+def test_sqlite_sink_uses_its_own_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_metrics, "get_llm_cache", lambda: None)
+    path = str(tmp_path / "metrics.db")
+    run_call(LLMMetricsHandler("summary", sinks=[SQLiteSink(path)]), {})
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT prompt, cache FROM chain_calls").fetchall()
+    assert rows == [("summary", "bypass")]
@@ -0,0 +1,108 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import vector_index
+from vector_index import VectorIndex
+
+DIM = 8
+
+
+def documents(names):
+    return [{"page_content": name, "metadata": {"source": name}} for name in names]
+
+
+def basis(i):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i] = 1
+    return vector
+
+
+def names(results):
+    return [document["page_content"] for document, _ in results]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = VectorIndex.create(tmp_path / "index", DIM, info={"model": "test"})
+    index.add(np.eye(DIM)[:4] * 3, documents(["a", "b", "c", "d"]))
+    return index
+
+
+def test_search_ranks_by_cosine_similarity(index):
+    query = basis(1) + 0.5 * basis(2)
+
+    results = index.search(query, k=2)
+    assert names(results) == ["b", "c"]
+    assert results[0][1] == pytest.approx(2 / np.sqrt(5))
+
+
+def test_index_reopens_from_disk(index):
+    reopened = VectorIndex(index.path)
+    assert len(reopened) == 4
+    assert reopened.info == {"model": "test"}
+    assert names(reopened.search(basis(3), k=1)) == ["d"]
+
+
+def test_add_rejects_mismatched_documents(index):
+    with pytest.raises(ValueError):
+        index.add(np.eye(DIM)[:2], documents(["e"]))
+
+
+def test_uncommitted_rows_are_ignored(index):
+    # A write that died before meta.json was updated leaves extra bytes
+    with open(index.vectors_file, "ab") as f:
+        f.write(basis(4).tobytes())
+    with open(index.documents_file, "a") as f:
+        f.write(json.dumps(documents(["lost"])[0]) + "\n")
+
+    reopened = VectorIndex(index.path)
+    assert len(reopened) == 4
+    reopened.add([basis(5)], documents(["f"]))
+    assert [doc["page_content"] for _, doc in reopened.documents()][-1] == "f"
+    assert names(reopened.search(basis(5), k=1)) == ["f"]
+
+
+def test_deleted_rows_are_not_returned(index):
+    index.delete([1], compact=False)
+
+    assert len(index) == 3
+    assert "b" not in names(index.search(basis(1), k=4))
+    assert [i for i, _ in index.documents()] == [0, 2, 3]
+    assert VectorIndex(index.path).deleted == {1}
+
+
+def test_compact_rewrites_without_deleted_rows(index):
+    index.delete([0, 2], compact=False)
+    old_files = [index.vectors_file, index.documents_file]
+
+    index.compact()
+    assert index.count == 2 and not index.deleted
+    assert not any(os.path.exists(name) for name in old_files)
+    assert [doc["page_content"] for _, doc in index.documents()] == ["b", "d"]
+
+    reopened = VectorIndex(index.path)
+    assert reopened.generation == 1
+    assert names(reopened.search(basis(3), k=1)) == ["d"]
+
+
+def test_delete_compacts_past_the_threshold(index, monkeypatch):
+    monkeypatch.setattr(vector_index, "COMPACT_RATIO", 0.4)
+
+    index.delete([0])
+    assert index.count == 4
+    index.delete([1])
+    assert index.count == 2
+    assert names(index.search(basis(2), k=4))[0] == "c"
+
+
+def test_hnsw_search_skips_deleted_rows(tmp_path):
+    pytest.importorskip("hnswlib")
+    index = VectorIndex.create(tmp_path / "index", DIM, mode="hnsw")
+    index.add(np.eye(DIM), documents("abcdefgh"))
+
+    assert names(index.search(basis(2), k=1)) == ["c"]
+    index.delete([2], compact=False)
+    assert "c" not in names(index.search(basis(2), k=3))